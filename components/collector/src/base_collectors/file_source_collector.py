@@ -1,36 +1,75 @@
 """File source collector base classes."""
 
 import asyncio
+import codecs
+import glob
 import io
 import itertools
 import json
+import mmap
+import os
+import pathlib
+import urllib
 import zipfile
 from abc import ABC
 from http import HTTPStatus
-from typing import Dict, List, cast
+from typing import AsyncIterator, Dict, List, cast
 
-from collector_utilities.type import JSON, URL, Response, Responses
+from collector_utilities.artifact_store import ArtifactStore
+from collector_utilities.functions import memory_map
+from collector_utilities.type import JSON, URL, Contents, Response, Responses
 from source_model import SourceResponses
 
 from .source_collector import SourceCollector
 
 
+class FakeStreamReader:  # pylint: disable=too-few-public-methods
+    """Fake a stream reader because aiohttp.StreamReader can not easily be instantiated directly."""
+
+    def __init__(self, contents: Contents) -> None:
+        self.contents = contents
+
+    async def iter_chunked(self, size: int) -> AsyncIterator[memoryview]:
+        """Yield the contents in chunks of the given size, without copying them."""
+        with memoryview(self.contents) as contents:
+            for start in range(0, len(contents), size):
+                yield contents[start:start + size]
+
+
 class FakeResponse:
     """Fake a response because aiohttp.ClientResponse can not easily be instantiated directly."""
 
     status = HTTPStatus.OK
 
-    def __init__(self, contents: bytes = bytes()) -> None:
+    def __init__(self, contents: Contents = bytes()) -> None:
         super().__init__()
         self.contents = contents
 
+    @property
+    def content(self) -> FakeStreamReader:
+        """Return a stream reader for the contents."""
+        return FakeStreamReader(self.contents)
+
+    def close(self) -> None:
+        """Close the response and unmap the contents if they are memory mapped."""
+        if isinstance(self.contents, mmap.mmap):
+            try:
+                self.contents.close()
+            except BufferError:
+                # A parser still holds a view of the contents; the memory map is closed when it's garbage collected
+                pass
+
     async def json(self, content_type=None) -> JSON:  # pylint: disable=unused-argument
-        """Return the JSON version of the contents."""
-        return cast(JSON, json.loads(self.contents))
+        """Return the JSON version of the contents, decoded directly from the contents without copying them first."""
+        return cast(JSON, json.loads(codecs.decode(self.contents, "utf-8-sig")))
+
+    async def read(self) -> bytes:
+        """Return a copy of the contents. Use the content stream reader to access the contents without copying."""
+        return bytes(self.contents)
 
     async def text(self) -> str:
-        """Return the text version of the contents."""
-        return str(self.contents.decode())
+        """Return the text version of the contents, decoded directly from the contents without copying them first."""
+        return codecs.decode(self.contents, "utf-8")
 
 
 class FileSourceCollector(SourceCollector, ABC):  # pylint: disable=abstract-method
@@ -39,8 +78,14 @@ class FileSourceCollector(SourceCollector, ABC):  # pylint: disable=abstract-met
     file_extensions: List[str] = []  # Subclass responsibility
 
     async def _get_source_responses(self, *urls: URL) -> SourceResponses:
-        """Extend to unzip any zipped responses."""
-        responses = await super()._get_source_responses(*urls)
+        """Extend to read local files and to unzip any zipped responses."""
+        if urls[0].startswith("file://"):
+            # Globbing and memory mapping files may take a while, so don't block the event loop:
+            responses = await asyncio.get_running_loop().run_in_executor(None, self.__read_files, urls[0])
+        elif self._artifact_store:
+            responses = await self.__get_stored_responses(self._artifact_store, *urls)
+        else:
+            responses = await super()._get_source_responses(*urls)
         if urls[0].endswith(".zip"):
             unzipped_responses = await asyncio.gather(*[self.__unzip(response) for response in responses])
             responses[:] = list(itertools.chain(*unzipped_responses))
@@ -55,6 +100,34 @@ class FileSourceCollector(SourceCollector, ABC):  # pylint: disable=abstract-met
             headers["Private-Token"] = token
         return headers
 
+    async def __get_stored_responses(self, artifact_store: ArtifactStore, *urls: URL) -> SourceResponses:
+        """Get the file(s) via the artifact store, so they are only downloaded when changed."""
+        kwargs = self._get_request_kwargs()
+        tasks = [artifact_store.get(self._session, url, **kwargs) for url in urls if url]
+        responses = [FakeResponse(contents) for contents in await asyncio.gather(*tasks)]
+        return SourceResponses(responses=cast(Responses, responses), api_url=urls[0])
+
+    @staticmethod
+    def __read_files(url: URL) -> SourceResponses:
+        """Memory map the file(s) the file url refers to and return a (new) response for each file.
+
+        The path of the url may be a glob pattern, in which case all matching files are read. Only files in the
+        directory configured with the COLLECTOR_FILE_ROOT environment variable can be read. If the environment variable
+        is not set, reading files is disabled.
+        """
+        if not (root_directory := os.environ.get("COLLECTOR_FILE_ROOT")):
+            raise PermissionError("Reading files is disabled; set COLLECTOR_FILE_ROOT to enable it")
+        root = pathlib.Path(root_directory).resolve()
+        pattern = os.path.abspath(urllib.parse.unquote(urllib.parse.urlsplit(url).path))
+        if not pathlib.Path(pattern).is_relative_to(root):
+            raise PermissionError(f"{url} is not in the directory {root}")
+        # Resolve the filenames to prevent reading files outside the root directory via symbolic links:
+        paths = [pathlib.Path(filename).resolve() for filename in sorted(glob.glob(pattern, recursive=True))]
+        if not (filenames := [path for path in paths if path.is_file() and path.is_relative_to(root)]):
+            raise LookupError(f"No files match {url}")
+        responses = [FakeResponse(memory_map(str(filename))) for filename in filenames]
+        return SourceResponses(responses=cast(Responses, responses), api_url=url)
+
     @classmethod
     async def __unzip(cls, response: Response) -> Responses:
         """Unzip the response content and return a (new) response for each applicable file in the zip archive."""
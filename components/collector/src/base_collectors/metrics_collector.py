@@ -1,14 +1,18 @@
 """Metrics collector."""
 
 import asyncio
+import itertools
 import logging
 import os
 import traceback
 from datetime import datetime, timedelta
-from typing import Any, Dict, Final, NoReturn, cast
+from http import HTTPStatus
+from typing import Any, Dict, Final, List, NoReturn, cast
 
 import aiohttp
 
+from collector_utilities.artifact_store import ArtifactStore
+from collector_utilities.datamodel_index import DataModelIndex
 from collector_utilities.functions import timer
 from collector_utilities.type import JSON, URL
 
@@ -48,9 +52,22 @@ class MetricsCollector:
         self.server_url: Final[URL] = URL(
             f"http://{os.environ.get('SERVER_HOST', 'localhost')}:{os.environ.get('SERVER_PORT', '5001')}"
         )
-        self.data_model: JSON = {}
+        self.data_model_url: Final = URL(f"{self.server_url}/api/{self.API_VERSION}/datamodel")
+        self.data_model_index = DataModelIndex({})
+        self.data_model_etag = ""
         self.last_parameters: Dict[str, Any] = {}
         self.next_fetch: Dict[str, datetime] = {}
+        self.artifact_store: Final = ArtifactStore.from_environment()
+
+    @property
+    def data_model(self) -> JSON:
+        """Return the data model."""
+        return self.data_model_index.data_model
+
+    @data_model.setter
+    def data_model(self, data_model: JSON) -> None:
+        """Set the data model and index it, so the data model doesn't need to be walked for each metric."""
+        self.data_model_index = DataModelIndex(data_model)
 
     @staticmethod
     def record_health(filename: str = "/home/collector/health_check.txt") -> None:
@@ -67,7 +84,7 @@ class MetricsCollector:
         measurement_frequency = int(os.environ.get("COLLECTOR_MEASUREMENT_FREQUENCY", 15 * 60))
         timeout = aiohttp.ClientTimeout(total=120)
         async with aiohttp.ClientSession(raise_for_status=True, timeout=timeout, trust_env=True) as session:
-            self.data_model = await self.fetch_data_model(session, max_sleep_duration)
+            await self.fetch_data_model(session, max_sleep_duration)
         while True:
             self.record_health()
             logging.info("Collecting...")
@@ -78,6 +95,7 @@ class MetricsCollector:
                 trust_env=True,
             ) as session:
                 with timer() as collection_timer:
+                    await self.get_data_model(session)
                     await self.collect_metrics(session, measurement_frequency)
             sleep_duration = max(0, max_sleep_duration - collection_timer.duration)
             logging.info(
@@ -90,44 +108,83 @@ class MetricsCollector:
         # The first attempt is likely to fail because the collector starts up faster than the server,
         # so don't log tracebacks on the first attempt
         first_attempt = True
-        data_model_url = URL(f"{self.server_url}/api/{self.API_VERSION}/datamodel")
         while True:
             self.record_health()
-            logging.info("Loading data model from %s...", data_model_url)
-            if data_model := await get(session, data_model_url, log=not first_attempt):
+            logging.info("Loading data model from %s...", self.data_model_url)
+            if data_model := await self.get_data_model(session, log=not first_attempt):
                 return data_model
             first_attempt = False
             logging.warning("Loading data model failed, trying again in %ss...", sleep_duration)
             await asyncio.sleep(sleep_duration)
 
+    async def get_data_model(self, session: aiohttp.ClientSession, log: bool = True) -> JSON:
+        """Get the data model if the server has another version than the collector and return the data model.
+
+        The collector sends the ETag of its version of the data model, so the server can answer with 304 Not Modified
+        if the data model is unchanged. If getting the data model fails, the collector keeps its version.
+        """
+        headers = {"If-None-Match": self.data_model_etag} if self.data_model_etag else {}
+        try:
+            async with session.get(self.data_model_url, headers=headers) as response:
+                if response.status != HTTPStatus.NOT_MODIFIED and (data_model := cast(JSON, await response.json())):
+                    self.data_model, self.data_model_etag = data_model, response.headers.get("ETag", "")
+        except Exception as reason:  # pylint: disable=broad-except
+            if log:
+                logging.error("Getting data from %s failed: %s", self.data_model_url, reason)
+                logging.error(traceback.format_exc())
+        return self.data_model
+
     async def collect_metrics(self, session: aiohttp.ClientSession, measurement_frequency: int) -> None:
         """Collect measurements for all metrics."""
         metrics = await get(session, URL(f"{self.server_url}/internal-api/{self.API_VERSION}/metrics"))
         next_fetch = datetime.now() + timedelta(seconds=measurement_frequency)
-        tasks = [
-            self.collect_metric(session, metric_uuid, metric, next_fetch)
+        collectors = {
+            metric_uuid: self.source_collectors(session, metric)
             for metric_uuid, metric in metrics.items()
             if self.__can_and_should_collect(metric_uuid, metric)
+        }
+        await self.prepare(*itertools.chain(*collectors.values()))
+        tasks = [
+            self.collect_metric(session, metric_uuid, metrics[metric_uuid], next_fetch, metric_collectors)
+            for metric_uuid, metric_collectors in collectors.items()
         ]
         await asyncio.gather(*tasks)
 
-    async def collect_metric(self, session: aiohttp.ClientSession, metric_uuid, metric, next_fetch: datetime) -> None:
-        """Collect measurements for the metric and post it to the server."""
+    async def collect_metric(
+        self, session: aiohttp.ClientSession, metric_uuid, metric, next_fetch: datetime, collectors
+    ) -> None:
+        """Collect measurements for the metric with the source collectors and post it to the server."""
         self.last_parameters[metric_uuid] = metric
         self.next_fetch[metric_uuid] = next_fetch
-        if measurement := await self.collect_sources(session, metric):
+        if measurement := await self.measure(metric, collectors):
             measurement["metric_uuid"] = metric_uuid
             await post(session, URL(f"{self.server_url}/internal-api/{self.API_VERSION}/measurements"), measurement)
 
-    async def collect_sources(self, session: aiohttp.ClientSession, metric):
-        """Collect the measurements from the metric's sources."""
+    def source_collectors(self, session: aiohttp.ClientSession, metric) -> List[SourceCollector]:
+        """Return the source collectors for the metric's sources."""
         collectors = []
         for source in metric["sources"].values():
             if collector_class := SourceCollector.get_subclass(source["type"], metric["type"]):
-                collectors.append(collector_class(session, source, self.data_model).get())
+                collectors.append(collector_class(session, source, self.data_model_index, self.artifact_store))
+        return collectors
+
+    @staticmethod
+    async def prepare(*collectors: SourceCollector) -> None:
+        """Let the source collectors prepare before any of them collects, so they can combine their requests."""
+        await asyncio.gather(*[collector.prepare() for collector in collectors])
+
+    async def collect_sources(self, session: aiohttp.ClientSession, metric):
+        """Collect the measurements from the metric's sources."""
+        collectors = self.source_collectors(session, metric)
+        await self.prepare(*collectors)
+        return await self.measure(metric, collectors)
+
+    @staticmethod
+    async def measure(metric, collectors: List[SourceCollector]):
+        """Collect the measurements from the metric's sources with the source collectors."""
         if not collectors:
             return
-        measurements = await asyncio.gather(*collectors)
+        measurements = await asyncio.gather(*[collector.get() for collector in collectors])
         for measurement, source_uuid in zip(measurements, metric["sources"]):
             measurement["source_uuid"] = source_uuid
         return dict(sources=measurements)
@@ -140,14 +197,8 @@ class MetricsCollector:
         """Return whether the user has specified all mandatory parameters for all sources."""
         sources = metric.get("sources")
         for source in sources.values():
-            parameters = self.data_model.get("sources", {}).get(source["type"], {}).get("parameters", {})
-            for parameter_key, parameter in parameters.items():
-                if (
-                    parameter.get("mandatory")
-                    and metric["type"] in parameter.get("metrics")
-                    and not source.get("parameters", {}).get(parameter_key)
-                    and not parameter.get("default_value")
-                ):
+            for parameter_key in self.data_model_index.mandatory_parameters(source["type"], metric["type"]):
+                if not source.get("parameters", {}).get(parameter_key):
                     return False
         return bool(sources)
 
@@ -10,6 +10,8 @@ from typing import Any, Dict, Final, List, Optional, Set, Sequence, Tuple, Type,
 
 import aiohttp
 
+from collector_utilities.artifact_store import ArtifactStore
+from collector_utilities.datamodel_index import DataModelIndex
 from collector_utilities.functions import days_ago, stable_traceback, tokenless
 from collector_utilities.type import URL, Response
 from source_model import Entity, SourceMeasurement, SourceResponses
@@ -26,9 +28,17 @@ class SourceCollector(ABC):
     source_type = ""  # The source type is set on the subclass, when the subclass is registered
     subclasses: Set[Type["SourceCollector"]] = set()
 
-    def __init__(self, session: aiohttp.ClientSession, source, data_model) -> None:
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        source,
+        data_model_index: DataModelIndex,
+        artifact_store: Optional[ArtifactStore] = None,
+    ) -> None:
         self._session = session
-        self._data_model: Final = data_model
+        self._data_model_index: Final = data_model_index
+        self._data_model: Final = data_model_index.data_model
+        self._artifact_store: Final = artifact_store
         self.__parameters: Final[Dict[str, Union[str, List[str]]]] = source.get("parameters", {})
 
     def __init_subclass__(cls) -> None:
@@ -50,11 +60,29 @@ class SourceCollector(ABC):
         logging.warning("Couldn't find collector subclass for source %s and metric %s", source_type, metric_type)
         return None
 
+    async def prepare(self) -> None:
+        """Prepare collecting the measurement, without failing.
+
+        The metrics collector calls this method for all source collectors of a collection cycle before any of them
+        collects, so source collectors can combine their requests with those of other source collectors.
+        """
+        try:
+            await self._prepare()
+        except Exception as reason:  # pylint: disable=broad-except
+            logging.warning("Failed to prepare %s: %s", self.__class__.__name__, self.__logsafe_exception(reason))
+
+    async def _prepare(self) -> None:
+        """Prepare collecting the measurement. Can be overridden to register requests that can be combined."""
+
     async def get(self):
         """Return the measurement from this source."""
         responses = await self.__safely_get_source_responses()
-        measurement = await self.__safely_parse_source_responses(responses)
-        landing_url = await self.__safely_parse_landing_url(responses)
+        try:
+            measurement = await self.__safely_parse_source_responses(responses)
+            landing_url = await self.__safely_parse_landing_url(responses)
+        finally:
+            for response in responses:
+                response.close()  # Release the connections and any memory mapped files
         return dict(
             api_url=responses.api_url,
             landing_url=landing_url,
@@ -76,16 +104,15 @@ class SourceCollector(ABC):
             """Quote the string if needed."""
             return urllib.parse.quote(parameter_value, safe="") if quote else parameter_value
 
-        parameter_info = self._data_model["sources"][self.source_type]["parameters"][parameter_key]
-        if parameter_info["type"] == "multiple_choice":
+        parameter = self._data_model_index.parameter(self.source_type, parameter_key)
+        if parameter.type == "multiple_choice":
             # If the user didn't pick any values, select all values:
-            value = self.__parameters.get(parameter_key) or parameter_info["values"]
+            value = self.__parameters.get(parameter_key) or parameter.values
             # Ensure all values picked by the user are still allowed. Remove any values that are no longer allowed:
-            value = [v for v in value if v in parameter_info["values"]]
+            value = [v for v in value if v in parameter.allowed_values]
         else:
-            default_value = parameter_info.get("default_value", "")
-            value = self.__parameters.get(parameter_key) or default_value
-        if api_values := parameter_info.get("api_values"):
+            value = self.__parameters.get(parameter_key) or parameter.default_value
+        if api_values := parameter.api_values:
             value = api_values.get(value, value) if isinstance(value, str) else [api_values.get(v, v) for v in value]
         if parameter_key.endswith("url"):
             value = cast(str, value).rstrip("/")
@@ -119,14 +146,19 @@ class SourceCollector(ABC):
 
     async def _get_source_responses(self, *urls: URL) -> SourceResponses:
         """Open the url(s). Can be overridden if a post request is needed or serial requests need to be made."""
+        kwargs = self._get_request_kwargs()
+        tasks = [self._session.get(url, **kwargs) for url in urls if url]
+        return SourceResponses(responses=list(await asyncio.gather(*tasks)), api_url=urls[0])
+
+    def _get_request_kwargs(self) -> Dict[str, Any]:
+        """Return the keyword arguments, such as authentication and headers, for the get request."""
         kwargs: Dict[str, Any] = {}
         credentials = self._basic_auth_credentials()
         if credentials is not None:
             kwargs["auth"] = aiohttp.BasicAuth(credentials[0], credentials[1])
         if headers := self._headers():
             kwargs["headers"] = headers
-        tasks = [self._session.get(url, **kwargs) for url in urls if url]
-        return SourceResponses(responses=list(await asyncio.gather(*tasks)), api_url=urls[0])
+        return kwargs
 
     def _basic_auth_credentials(self) -> Optional[Tuple[str, str]]:
         """Return the basic authentication credentials, if any."""
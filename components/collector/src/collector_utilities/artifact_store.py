@@ -0,0 +1,143 @@
+"""Disk-backed, content-addressed store for artifacts downloaded by the collector."""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import tempfile
+from http import HTTPStatus
+from typing import Dict, Final, Optional, Union, cast
+
+import aiohttp
+
+from .functions import memory_map, sha1_hash
+from .type import URL, Contents
+
+
+class ArtifactStore:
+    """Store artifacts, such as zipped build artifacts and large XML reports, on disk.
+
+    Artifacts are stored under the hash of their contents, so identical artifacts are stored once. An index maps
+    request keys (the url plus credentials and headers) to content hashes and HTTP validators (ETag and Last-Modified),
+    so unchanged artifacts are not downloaded again, not by other metrics and not after a restart of the collector.
+    Downloads are streamed to disk and written atomically. Only complete (200 OK) responses are stored. When the store
+    exceeds its maximum size, the least recently used artifacts are evicted, except for artifacts that are being
+    revalidated. Artifacts are returned memory mapped, so memory use does not depend on artifact size.
+    """
+
+    CHUNK_SIZE: Final = 1024 * 1024  # Number of bytes to write to disk at a time
+    INDEX_FILENAME: Final = "index.json"
+
+    def __init__(self, directory: Union[str, pathlib.Path], max_size: int) -> None:
+        self.directory: Final = pathlib.Path(directory)
+        self.max_size: Final = max_size  # Maximum total size of the artifacts in bytes
+        self.__objects: Final = self.directory / "objects"
+        self.__objects.mkdir(parents=True, exist_ok=True)
+        self.__index: Dict[str, Dict[str, str]] = self.__read_index()
+        self.__downloads: Dict[str, asyncio.Future] = {}
+        self.__in_use: Dict[str, int] = {}  # Hash -> number of requests revalidating the artifact with the hash
+        self.__size = sum(path.stat().st_size for path in self.__objects.iterdir())  # Total size of the artifacts
+
+    @classmethod
+    def from_environment(cls) -> Optional["ArtifactStore"]:
+        """Create the artifact store if a directory has been configured, otherwise return None."""
+        if directory := os.environ.get("COLLECTOR_ARTIFACT_STORE_DIRECTORY"):
+            max_size = int(os.environ.get("COLLECTOR_ARTIFACT_STORE_MAX_SIZE", 1024)) * 1024 * 1024  # MiB
+            return cls(directory, max_size)
+        return None
+
+    async def get(self, session: aiohttp.ClientSession, url: URL, **kwargs) -> Contents:
+        """Return the contents of the artifact at the url, downloading it only if it is not in the store yet or changed.
+
+        Concurrent requests for the same artifact share one download. The keyword arguments are passed to the get
+        request.
+        """
+        key = sha1_hash(json.dumps([url, repr(kwargs.get("auth")), kwargs.get("headers", {})], sort_keys=True))
+        if key not in self.__downloads:
+            self.__downloads[key] = asyncio.ensure_future(self.__get(session, url, key, **kwargs))
+            self.__downloads[key].add_done_callback(lambda _: self.__downloads.pop(key, None))
+        return cast(Contents, await asyncio.shield(self.__downloads[key]))
+
+    async def __get(self, session: aiohttp.ClientSession, url: URL, key: str, **kwargs) -> Contents:
+        """Download the artifact, unless the stored version is still valid, and return its contents."""
+        headers = dict(kwargs.pop("headers", {}))
+        entry = self.__index.get(key, {})
+        path = self.__objects / entry.get("hash", "")
+        if stored := bool(entry) and path.exists():
+            if etag := entry.get("etag"):
+                headers["If-None-Match"] = etag
+            if last_modified := entry.get("last_modified"):
+                headers["If-Modified-Since"] = last_modified
+            # Make sure the artifact isn't evicted by other downloads while it's being revalidated:
+            self.__in_use[path.name] = self.__in_use.get(path.name, 0) + 1
+        try:
+            response = await session.get(url, headers=headers, **kwargs)
+        finally:
+            if stored and (in_use := self.__in_use.pop(path.name) - 1):
+                self.__in_use[path.name] = in_use
+        if stored and response.status == HTTPStatus.NOT_MODIFIED:
+            response.close()
+            logging.info("Using stored artifact for %s", key)
+        elif response.status == HTTPStatus.OK:
+            path = await self.__download(response)
+            self.__index[key] = dict(
+                hash=path.name,
+                etag=response.headers.get("ETag", ""),
+                last_modified=response.headers.get("Last-Modified", ""),
+            )
+            self.__evict(keep=path)
+            self.__write_index()
+        else:
+            logging.info("Not storing artifact for %s with status %s", key, response.status)
+            return cast(Contents, await response.read())
+        os.utime(path)  # Mark the artifact as recently used
+        return memory_map(str(path))
+
+    async def __download(self, response: aiohttp.ClientResponse) -> pathlib.Path:
+        """Stream the response to a temporary file and then move it to its content-addressed location."""
+        digest = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(dir=self.directory, delete=False) as temporary_file:
+            try:
+                async for chunk in response.content.iter_chunked(self.CHUNK_SIZE):
+                    temporary_file.write(chunk)
+                    digest.update(chunk)
+            except BaseException:
+                os.unlink(temporary_file.name)
+                raise
+        path = self.__objects / digest.hexdigest()
+        if path.exists():  # The artifact has the same contents as an artifact already stored
+            os.unlink(temporary_file.name)
+        else:
+            os.replace(temporary_file.name, path)
+            self.__size += path.stat().st_size
+        return path
+
+    def __evict(self, keep: pathlib.Path) -> None:
+        """Remove the least recently used artifacts until the store is within its maximum size."""
+        if self.__size <= self.max_size:
+            return
+        evicted_hashes = set()
+        for path in sorted(self.__objects.iterdir(), key=lambda path: path.stat().st_mtime):
+            if self.__size <= self.max_size:
+                break
+            if path != keep and path.name not in self.__in_use:
+                self.__size -= path.stat().st_size
+                path.unlink()
+                evicted_hashes.add(path.name)
+        self.__index = {key: entry for key, entry in self.__index.items() if entry["hash"] not in evicted_hashes}
+
+    def __read_index(self) -> Dict[str, Dict[str, str]]:
+        """Read the index from disk."""
+        try:
+            with (self.directory / self.INDEX_FILENAME).open() as index_file:
+                return cast(Dict[str, Dict[str, str]], json.load(index_file))
+        except (OSError, ValueError):
+            return {}
+
+    def __write_index(self) -> None:
+        """Write the index to disk atomically."""
+        with tempfile.NamedTemporaryFile("w", dir=self.directory, delete=False) as temporary_file:
+            json.dump(self.__index, temporary_file)
+        os.replace(temporary_file.name, self.directory / self.INDEX_FILENAME)
@@ -0,0 +1,51 @@
+"""Index of the data model."""
+
+from typing import Dict, FrozenSet, List, NamedTuple, Tuple, Union
+
+from .type import JSON
+
+
+class Parameter(NamedTuple):
+    """The properties of a source parameter that the collector needs."""
+
+    type: str
+    default_value: Union[str, List[str]]
+    values: List[str]  # The possible values of multiple choice parameters, in data model order
+    allowed_values: FrozenSet[str]
+    api_values: Dict[str, str]  # Value -> API value
+    descriptions: Dict[str, str]  # API value -> value, the reverse of the API values
+
+
+class DataModelIndex:
+    """Lookups in the data model that would otherwise need walks of the data model JSON.
+
+    The index is built once per data model, when the collector receives the data model from the server.
+    """
+
+    def __init__(self, data_model: JSON) -> None:
+        self.data_model = data_model
+        self.__parameters: Dict[Tuple[str, str], Parameter] = {}
+        self.__mandatory_parameters: Dict[Tuple[str, str], List[str]] = {}
+        for source_type, source in data_model.get("sources", {}).items():
+            for key, parameter in source.get("parameters", {}).items():
+                api_values = parameter.get("api_values", {})
+                self.__parameters[(source_type, key)] = Parameter(
+                    type=parameter.get("type", ""),
+                    default_value=parameter.get("default_value", ""),
+                    values=parameter.get("values", []),
+                    allowed_values=frozenset(parameter.get("values", [])),
+                    api_values=api_values,
+                    # If values share an API value, the first value describes the API value:
+                    descriptions={api_value: value for value, api_value in reversed(list(api_values.items()))},
+                )
+                if parameter.get("mandatory") and not parameter.get("default_value"):
+                    for metric_type in parameter.get("metrics", []):
+                        self.__mandatory_parameters.setdefault((source_type, metric_type), []).append(key)
+
+    def parameter(self, source_type: str, parameter_key: str) -> Parameter:
+        """Return the source parameter. Raise a KeyError if the source type has no parameter with the key."""
+        return self.__parameters[(source_type, parameter_key)]
+
+    def mandatory_parameters(self, source_type: str, metric_type: str) -> List[str]:
+        """Return the keys of the mandatory parameters without default value of the source type for the metric."""
+        return self.__mandatory_parameters.get((source_type, metric_type), [])
@@ -2,15 +2,17 @@
 
 import contextlib
 import hashlib
+import io
+import mmap
 import re
 import urllib
 from datetime import datetime
-from typing import Collection, Generator, Pattern, Tuple, cast
-from xml.etree.ElementTree import Element  # nosec, Element is not available from defusedxml, but only used as type
+from typing import Collection, Generator, Optional, Pattern, Tuple, cast
+from xml.etree.ElementTree import Element, TreeBuilder  # nosec, not available from defusedxml, only used as base class
 
 from defusedxml import ElementTree
 
-from .type import URL, Namespaces, Response
+from .type import URL, Contents, Namespaces, Response
 
 
 async def parse_source_response_xml(response: Response, allowed_root_tags: Collection[str] = None) -> Element:
@@ -31,6 +33,60 @@ async def parse_source_response_xml_with_namespace(
     return tree, namespaces
 
 
+class _ElementFinder(TreeBuilder):
+    """Tree builder that remembers the first element with one of the given tags, or the root element if no tags are
+    given."""
+
+    def __init__(self, tags: Collection[str]) -> None:
+        super().__init__()
+        self.tags = tags
+        self.element: Optional[Element] = None
+
+    def start(self, tag, attrs) -> Element:
+        """Extend to remember the element if it's the one we're looking for."""
+        element = super().start(tag, attrs)
+        if self.element is None and (not self.tags or tag in self.tags):
+            self.element = element
+        return element
+
+
+XML_CHUNK_SIZE = 64 * 1024  # Number of bytes to read from the response per parse step
+
+
+async def parse_source_response_xml_with_target(response: Response, target) -> None:
+    """Parse the XML from the source response in one streaming pass, passing the parse events to the target.
+
+    The target receives the start, end, and data callbacks of the XML parser, see
+    https://docs.python.org/3/library/xml.etree.elementtree.html#xmlparser-objects, and can use them to collect the
+    information it needs without building the element tree.
+    """
+    parser = ElementTree.DefusedXMLParser(target=target, forbid_dtd=False)
+    async for chunk in response.content.iter_chunked(XML_CHUNK_SIZE):
+        parser.feed(chunk)
+    parser.close()
+
+
+async def parse_source_response_xml_element(response: Response, tags: Collection[str] = ()) -> Element:
+    """Parse the XML from the source response until the first element with one of the tags has been found.
+
+    If no tags are given, return the root element. Stop reading the response as soon as the start tag of the element
+    has been parsed, so only the attributes of the element are available, not its children. Raise a LookupError if the
+    response contains no element with one of the tags.
+    """
+    finder = _ElementFinder(tags)
+    parser = ElementTree.DefusedXMLParser(target=finder, forbid_dtd=False)
+    async for chunk in response.content.iter_chunked(XML_CHUNK_SIZE):
+        parser.feed(chunk)
+        if finder.element is not None:
+            response.close()  # Close the connection so the remainder of the response is not downloaded
+            break
+    else:
+        parser.close()
+    if finder.element is None:
+        raise LookupError(f"The XML contains no element with tag {' or '.join(tags)}")
+    return finder.element
+
+
 Substitution = Tuple[Pattern[str], str]
 MEMORY_ADDRESS_SUB: Substitution = (re.compile(r" at 0x[0-9abcdef]+>"), ">")
 TOKEN_SUB: Substitution = (re.compile(r"token=[^&]+"), "token=<redacted>")
@@ -91,6 +147,13 @@ def match_string_or_regular_expression(string: str, strings_and_or_regular_expre
     return False
 
 
+def memory_map(filename: str) -> Contents:
+    """Memory map the file for reading so its contents can be accessed without reading the whole file into memory."""
+    with open(filename, "rb") as file:
+        # Memory mapping an empty file is not possible, but then there's nothing to map anyway:
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if file.seek(0, io.SEEK_END) else b""
+
+
 class Clock:  # pylint: disable=too-few-public-methods
     """Class to keep track of time."""
 
@@ -0,0 +1,26 @@
+"""Response types for responses that are not received directly from the source."""
+
+import json
+from http import HTTPStatus
+
+from .type import JSON
+
+
+class JSONResponse:
+    """Response with JSON that has been retrieved and parsed already, for example as part of a combined request."""
+
+    status = HTTPStatus.OK
+
+    def __init__(self, json_: JSON) -> None:
+        self.__json = json_
+
+    def close(self) -> None:
+        """Close the response. Nothing to do as the JSON is already in memory."""
+
+    async def json(self, content_type=None) -> JSON:  # pylint: disable=unused-argument
+        """Return the JSON."""
+        return self.__json
+
+    async def text(self) -> str:
+        """Return the text version of the JSON."""
+        return json.dumps(self.__json)
@@ -1,9 +1,11 @@
 """Quality-time specific types."""
 
-from typing import Any, Dict, List, NewType, Optional
+import mmap
+from typing import Any, Dict, List, NewType, Optional, Union
 
 import aiohttp
 
+Contents = Union[bytes, mmap.mmap]
 ErrorMessage = Optional[str]
 Job = Dict[str, Any]
 Jobs = List[Job]
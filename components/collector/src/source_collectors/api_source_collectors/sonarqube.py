@@ -1,13 +1,19 @@
 """Collectors for SonarQube."""
 
+import asyncio
+import re
+import urllib
+import weakref
 from datetime import datetime
-from typing import Dict, List
+from typing import Awaitable, Callable, Dict, Final, FrozenSet, List, Set, Tuple, cast
 
+import aiohttp
 from dateutil.parser import isoparse
 
 from base_collectors import SourceCollector, SourceUpToDatenessCollector
 from collector_utilities.functions import match_string_or_regular_expression
-from collector_utilities.type import URL, Response
+from collector_utilities.responses import JSONResponse
+from collector_utilities.type import JSON, URL, Response, Responses
 from source_model import Entity, SourceMeasurement, SourceResponses
 
 
@@ -15,20 +21,114 @@ class SonarQubeException(Exception):
     """Something went wrong collecting information from SonarQube."""
 
 
+class SonarQubeRequestBatcher:
+    """Combine requests of SonarQube collectors for the same component into one request.
+
+    SonarQube collectors that run in the same collection cycle, and hence share a session, check the existence of each
+    component once. Before collecting, the collectors register the measures they need. Measures of the same component
+    and branch are then retrieved with one measures/component request for the union of the registered metric keys,
+    after which each collector gets the measures it asked for. SonarQube fails the whole request if one of the metric
+    keys doesn't exist, so if the combined request fails, each collector retrieves its own measures instead.
+    """
+
+    __batchers: "weakref.WeakKeyDictionary[aiohttp.ClientSession, SonarQubeRequestBatcher]" = \
+        weakref.WeakKeyDictionary()
+    METRIC_KEYS_PARAMETER = re.compile(r"metricKeys=[^&]*")
+
+    def __init__(self) -> None:
+        self.__requests: Dict[Tuple[str, str], asyncio.Future] = {}
+        self.__registered_metric_keys: Dict[Tuple[str, str], Set[str]] = {}
+        self.__batches: Dict[Tuple[str, str], Tuple[FrozenSet[str], asyncio.Future]] = {}
+
+    @classmethod
+    def for_session(cls, session: aiohttp.ClientSession) -> "SonarQubeRequestBatcher":
+        """Return the request batcher for the session."""
+        return cls.__batchers.setdefault(session, cls())
+
+    async def get(self, url: URL, request_key: str, fetch: Callable[[URL], Awaitable[JSON]]) -> JSON:
+        """Return the JSON at the url, sharing the request with other collectors with the same request key."""
+        key = (url, request_key)
+        if key not in self.__requests:
+            self.__requests[key] = asyncio.ensure_future(fetch(url))
+        return cast(JSON, await asyncio.shield(self.__requests[key]))
+
+    def register_measures(self, url: URL, request_key: str) -> None:
+        """Register the measures the measures/component url asks for, so they can be retrieved in a combined request."""
+        key, metric_keys = self.__measures_key(url, request_key)
+        self.__registered_metric_keys.setdefault(key, set()).update(metric_keys)
+
+    async def get_measures(self, url: URL, request_key: str, fetch: Callable[[URL], Awaitable[JSON]]) -> JSON:
+        """Return the measures the measures/component url asks for, combining requests for the same component."""
+        key, metric_keys = self.__measures_key(url, request_key)
+        if key not in self.__batches or not metric_keys <= self.__batches[key][0]:
+            # Start a new batch with the metric keys registered since the previous batch started:
+            batch_metric_keys = frozenset(self.__registered_metric_keys.pop(key, set()) | metric_keys)
+            metric_keys_parameter = f"metricKeys={','.join(sorted(batch_metric_keys))}"
+            batch_url = URL(self.METRIC_KEYS_PARAMETER.sub(lambda _: metric_keys_parameter, url))
+            self.__batches[key] = batch_metric_keys, asyncio.ensure_future(fetch(batch_url))
+        batch_metric_keys, batch = self.__batches[key]
+        try:
+            measures_json = cast(JSON, await asyncio.shield(batch))
+            failed = "errors" in measures_json
+        except Exception:  # pylint: disable=broad-except
+            if batch_metric_keys == metric_keys:
+                raise
+            failed = True
+        if failed and batch_metric_keys != metric_keys:
+            # One of the other metric keys may not exist, so retrieve the measures with only this url's metric keys:
+            measures_json = await self.get(url, request_key, fetch)
+        component = dict(measures_json.get("component", {}))
+        component["measures"] = [m for m in component.get("measures", []) if m["metric"] in metric_keys]
+        return dict(measures_json, component=component)
+
+    def __measures_key(self, url: URL, request_key: str) -> Tuple[Tuple[str, str], FrozenSet[str]]:
+        """Return the key of the batch the measures/component url belongs to and the metric keys it asks for."""
+        metric_keys = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)["metricKeys"][0].split(",")
+        return (self.METRIC_KEYS_PARAMETER.sub("metricKeys=", url), request_key), frozenset(metric_keys)
+
+
 class SonarQubeCollector(SourceCollector):
     """Base class for SonarQube collectors."""
 
+    MEASURES_API: Final = "/api/measures/component?"
+
+    async def _prepare(self) -> None:
+        """Register the measures this collector needs, so they can be retrieved together with those of other metrics."""
+        batcher = SonarQubeRequestBatcher.for_session(self._session)
+        request_key = repr(self._get_request_kwargs())
+        for url in await self._measures_api_urls():
+            batcher.register_measures(url, request_key)
+
+    async def _measures_api_urls(self) -> List[URL]:
+        """Return the measures/component API urls of the collector. Override if the collector adds urls."""
+        api_url = await self._api_url()
+        return [api_url] if self.MEASURES_API in api_url else []
+
     async def _get_source_responses(self, *urls: URL) -> SourceResponses:
         # SonarQube sometimes gives results (e.g. zero violations) even if the component does not exist, so we
         # check whether the component specified by the user actually exists before getting the data.
         url = await SourceCollector._api_url(self)
         component = self._parameter("component")
         show_component_url = URL(f"{url}/api/components/show?component={component}")
-        response = (await super()._get_source_responses(show_component_url))[0]
-        json = await response.json()
-        if "errors" in json:
-            raise SonarQubeException(json["errors"][0]["msg"])
-        return await super()._get_source_responses(*urls)
+        batcher = SonarQubeRequestBatcher.for_session(self._session)
+        # Only share requests between collectors that use the same credentials:
+        request_key = repr(self._get_request_kwargs())
+        component_json = await batcher.get(show_component_url, request_key, self.__get_json)
+        if "errors" in component_json:
+            raise SonarQubeException(component_json["errors"][0]["msg"])
+        measures_urls = [url for url in urls if self.MEASURES_API in url]
+        other_urls = [url for url in urls if url not in measures_urls]
+        measures = asyncio.gather(*[batcher.get_measures(url, request_key, self.__get_json) for url in measures_urls])
+        responses = await super()._get_source_responses(*other_urls) if other_urls else SourceResponses()
+        measures_responses = cast(Responses, [JSONResponse(measures_json) for measures_json in await measures])
+        # Keep the responses in the order of the urls, as collectors rely on the order of the responses
+        responses_by_url = dict(zip(other_urls + measures_urls, list(responses) + measures_responses))
+        return SourceResponses(responses=[responses_by_url[url] for url in urls if url], api_url=urls[0])
+
+    async def __get_json(self, url: URL) -> JSON:
+        """Get the JSON from the url."""
+        response = (await super()._get_source_responses(url))[0]
+        return cast(JSON, await response.json())
 
 
 class SonarQubeViolations(SonarQubeCollector):
@@ -112,15 +212,22 @@ class SonarQubeViolationsWithPercentageScale(SonarQubeViolations):
 
     total_metric = ""  # Subclass responsibility
 
+    async def _measures_api_urls(self) -> List[URL]:
+        """Extend to add the url of the total number of units."""
+        return await super()._measures_api_urls() + [await self.__total_metric_api_url()]
+
     async def _get_source_responses(self, *urls: URL) -> SourceResponses:
         """Next to the violations, also get the total number of units as basis for the percentage scale."""
+        return await super()._get_source_responses(*(urls + (await self.__total_metric_api_url(),)))
+
+    async def __total_metric_api_url(self) -> URL:
+        """Return the API url for the total number of units."""
         component = self._parameter("component")
         branch = self._parameter("branch")
         base_api_url = await SonarQubeCollector._api_url(self)  # pylint: disable=protected-access
-        total_metric_api_url = URL(
+        return URL(
             f"{base_api_url}/api/measures/component?component={component}&metricKeys={self.total_metric}&"
             f"branch={branch}")
-        return await super()._get_source_responses(*(urls + (total_metric_api_url,)))
 
     async def _parse_source_responses(self, responses: SourceResponses) -> SourceMeasurement:
         measurement = await super()._parse_source_responses(responses)
@@ -389,9 +496,9 @@ class SonarQubeRemediationEffort(SonarQubeMetricsBaseClass):
 
     async def _entities(self, metrics: Dict[str, str]) -> List[Entity]:
         entities = []
-        api_values = self._data_model["sources"][self.source_type]["parameters"]["effort_types"]["api_values"]
+        descriptions = self._data_model_index.parameter(self.source_type, "effort_types").descriptions
         for effort_type in self.__effort_types():
-            effort_type_description = [param for param, api_key in api_values.items() if effort_type == api_key][0]
+            effort_type_description = descriptions[effort_type]
             entities.append(
                 Entity(
                     key=effort_type, effort_type=effort_type_description, effort=metrics[effort_type],
@@ -430,7 +537,7 @@ class SonarQubeTests(SonarQubeCollector):
     async def _parse_source_responses(self, responses: SourceResponses) -> SourceMeasurement:
         tests = await self.__nr_of_tests(responses)
         value = str(sum(tests[test_result] for test_result in self._parameter("test_result")))
-        test_results = self._data_model["sources"][self.source_type]["parameters"]["test_result"]["values"]
+        test_results = self._data_model_index.parameter(self.source_type, "test_result").values
         total = str(sum(tests[test_result] for test_result in test_results))
         return SourceMeasurement(value=value, total=total)
 
@@ -3,7 +3,7 @@
 from datetime import datetime
 
 from base_collectors import SourceUpToDatenessCollector, XMLFileSourceCollector
-from collector_utilities.functions import parse_source_response_xml
+from collector_utilities.functions import parse_source_response_xml_element
 from collector_utilities.type import Response
 from source_model import SourceMeasurement, SourceResponses
 
@@ -16,9 +16,9 @@ class CoberturaCoverageBaseClass(XMLFileSourceCollector):
     async def _parse_source_responses(self, responses: SourceResponses) -> SourceMeasurement:
         valid, covered = 0, 0
         for response in responses:
-            tree = await parse_source_response_xml(response)
-            valid += int(tree.get(f"{self.coverage_type}-valid", 0))
-            covered += int(tree.get(f"{self.coverage_type}-covered", 0))
+            coverage = await parse_source_response_xml_element(response)
+            valid += int(coverage.get(f"{self.coverage_type}-valid", 0))
+            covered += int(coverage.get(f"{self.coverage_type}-covered", 0))
         return SourceMeasurement(value=str(valid - covered), total=str(valid))
 
 
@@ -38,5 +38,5 @@ class CoberturaSourceUpToDateness(XMLFileSourceCollector, SourceUpToDatenessColl
     """Collector to collect the Cobertura report age."""
 
     async def _parse_source_response_date_time(self, response: Response) -> datetime:
-        tree = await parse_source_response_xml(response)
-        return datetime.utcfromtimestamp(int(tree.get("timestamp", 0)) / 1000.)
+        coverage = await parse_source_response_xml_element(response)
+        return datetime.utcfromtimestamp(int(coverage.get("timestamp", 0)) / 1000.)
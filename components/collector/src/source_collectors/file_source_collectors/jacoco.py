@@ -3,7 +3,7 @@
 from datetime import datetime
 
 from base_collectors import SourceUpToDatenessCollector, XMLFileSourceCollector
-from collector_utilities.functions import parse_source_response_xml
+from collector_utilities.functions import parse_source_response_xml, parse_source_response_xml_element
 from collector_utilities.type import Response
 from source_model import SourceMeasurement, SourceResponses
 
@@ -42,7 +42,8 @@ class JacocoSourceUpToDateness(XMLFileSourceCollector, SourceUpToDatenessCollect
 
     async def _parse_source_response_date_time(self, response: Response) -> datetime:
         """Override to parse the datetime from the JaCoCo XML."""
-        tree = await parse_source_response_xml(response)
-        session_info = tree.find(".//sessioninfo")
-        timestamp = session_info.get("dump", 0) if session_info is not None else 0
+        try:
+            timestamp = (await parse_source_response_xml_element(response, tags=["sessioninfo"])).get("dump", 0)
+        except LookupError:
+            timestamp = 0
         return datetime.utcfromtimestamp(int(timestamp) / 1000.0)
@@ -6,7 +6,7 @@ from typing import List, cast
 from dateutil.parser import parse
 
 from base_collectors import SourceUpToDatenessCollector, XMLFileSourceCollector
-from collector_utilities.functions import parse_source_response_xml
+from collector_utilities.functions import parse_source_response_xml, parse_source_response_xml_element
 from collector_utilities.type import Response
 from source_model import Entity, SourceMeasurement, SourceResponses
 
@@ -43,6 +43,5 @@ class JUnitSourceUpToDateness(XMLFileSourceCollector, SourceUpToDatenessCollecto
     """Collector to collect the Junit report age."""
 
     async def _parse_source_response_date_time(self, response: Response) -> datetime:
-        tree = await parse_source_response_xml(response)
-        test_suite = tree if tree.tag == "testsuite" else tree.findall("testsuite")[0]
+        test_suite = await parse_source_response_xml_element(response, tags=["testsuite"])
         return parse(test_suite.get("timestamp", ""))
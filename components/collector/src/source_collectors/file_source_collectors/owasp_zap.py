@@ -8,7 +8,8 @@ from xml.etree.ElementTree import Element  # nosec, Element is not available fro
 from dateutil.parser import parse
 
 from base_collectors import SourceUpToDatenessCollector, XMLFileSourceCollector
-from collector_utilities.functions import hashless, md5_hash, parse_source_response_xml
+from collector_utilities.functions import (
+    hashless, md5_hash, parse_source_response_xml, parse_source_response_xml_element)
 from collector_utilities.type import URL, Response
 from source_model import Entity, SourceMeasurement, SourceResponses
 
@@ -58,4 +59,4 @@ class OWASPZAPSourceUpToDateness(XMLFileSourceCollector, SourceUpToDatenessColle
     """Collector to collect the OWASP ZAP report age."""
 
     async def _parse_source_response_date_time(self, response: Response) -> datetime:
-        return parse((await parse_source_response_xml(response)).get("generated", ""))
+        return parse((await parse_source_response_xml_element(response)).get("generated", ""))
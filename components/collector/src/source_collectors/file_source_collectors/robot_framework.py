@@ -2,12 +2,12 @@
 
 from abc import ABC
 from datetime import datetime
-from typing import List, cast
+from typing import Collection, Dict, List, cast
 
 from dateutil.parser import parse
 
 from base_collectors import SourceUpToDatenessCollector, XMLFileSourceCollector
-from collector_utilities.functions import parse_source_response_xml
+from collector_utilities.functions import parse_source_response_xml_element, parse_source_response_xml_with_target
 from collector_utilities.type import URL, Response
 from source_model import Entity, SourceMeasurement, SourceResponses
 
@@ -20,25 +20,57 @@ class RobotFrameworkBaseClass(XMLFileSourceCollector, ABC):  # pylint: disable=a
         return URL(url.replace("output.html", "report.html"))
 
 
+class RobotFrameworkTestResults:
+    """Parse target that classifies the tests in a Robot Framework output.xml by their status in one pass.
+
+    Only the statistics and the first entities needed for the measurement are kept, the element tree is not built.
+    """
+
+    def __init__(self, test_results_to_count: Collection[str]) -> None:
+        self.test_results_to_count = test_results_to_count
+        self.counts: Dict[str, int] = {}
+        self.entities: List[Entity] = []
+        self.__tags: List[str] = []  # Stack of currently open tags
+        self.__test: Dict[str, str] = {}  # Attributes of the test currently being parsed
+        self.__test_result = ""
+
+    def start(self, tag: str, attributes: Dict[str, str]) -> None:
+        """Remember the test or, if this is the status of the current test, the test result."""
+        if tag == "test":
+            self.__test, self.__test_result = attributes, ""
+        elif tag == "status" and self.__tags and self.__tags[-1] == "test":
+            self.__test_result = attributes.get("status", "").lower()
+        self.__tags.append(tag)
+
+    def end(self, tag: str) -> None:
+        """Count the test and create an entity for it, if needed, when the test is complete."""
+        self.__tags.pop()
+        if tag != "test":
+            return
+        test_result = self.__test_result
+        self.counts[test_result] = self.counts.get(test_result, 0) + 1
+        if test_result in self.test_results_to_count and len(self.entities) < SourceMeasurement.MAX_ENTITIES:
+            self.entities.append(
+                Entity(key=self.__test.get("id", ""), name=self.__test.get("name", ""), test_result=test_result))
+
+
 class RobotFrameworkTests(RobotFrameworkBaseClass):
     """Collector for Robot Framework tests."""
 
     async def _parse_source_responses(self, responses: SourceResponses) -> SourceMeasurement:
         count = 0
         total = 0
-        entities = []
+        entities: List[Entity] = []
         test_results = cast(List[str], self._parameter("test_result"))
-        all_test_results = self._data_model["sources"][self.source_type]["parameters"]["test_result"]["values"]
+        all_test_results = self._data_model_index.parameter(self.source_type, "test_result").values
         for response in responses:
-            tree = await parse_source_response_xml(response)
-            stats = tree.findall("statistics/total/stat")[1]
+            results = RobotFrameworkTestResults(test_results)
+            await parse_source_response_xml_with_target(response, results)
             for test_result in all_test_results:
-                total += int(stats.get(test_result, 0))
+                total += results.counts.get(test_result, 0)
                 if test_result in test_results:
-                    count += int(stats.get(test_result, 0))
-                    for test in tree.findall(f".//test/status[@status='{test_result.upper()}']/.."):
-                        entities.append(
-                            Entity(key=test.get("id", ""), name=test.get("name", ""), test_result=test_result))
+                    count += results.counts.get(test_result, 0)
+            entities.extend(results.entities)
         return SourceMeasurement(value=str(count), total=str(total), entities=entities)
 
 
@@ -46,4 +78,4 @@ class RobotFrameworkSourceUpToDateness(RobotFrameworkBaseClass, SourceUpToDatene
     """Collector to collect the Robot Framework report age."""
 
     async def _parse_source_response_date_time(self, response: Response) -> datetime:
-        return parse((await parse_source_response_xml(response)).get("generated", ""))
+        return parse((await parse_source_response_xml_element(response)).get("generated", ""))
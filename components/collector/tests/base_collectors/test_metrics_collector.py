@@ -12,6 +12,23 @@ from base_collectors import MetricsCollector, SourceCollector
 from source_model import SourceMeasurement, SourceResponses
 
 
+class RequestContextManager:
+    """Fake request context manager that, like the one aiohttp returns, can be awaited or used as context manager."""
+
+    def __init__(self, response) -> None:
+        self.response = response
+
+    def __await__(self):
+        return self.response.__await__()
+
+    async def __aenter__(self):
+        self.response = await self.response
+        return self.response
+
+    async def __aexit__(self, *args) -> None:
+        self.response.release()
+
+
 class CollectorTest(unittest.IsolatedAsyncioTestCase):
     """Unit tests for the collection methods."""
 
@@ -46,9 +63,12 @@ class CollectorTest(unittest.IsolatedAsyncioTestCase):
     @staticmethod
     def patched_get(mock_async_get_request, side_effect=None):
         """Return a patched version of aiohttp.ClientSession.get()."""
-        mock = AsyncMock(side_effect=side_effect) if side_effect else AsyncMock(return_value=mock_async_get_request)
+        get = AsyncMock(side_effect=side_effect) if side_effect else AsyncMock(return_value=mock_async_get_request)
         if not side_effect:
             mock_async_get_request.close = Mock()
+            mock_async_get_request.release = Mock()
+            mock_async_get_request.headers = {}
+        mock = Mock(side_effect=lambda *args, **kwargs: RequestContextManager(get(*args, **kwargs)))
         return patch("aiohttp.ClientSession.get", mock)
 
     async def fetch_measurements(self, mock_async_get_request, number=1, side_effect=None):
@@ -175,7 +195,8 @@ class CollectorTest(unittest.IsolatedAsyncioTestCase):
     async def test_collect(self):
         """Test the collect method."""
         mock_async_get_request = AsyncMock()
-        mock_async_get_request.json.side_effect = [self.data_model, self.metrics]
+        # The collector fetches the data model on startup and revalidates it before collecting the metrics:
+        mock_async_get_request.json.side_effect = [self.data_model, self.data_model, self.metrics]
         mocked_post = AsyncMock()
         mocked_post.return_value.close = Mock()
         with self.patched_get(mock_async_get_request):
@@ -277,6 +298,53 @@ class CollectorTest(unittest.IsolatedAsyncioTestCase):
                 data_model = await self.metrics_collector.fetch_data_model(session, 0)
         self.assertEqual(self.data_model, data_model)
 
+    async def test_get_data_model_revalidates(self):
+        """Test that the collector sends the ETag of its data model and keeps its data model if it's unchanged."""
+        self.metrics_collector.data_model_etag = '"etag"'
+        mock_async_get_request = AsyncMock()
+        mock_async_get_request.status = 304
+        with self.patched_get(mock_async_get_request) as mocked_get:
+            async with aiohttp.ClientSession() as session:
+                data_model = await self.metrics_collector.get_data_model(session)
+        mocked_get.assert_called_once_with(
+            "http://localhost:5001/api/v3/datamodel", headers={"If-None-Match": '"etag"'}
+        )
+        mock_async_get_request.json.assert_not_called()
+        self.assertIs(self.data_model, data_model)
+
+    async def test_get_changed_data_model(self):
+        """Test that the collector replaces its data model and ETag if the data model changed."""
+        self.metrics_collector.data_model_etag = '"etag"'
+        changed_data_model = dict(sources=dict(source=dict(parameters={})))
+        mock_async_get_request = AsyncMock()
+        mock_async_get_request.status = 200
+        mock_async_get_request.json.return_value = changed_data_model
+        with self.patched_get(mock_async_get_request):
+            mock_async_get_request.headers = dict(ETag='"new etag"')
+            async with aiohttp.ClientSession() as session:
+                await self.metrics_collector.get_data_model(session)
+        self.assertEqual(changed_data_model, self.metrics_collector.data_model)
+        self.assertEqual('"new etag"', self.metrics_collector.data_model_etag)
+        self.assertEqual([], self.metrics_collector.data_model_index.mandatory_parameters("source", "metric"))
+
+    @patch("logging.error", Mock())
+    async def test_get_data_model_fails(self):
+        """Test that the collector keeps its data model if getting the data model fails."""
+        with self.patched_get(AsyncMock(), side_effect=RuntimeError):
+            async with aiohttp.ClientSession() as session:
+                self.assertIs(self.data_model, await self.metrics_collector.get_data_model(session))
+
+    @patch("logging.error", Mock())
+    async def test_get_data_model_releases_failed_response(self):
+        """Test that the collector releases the connection if reading the data model from the response fails."""
+        mock_async_get_request = AsyncMock()
+        mock_async_get_request.status = 200
+        mock_async_get_request.json.side_effect = RuntimeError
+        with self.patched_get(mock_async_get_request):
+            async with aiohttp.ClientSession() as session:
+                self.assertIs(self.data_model, await self.metrics_collector.get_data_model(session))
+        mock_async_get_request.release.assert_called_once()
+
     @patch("builtins.open", new_callable=mock_open)
     @patch("base_collectors.metrics_collector.datetime")
     def test_writing_health_check(self, mocked_datetime, mocked_open):
@@ -0,0 +1,117 @@
+"""Unit tests for the artifact store."""
+
+import asyncio
+import os
+import tempfile
+import unittest
+from http import HTTPStatus
+from unittest.mock import AsyncMock, Mock, patch
+
+from base_collectors.file_source_collector import FakeStreamReader
+from collector_utilities.artifact_store import ArtifactStore
+from collector_utilities.type import URL
+
+
+class ArtifactStoreTest(unittest.IsolatedAsyncioTestCase):
+    """Unit tests for the artifact store."""
+
+    def setUp(self):
+        """Override to create a temporary directory for the store and a fake session."""
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.store = ArtifactStore(self.directory.name, max_size=100)
+        self.session = Mock()
+        self.session.get = AsyncMock(side_effect=lambda *args, **kwargs: self.response(b"contents"))
+        self.url = URL("https://example.org/artifact.zip")
+
+    def tearDown(self):
+        """Override to remove the temporary directory."""
+        self.directory.cleanup()
+
+    @staticmethod
+    def response(contents: bytes, status: int = HTTPStatus.OK, etag: str = '"etag"'):
+        """Create a fake response."""
+        response = Mock()
+        response.status = status
+        response.headers = {"ETag": etag}
+        response.content = FakeStreamReader(contents)
+        response.read = AsyncMock(return_value=contents)
+        return response
+
+    async def test_get(self):
+        """Test that the artifact is downloaded and returned."""
+        self.assertEqual(b"contents", bytes(await self.store.get(self.session, self.url)))
+
+    async def test_get_unchanged_artifact(self):
+        """Test that a stored artifact is revalidated and not downloaded again if it is unchanged."""
+        await self.store.get(self.session, self.url)
+        self.session.get = AsyncMock(return_value=self.response(b"", status=HTTPStatus.NOT_MODIFIED))
+        self.assertEqual(b"contents", bytes(await self.store.get(self.session, self.url)))
+        self.assertEqual('"etag"', self.session.get.call_args.kwargs["headers"]["If-None-Match"])
+
+    async def test_get_changed_artifact(self):
+        """Test that a changed artifact is downloaded again."""
+        await self.store.get(self.session, self.url)
+        self.session.get = AsyncMock(return_value=self.response(b"new contents", etag='"new etag"'))
+        self.assertEqual(b"new contents", bytes(await self.store.get(self.session, self.url)))
+
+    async def test_concurrent_gets_share_download(self):
+        """Test that concurrent requests for the same artifact result in one download."""
+        contents = await asyncio.gather(self.store.get(self.session, self.url), self.store.get(self.session, self.url))
+        self.assertEqual([b"contents", b"contents"], [bytes(content) for content in contents])
+        self.session.get.assert_called_once()
+
+    async def test_different_credentials_are_not_shared(self):
+        """Test that an artifact retrieved with credentials is not shared with requests without credentials."""
+        await self.store.get(self.session, self.url, headers={"Private-Token": "token"})
+        await self.store.get(self.session, self.url)
+        self.assertNotIn("If-None-Match", self.session.get.call_args.kwargs["headers"])
+
+    async def test_index_survives_restart(self):
+        """Test that artifacts downloaded before a restart are revalidated instead of downloaded again."""
+        await self.store.get(self.session, self.url)
+        store = ArtifactStore(self.directory.name, max_size=100)
+        self.session.get = AsyncMock(return_value=self.response(b"", status=HTTPStatus.NOT_MODIFIED))
+        self.assertEqual(b"contents", bytes(await store.get(self.session, self.url)))
+
+    async def test_evict_least_recently_used_artifact(self):
+        """Test that the least recently used artifact is evicted when the store gets too large."""
+        for index in range(3):
+            self.session.get = AsyncMock(return_value=self.response(bytes([index]) * 40))
+            await self.store.get(self.session, URL(f"{self.url}/{index}"))
+        objects = os.listdir(os.path.join(self.directory.name, "objects"))
+        self.assertEqual(2, len(objects))
+        self.session.get = AsyncMock(return_value=self.response(b"", status=HTTPStatus.NOT_MODIFIED))
+        await self.store.get(self.session, URL(f"{self.url}/0"))
+        self.assertNotIn("If-None-Match", self.session.get.call_args.kwargs["headers"])
+
+    async def test_do_not_evict_artifact_being_revalidated(self):
+        """Test that an artifact is not evicted while it's being revalidated."""
+        await self.store.get(self.session, self.url)
+        revalidating, downloaded = asyncio.Event(), asyncio.Event()
+
+        async def get(url, **kwargs):
+            """Return a 304 for the stored artifact after another artifact has been downloaded."""
+            if url == self.url:
+                revalidating.set()
+                await downloaded.wait()
+                return self.response(b"", status=HTTPStatus.NOT_MODIFIED)
+            return self.response(b"x" * 95)
+
+        self.session.get = get
+        revalidation = asyncio.ensure_future(self.store.get(self.session, self.url))
+        await revalidating.wait()
+        await self.store.get(self.session, URL(f"{self.url}/other"))
+        downloaded.set()
+        self.assertEqual(b"contents", bytes(await revalidation))
+
+    async def test_do_not_store_incomplete_responses(self):
+        """Test that responses other than 200 OK are returned, but not stored."""
+        self.session.get = AsyncMock(return_value=self.response(b"partial", status=HTTPStatus.PARTIAL_CONTENT))
+        self.assertEqual(b"partial", bytes(await self.store.get(self.session, self.url)))
+        self.assertEqual([], os.listdir(os.path.join(self.directory.name, "objects")))
+
+    def test_from_environment(self):
+        """Test that the artifact store is only created if a directory is configured."""
+        self.assertIsNone(ArtifactStore.from_environment())
+        with patch.dict(os.environ, dict(COLLECTOR_ARTIFACT_STORE_DIRECTORY=self.directory.name)):
+            self.assertEqual(1024 * 1024 * 1024, ArtifactStore.from_environment().max_size)
@@ -0,0 +1,52 @@
+"""Unit tests for the data model index."""
+
+import unittest
+
+from collector_utilities.datamodel_index import DataModelIndex
+
+
+class DataModelIndexTest(unittest.TestCase):
+    """Unit tests for the data model index."""
+
+    def setUp(self):
+        """Override to create the index."""
+        self.index = DataModelIndex(
+            dict(
+                sources=dict(
+                    source=dict(
+                        parameters=dict(
+                            url=dict(type="url", mandatory=True, metrics=["metric", "other_metric"]),
+                            token=dict(type="password", mandatory=True, default_value="xxx", metrics=["metric"]),
+                            kind=dict(
+                                type="multiple_choice",
+                                values=["Bug", "Defect", "Story"],
+                                api_values=dict(Bug="bug", Defect="bug", Story="story"),
+                                metrics=["metric"],
+                            ),
+                        )
+                    )
+                )
+            )
+        )
+
+    def test_mandatory_parameters(self):
+        """Test that the mandatory parameters without default value are indexed per source and metric type."""
+        self.assertEqual(["url"], self.index.mandatory_parameters("source", "metric"))
+        self.assertEqual(["url"], self.index.mandatory_parameters("source", "other_metric"))
+        self.assertEqual([], self.index.mandatory_parameters("source", "unknown_metric"))
+
+    def test_parameter(self):
+        """Test that the parameter properties can be looked up."""
+        parameter = self.index.parameter("source", "kind")
+        self.assertEqual("multiple_choice", parameter.type)
+        self.assertEqual(["Bug", "Defect", "Story"], parameter.values)
+        self.assertIn("Story", parameter.allowed_values)
+        self.assertEqual("", parameter.default_value)
+
+    def test_descriptions(self):
+        """Test that the first value with an API value describes the API value."""
+        self.assertEqual(dict(bug="Bug", story="Story"), self.index.parameter("source", "kind").descriptions)
+
+    def test_missing_parameter(self):
+        """Test that looking up a missing parameter raises a KeyError."""
+        self.assertRaises(KeyError, self.index.parameter, "source", "missing")
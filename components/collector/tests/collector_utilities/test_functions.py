@@ -1,9 +1,14 @@
 """Unit tests for the utility functions."""
 
+import os
+import tempfile
 import unittest
 from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock
 
-from collector_utilities.functions import days_ago, hashless, is_regexp, stable_traceback, tokenless
+from base_collectors.file_source_collector import FakeResponse
+from collector_utilities.functions import (
+    days_ago, hashless, is_regexp, memory_map, parse_source_response_xml_element, stable_traceback, tokenless)
 from collector_utilities.type import URL
 
 
@@ -99,3 +104,57 @@ class IsRegularExpressionTest(unittest.TestCase):
         self.assertTrue(is_regexp(".*"))
         self.assertTrue(is_regexp("bar?foo"))
         self.assertTrue(is_regexp("[a-z]+foo"))
+
+
+class ParseSourceResponseXMLElementTest(unittest.IsolatedAsyncioTestCase):
+    """Unit tests for the parse source response XML element function."""
+
+    XML = b"<report generated='2021'><sessioninfo dump='1'/><counter/>" + b"<counter/>" * 100_000 + b"</report>"
+
+    def setUp(self):
+        """Override to create a response with a large XML document."""
+        self.response = FakeResponse(self.XML)
+        self.response.close = Mock()
+
+    async def test_root(self):
+        """Test that the root element is returned if no tags are specified."""
+        self.assertEqual("2021", (await parse_source_response_xml_element(self.response)).get("generated"))
+
+    async def test_tag(self):
+        """Test that the first element with the tag is returned."""
+        self.assertEqual("1", (await parse_source_response_xml_element(self.response, ["sessioninfo"])).get("dump"))
+
+    async def test_stop_reading_after_element_is_found(self):
+        """Test that the response is closed as soon as the element has been found."""
+        await parse_source_response_xml_element(self.response)
+        self.response.close.assert_called_once()
+
+    async def test_missing_tag(self):
+        """Test that an exception is raised if the XML contains no element with the tag."""
+        with self.assertRaises(LookupError):
+            await parse_source_response_xml_element(FakeResponse(b"<report/>"), ["sessioninfo"])
+
+
+class FakeResponseTest(unittest.IsolatedAsyncioTestCase):
+    """Unit tests for fake responses with memory mapped contents."""
+
+    def setUp(self):
+        """Override to create a response with a memory mapped file."""
+        with tempfile.NamedTemporaryFile(delete=False) as file:
+            file.write('{"text": "café"}'.encode())
+        self.addCleanup(os.remove, file.name)
+        self.response = FakeResponse(memory_map(file.name))
+        self.addCleanup(self.response.close)
+
+    async def test_json(self):
+        """Test that the JSON is decoded from the memory mapped file."""
+        self.assertEqual(dict(text="café"), await self.response.json())
+
+    async def test_text(self):
+        """Test that the text is decoded from the memory mapped file."""
+        self.assertEqual('{"text": "café"}', await self.response.text())
+
+    def test_close(self):
+        """Test that closing the response closes the memory map."""
+        self.response.close()
+        self.assertTrue(self.response.contents.closed)
@@ -1,7 +1,13 @@
 """Unit tests for the SonarQube source."""
 
+import asyncio
+import itertools
 from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
 
+import aiohttp
+
+from base_collectors import MetricsCollector
 from source_model import Entity
 
 from ..source_collector_test_case import SourceCollectorTestCase
@@ -131,7 +137,7 @@ class SonarQubeMetricsTest(SonarQubeTestCase):
         response = await self.collect(
             metric,
             get_request_json_side_effect=[
-                {}, complex_units_json, functions_json, complex_units_json, functions_json, complex_units_json])
+                {}, functions_json, complex_units_json, complex_units_json])
         self.assert_measurement(
             response, value="2", total="4",
             landing_url=f"{self.issues_landing_url}&rules=csharpsquid:S1541,csharpsquid:S3776,flex:FunctionComplexity,"
@@ -188,7 +194,7 @@ class SonarQubeMetricsTest(SonarQubeTestCase):
         response = await self.collect(
             metric,
             get_request_json_side_effect=[
-                {}, many_parameters_json, functions_json, many_parameters_json, functions_json, many_parameters_json])
+                {}, functions_json, many_parameters_json, many_parameters_json])
         self.assert_measurement(
             response, value="2", total="4",
             landing_url=f"{self.issues_landing_url}&rules=c:S107,csharpsquid:S107,csharpsquid:S2436,cpp:S107,flex:S107,"
@@ -204,7 +210,7 @@ class SonarQubeMetricsTest(SonarQubeTestCase):
         metric = dict(type="long_units", addition="sum", sources=self.sources)
         response = await self.collect(
             metric, get_request_json_side_effect=[
-                {}, long_units_json, functions_json, long_units_json, functions_json, long_units_json])
+                {}, functions_json, long_units_json, long_units_json])
         self.assert_measurement(
             response, value="2", total="4",
             landing_url=f"{self.issues_landing_url}&rules=abap:S104,c:FileLoc,cpp:FileLoc,csharpsquid:S104,"
@@ -392,3 +398,61 @@ class SonarQubeSecurityWarningsTest(SonarQubeTestCase):
         response = await self.collect(metric, get_request_json_return_value=self.vulnerabilities_json)
         self.assert_measurement(
             response, value="2", total="100", entities=self.vulnerability_entities, landing_url=self.issues_landing_url)
+
+
+class SonarQubeRequestBatcherTest(SonarQubeTestCase):
+    """Unit tests for combining the SonarQube requests of different metrics."""
+
+    def setUp(self):
+        """Extend to add the metrics whose measures are combined."""
+        super().setUp()
+        self.metrics = [dict(type=metric_type, addition="sum", sources=self.sources) for metric_type in
+                        ("tests", "uncovered_lines")]
+        self.measures_json = dict(
+            component=dict(
+                measures=[
+                    dict(metric="tests", value="88"), dict(metric="uncovered_lines", value="10"),
+                    dict(metric="lines_to_cover", value="100")]))
+
+    async def collect_metrics(self, get):
+        """Collect the metrics, letting all source collectors prepare before any of them collects."""
+        with patch("aiohttp.ClientSession.get", get):
+            async with aiohttp.ClientSession() as session:
+                collector = MetricsCollector()
+                collector.data_model = self.data_model
+                collectors = [collector.source_collectors(session, metric) for metric in self.metrics]
+                await collector.prepare(*itertools.chain(*collectors))
+                return await asyncio.gather(
+                    *[collector.measure(metric, metric_collectors)
+                      for metric, metric_collectors in zip(self.metrics, collectors)])
+
+    async def test_measures_of_same_component_are_retrieved_once(self):
+        """Test that metrics of the same component share the component check and the measures request."""
+        response = AsyncMock()
+        response.json.return_value = self.measures_json
+        get = AsyncMock(return_value=response)
+        tests, uncovered_lines = await self.collect_metrics(AsyncMock(side_effect=get))
+        self.assert_measurement(tests, value="88", total="88")
+        self.assert_measurement(uncovered_lines, value="10", total="100")
+        self.assertEqual(2, get.call_count)
+        self.assertEqual(
+            "https://sonar/api/measures/component?component=id&"
+            "metricKeys=lines_to_cover,skipped_tests,test_errors,test_failures,tests,uncovered_lines&branch=master",
+            get.call_args.args[0])
+
+    async def test_fall_back_to_separate_requests(self):
+        """Test that the measures are retrieved per metric if the combined request fails."""
+        component_response, failed_response, measures_response = AsyncMock(), AsyncMock(), AsyncMock()
+        component_response.json.return_value = {}
+        failed_response.json.return_value = dict(errors=[dict(msg="The following metric keys are not found: tests")])
+        measures_response.json.return_value = self.measures_json
+
+        def get(url, **kwargs):  # pylint: disable=unused-argument
+            """Fail the combined request."""
+            if "/api/components/show" in url:
+                return component_response
+            return failed_response if "tests,uncovered_lines" in url else measures_response
+
+        tests, uncovered_lines = await self.collect_metrics(AsyncMock(side_effect=get))
+        self.assert_measurement(tests, value="88", total="88")
+        self.assert_measurement(uncovered_lines, value="10", total="100")
@@ -1,8 +1,12 @@
 """Unit tests for the Cobertura source."""
 
 import io
+import os
+import pathlib
+import tempfile
 import zipfile
 from datetime import datetime
+from unittest.mock import patch
 
 from tests.source_collectors.source_collector_test_case import SourceCollectorTestCase
 
@@ -43,3 +47,62 @@ class CoberturaTest(SourceCollectorTestCase):
             zipped_cobertura_report.writestr("covertura.xml", "<coverage lines-covered='4' lines-valid='6' />")
         response = await self.collect(metric, get_request_content=bytes_io.getvalue())
         self.assert_measurement(response, value="2", total="6")
+
+    async def test_local_file(self):
+        """Test that a report can be read from the local file system."""
+        with tempfile.TemporaryDirectory() as directory, patch.dict(os.environ, COLLECTOR_FILE_ROOT=directory):
+            path = pathlib.Path(directory) / "cobertura.xml"
+            path.write_text("<coverage lines-covered='4' lines-valid='6' />")
+            self.sources["source_id"]["parameters"]["url"] = path.as_uri()
+            metric = dict(type="uncovered_lines", sources=self.sources, addition="sum")
+            response = await self.collect(metric)
+        self.assert_measurement(response, value="2", total="6")
+
+    async def test_local_files_matching_glob_pattern(self):
+        """Test that all reports matching a glob pattern are read from the local file system."""
+        with tempfile.TemporaryDirectory() as directory, patch.dict(os.environ, COLLECTOR_FILE_ROOT=directory):
+            for index in range(2):
+                path = pathlib.Path(directory) / f"cobertura-{index}.xml"
+                path.write_text("<coverage lines-covered='4' lines-valid='6' />")
+            self.sources["source_id"]["parameters"]["url"] = f"{pathlib.Path(directory).as_uri()}/cobertura-*.xml"
+            metric = dict(type="uncovered_lines", sources=self.sources, addition="sum")
+            response = await self.collect(metric)
+        self.assert_measurement(response, value="4", total="12")
+
+    async def test_missing_local_file(self):
+        """Test that an error is returned if no local files match the url."""
+        with tempfile.TemporaryDirectory() as directory, patch.dict(os.environ, COLLECTOR_FILE_ROOT=directory):
+            self.sources["source_id"]["parameters"]["url"] = f"{pathlib.Path(directory).as_uri()}/*.xml"
+            metric = dict(type="uncovered_lines", sources=self.sources, addition="sum")
+            response = await self.collect(metric)
+        self.assert_measurement(response, value=None, connection_error="No files match")
+
+    async def test_local_files_disabled(self):
+        """Test that local files can't be read if no root directory is configured."""
+        with tempfile.TemporaryDirectory() as directory, patch.dict(os.environ, clear=True):
+            path = pathlib.Path(directory) / "cobertura.xml"
+            path.write_text("<coverage lines-covered='4' lines-valid='6' />")
+            self.sources["source_id"]["parameters"]["url"] = path.as_uri()
+            metric = dict(type="uncovered_lines", sources=self.sources, addition="sum")
+            response = await self.collect(metric)
+        self.assert_measurement(response, value=None, connection_error="Reading files is disabled")
+
+    async def test_local_file_outside_root_directory(self):
+        """Test that files outside the root directory can't be read."""
+        with tempfile.TemporaryDirectory() as directory, patch.dict(os.environ, COLLECTOR_FILE_ROOT=directory):
+            self.sources["source_id"]["parameters"]["url"] = f"{pathlib.Path(directory).as_uri()}/../../etc/passwd"
+            metric = dict(type="uncovered_lines", sources=self.sources, addition="sum")
+            response = await self.collect(metric)
+        self.assert_measurement(response, value=None, connection_error="is not in the directory")
+
+    async def test_symbolic_link_outside_root_directory(self):
+        """Test that files outside the root directory can't be read via symbolic links."""
+        with tempfile.TemporaryDirectory() as directory, patch.dict(os.environ, COLLECTOR_FILE_ROOT=directory):
+            with tempfile.TemporaryDirectory() as other_directory:
+                path = pathlib.Path(other_directory) / "cobertura.xml"
+                path.write_text("<coverage lines-covered='4' lines-valid='6' />")
+                (pathlib.Path(directory) / "link.xml").symlink_to(path)
+                self.sources["source_id"]["parameters"]["url"] = f"{pathlib.Path(directory).as_uri()}/*.xml"
+                metric = dict(type="uncovered_lines", sources=self.sources, addition="sum")
+                response = await self.collect(metric)
+        self.assert_measurement(response, value=None, connection_error="No files match")
@@ -46,6 +46,13 @@ class JaCoCoTest(SourceCollectorTestCase):
         expected_age = (datetime.utcnow() - datetime.utcfromtimestamp(1553821197.442)).days
         self.assert_measurement(response, value=str(expected_age))
 
+    async def test_source_up_to_dateness_without_session_info(self):
+        """Test that the source age is based on the epoch if the JaCoCo report has no session info."""
+        metric = dict(type="source_up_to_dateness", sources=self.sources, addition="sum")
+        response = await self.collect(metric, get_request_text="<report/>")
+        expected_age = (datetime.utcnow() - datetime.utcfromtimestamp(0)).days
+        self.assert_measurement(response, value=str(expected_age))
+
     async def test_zipped_report(self):
         """Test that a zipped report can be read."""
         self.sources["source_id"]["parameters"]["url"] = "https://jacoco.zip"
@@ -52,6 +52,28 @@ class RobotFrameworkTestReportTest(RobotFrameworkTestCase):
         expected_entities = [dict(key="s1-t1", name="Test 1", test_result="fail")]
         self.assert_measurement(response, value="1", total="2", entities=expected_entities, landing_url="report.html")
 
+    async def test_keyword_status_is_ignored(self):
+        """Test that the status of keywords does not influence the test result."""
+        xml = """<?xml version="1.0"?>
+        <robot>
+            <suite>
+                <test id="s1-t1" name="Test 1">
+                    <kw name="Keyword"><status status="FAIL"></status></kw>
+                    <status status="PASS"></status>
+                </test>
+            </suite>
+        </robot>"""
+        response = await self.collect(self.metric, get_request_text=xml)
+        expected_entities = [dict(key="s1-t1", name="Test 1", test_result="pass")]
+        self.assert_measurement(response, value="1", total="1", entities=expected_entities)
+
+    async def test_many_tests(self):
+        """Test that all tests are counted, but that the number of entities is limited."""
+        tests = "".join(f'<test id="t{index}" name="{index}"><status status="FAIL"/></test>' for index in range(150))
+        response = await self.collect(self.metric, get_request_text=f"<robot><suite>{tests}</suite></robot>")
+        self.assert_measurement(response, value="150", total="150")
+        self.assertEqual(100, len(response["sources"][0]["entities"]))
+
 
 class RobotFrameworkSourceUpToDatenessTest(RobotFrameworkTestCase):
     """Unit test for the source up-to-dateness metric."""
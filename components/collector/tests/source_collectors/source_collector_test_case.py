@@ -4,11 +4,12 @@ import json
 import logging
 import pathlib
 import unittest
-from unittest.mock import AsyncMock, PropertyMock, patch
+from unittest.mock import AsyncMock, Mock, PropertyMock, patch
 
 import aiohttp
 
 from base_collectors import MetricsCollector
+from base_collectors.file_source_collector import FakeStreamReader
 
 
 class SourceCollectorTestCase(unittest.IsolatedAsyncioTestCase):
@@ -65,6 +66,8 @@ class SourceCollectorTestCase(unittest.IsolatedAsyncioTestCase):
         mock_async_get_request.json.return_value = json_return_value
         mock_async_get_request.read.return_value = content
         mock_async_get_request.text.return_value = text
+        mock_async_get_request.content = FakeStreamReader(content or text.encode())
+        mock_async_get_request.close = Mock()
         type(mock_async_get_request).links = PropertyMock(return_value={}, side_effect=[links, {}] if links else None)
         return mock_async_get_request
 
@@ -73,6 +76,7 @@ class SourceCollectorTestCase(unittest.IsolatedAsyncioTestCase):
         """Create the mock post request."""
         mock_async_post_request = AsyncMock()
         mock_async_post_request.json.return_value = json_return_value
+        mock_async_post_request.close = Mock()
         return mock_async_post_request
 
     def assert_measurement(self, measurement, *, source_index: int = 0, **attributes) -> None:
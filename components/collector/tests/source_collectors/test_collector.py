@@ -6,6 +6,7 @@ from unittest.mock import Mock, patch
 import aiohttp
 
 from base_collectors import SourceCollector
+from collector_utilities.datamodel_index import DataModelIndex
 from collector_utilities.type import URL
 from source_model import SourceResponses
 
@@ -68,7 +69,7 @@ class CollectorTest(SourceCollectorTestCase):
 
         with patch("aiohttp.ClientSession.get", side_effect=Exception):
             async with aiohttp.ClientSession() as session:
-                response = await FailingLandingUrl(session, self.metric, {}).get()
+                response = await FailingLandingUrl(session, self.metric, DataModelIndex({})).get()
         self.assertEqual("https://api_url", response["landing_url"])
 
     async def test_default_parameter_value_supersedes_empty_string(self):
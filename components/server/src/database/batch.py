@@ -0,0 +1,71 @@
+"""Batches of report changes.
+
+Within a batch, the latest reports are read once and changes are made to this one in-memory copy of the reports.
+Instead of inserting a new version of a report for each change, the changed reports are collected and inserted once,
+when the batch ends. Writes that depend on the changed reports, such as new measurements for metrics whose target was
+changed, are deferred until the reports have been inserted. Batches are per thread, which under gevent means per
+greenlet, so a batch only affects the request that started it.
+"""
+
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from pymongo.database import Database
+
+from model.index import UUIDIndex
+from server_utilities.type import ReportId
+
+
+@dataclass
+class Batch:
+    """Report changes collected in a batch."""
+
+    database: Database
+    reports: List[Dict]  # The in-memory copy of the latest reports
+    index: Optional[UUIDIndex] = None  # The index of the reports, None if it needs to be rebuilt
+    changes: Dict[ReportId, Tuple[Dict, List[str]]] = field(default_factory=dict)  # Report uuid -> (report, uuids)
+    descriptions: List[str] = field(default_factory=list)  # The delta descriptions of the changes
+    deferred_writes: List[Callable[[], object]] = field(default_factory=list)
+
+    def add_change(self, description: str, *reports_and_uuids) -> None:
+        """Add the changed reports to the batch."""
+        self.descriptions.append(description)
+        for report, uuids in reports_and_uuids:
+            if not any(report is batch_report for batch_report in self.reports):
+                self.reports.append(report)  # The report is new, e.g. added or copied
+            changed_uuids = self.changes.setdefault(report["report_uuid"], (report, []))[1]
+            changed_uuids.extend(uuid for uuid in uuids if uuid not in changed_uuids)
+        self.index = None  # The change may have added, moved, or removed items
+
+    def latest_reports(self) -> List[Dict]:
+        """Return the in-memory copy of the latest reports, without reports deleted in the batch."""
+        return [report for report in self.reports if not report.get("deleted")]
+
+    def uuid_index(self) -> UUIDIndex:
+        """Return the index of the in-memory copy of the latest reports."""
+        if self.index is None:
+            self.index = UUIDIndex(self.latest_reports())
+        return self.index
+
+
+BATCHES = threading.local()
+
+
+def current_batch(database: Database) -> Optional[Batch]:
+    """Return the batch that collects the report changes of this thread, if any."""
+    batch = getattr(BATCHES, "batch", None)
+    return batch if batch is not None and batch.database is database else None
+
+
+@contextmanager
+def start_batch(database: Database, reports: List[Dict]) -> Iterator[Batch]:
+    """Start a batch that collects the report changes made to the reports in this thread."""
+    if current_batch(database):
+        raise RuntimeError("Batches can't be nested")
+    BATCHES.batch = Batch(database, reports)
+    try:
+        yield BATCHES.batch
+    finally:
+        BATCHES.batch = None
@@ -0,0 +1,110 @@
+"""Process-level cache for documents that are read often but change rarely, such as the reports and the data model.
+
+Each cached collection has a generation counter, stored in the generations collection, that is incremented whenever a
+new document is inserted in the collection. Cached values are valid as long as the generation of their collection is
+unchanged, so server processes don't need to notify each other of changes. Values read as of a date in the past never
+change, so they are cached without generation in a least recently used cache. The same holds for old versions of
+documents that need to be reconstructed, such as old versions of reports, which are cached by version id.
+
+The cached documents are stored pickled and each caller gets its own copy, so callers can change the documents without
+corrupting the cache. Unpickling is considerably faster than reading the documents from the database.
+"""
+
+import pickle  # nosec, the cache only contains documents read from the database by this process
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Final, Tuple, TypeVar, cast
+
+from pymongo.database import Database
+
+from server_utilities.functions import iso_timestamp
+
+
+MAX_PAST_VALUES: Final = 16  # Maximum number of values read as of a date in the past to keep
+MAX_VERSIONS: Final = 256  # Maximum number of reconstructed versions to keep
+Value = TypeVar("Value")
+
+
+class Cache:  # pylint: disable=too-few-public-methods
+    """Cached values of one database."""
+
+    def __init__(self) -> None:
+        self.latest: Dict[str, Tuple[Any, Any]] = {}  # Key -> (generation, value)
+        self.past: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()  # (key, timestamp) -> value
+        self.versions: "OrderedDict[str, Any]" = OrderedDict()  # Version id -> value
+
+
+CACHES: "weakref.WeakKeyDictionary[Database, Cache]" = weakref.WeakKeyDictionary()
+
+
+def generation(database: Database, collection: str):
+    """Return the generation of the collection."""
+    counter = database.generations.find_one({"_id": collection}) or {}
+    return counter.get("generation", 0)
+
+
+def bump_generation(database: Database, collection: str) -> None:
+    """Increment the generation of the collection, so cached values read from the collection are invalidated."""
+    database.generations.update_one({"_id": collection}, {"$inc": {"generation": 1}}, upsert=True)
+
+
+def cached(
+    database: Database, collection: str, read: Callable[[], Value], max_iso_timestamp: str = "", key: str = ""
+) -> Value:
+    """Return the value read from the collection, from the cache if possible.
+
+    If the maximum timestamp is in the past, the value is read as of that timestamp and cached in the least recently
+    used cache. Otherwise, the value is read as of now and cached until the generation of the collection changes. Use
+    the key to cache multiple values read from the same collection. Values from the cache are returned as copies.
+    """
+    cache = CACHES.setdefault(database, Cache())
+    key = key or collection
+    if max_iso_timestamp and max_iso_timestamp < iso_timestamp():
+        return _least_recently_used(cache.past, (key, max_iso_timestamp), read, MAX_PAST_VALUES)
+    read_values = []
+
+    def read_and_pickle() -> bytes:
+        """Read the value and keep it, so it doesn't have to be unpickled."""
+        read_values.append(read())
+        return pickle.dumps(read_values[0])
+
+    pickled_value = latest(database, collection, read_and_pickle, key)
+    return read_values[0] if read_values else cast(Value, pickle.loads(pickled_value))  # nosec
+
+
+def latest(database: Database, collection: str, read: Callable[[], Value], key: str = "") -> Value:
+    """Return the value read from the collection, from the cache if the generation of the collection is unchanged.
+
+    The value is not copied, so callers must not change it.
+    """
+    cache = CACHES.setdefault(database, Cache())
+    key = key or collection
+    # Get the generation before reading the value so a concurrent change results in a superfluous read on the next
+    # call, rather than in a stale value being cached under the new generation:
+    current_generation = generation(database, collection)
+    cached_generation, value = cache.latest.get(key, (None, None))
+    if key not in cache.latest or cached_generation != current_generation:
+        value = read()
+        cache.latest[key] = (current_generation, value)
+    return cast(Value, value)
+
+
+def cached_version(database: Database, version_id: str, reconstruct: Callable[[], Value]) -> Value:
+    """Return the reconstructed version of a document, from the cache if possible.
+
+    Old versions never change, so they are cached in a least recently used cache. Versions are returned as copies.
+    """
+    cache = CACHES.setdefault(database, Cache())
+    return _least_recently_used(cache.versions, version_id, reconstruct, MAX_VERSIONS)
+
+
+def _least_recently_used(lru_cache: "OrderedDict", key, read: Callable[[], Value], max_size: int) -> Value:
+    """Return the value from the least recently used cache, or read and cache the value if it's not in the cache."""
+    if key in lru_cache:
+        lru_cache.move_to_end(key)
+        return cast(Value, pickle.loads(lru_cache[key]))  # nosec
+    value = read()
+    lru_cache[key] = pickle.dumps(value)
+    if len(lru_cache) > max_size:
+        lru_cache.popitem(last=False)
+    return value
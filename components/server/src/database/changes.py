@@ -0,0 +1,50 @@
+"""Notification of report and measurement changes.
+
+The functions that insert new reports and new measurements notify the listeners of the changed reports, so that, for
+example, report streams can send events as soon as a report or the latest measurement of one of its metrics changes.
+MongoDB change streams would also catch changes made by other server processes, but they need a replica set, which
+Quality-time doesn't require. Listeners only receive notifications of changes made by this server process and should
+therefore still check for changes periodically as a fallback.
+"""
+
+import logging
+import weakref
+from typing import Callable, Dict, List
+
+from pymongo.database import Database
+
+from server_utilities.type import ReportId
+
+
+Listener = Callable[[], None]
+LISTENERS: "weakref.WeakKeyDictionary[Database, Dict[ReportId, List[Listener]]]" = weakref.WeakKeyDictionary()
+
+
+def add_listener(database: Database, report_uuid: ReportId, listener: Listener) -> None:
+    """Add a listener to be called when the report or the latest measurement of one of its metrics changes."""
+    LISTENERS.setdefault(database, {}).setdefault(report_uuid, []).append(listener)
+
+
+def remove_listener(database: Database, report_uuid: ReportId, listener: Listener) -> None:
+    """Remove the listener of the report."""
+    listeners = LISTENERS.get(database, {})
+    if listener in (report_listeners := listeners.get(report_uuid, [])):
+        report_listeners.remove(listener)
+    if not report_listeners:
+        listeners.pop(report_uuid, None)
+
+
+def has_listeners(database: Database) -> bool:
+    """Return whether there are listeners to changes in the database, so callers can skip work if there are none."""
+    return bool(LISTENERS.get(database))
+
+
+def notify(database: Database, *report_uuids: ReportId) -> None:
+    """Call the listeners of the changed reports."""
+    listeners = LISTENERS.get(database, {})
+    for report_uuid in report_uuids:
+        for listener in list(listeners.get(report_uuid, [])):
+            try:
+                listener()
+            except Exception:  # pylint: disable=broad-except
+                logging.exception("Notifying a listener of changes to report %s failed", report_uuid)
@@ -1,15 +1,24 @@
 """Data models collection."""
 
+from functools import partial
 from typing import Any, Dict
 
 import pymongo
 from pymongo.database import Database
 
+from model.datamodel_index import datamodel_index
 from server_utilities.functions import iso_timestamp
+from .cache import bump_generation, cached
 
 
 def latest_datamodel(database: Database, max_iso_timestamp: str = ""):
     """Return the latest data model."""
+    read_datamodel = partial(_read_latest_datamodel, database, max_iso_timestamp)
+    return cached(database, "datamodels", read_datamodel, max_iso_timestamp)
+
+
+def _read_latest_datamodel(database: Database, max_iso_timestamp: str):
+    """Read the latest data model from the data models collection."""
     timestamp_filter = dict(timestamp={"$lte": max_iso_timestamp}) if max_iso_timestamp else None
     if data_model := database.datamodels.find_one(timestamp_filter, sort=[("timestamp", pymongo.DESCENDING)]):
         data_model["_id"] = str(data_model["_id"])
@@ -21,21 +30,22 @@ def insert_new_datamodel(database: Database, data_model):
     if "_id" in data_model:  # pragma: no cover-behave
         del data_model["_id"]
     data_model["timestamp"] = iso_timestamp()
-    return database.datamodels.insert_one(data_model)
+    result = database.datamodels.insert_one(data_model)
+    bump_generation(database, "datamodels")
+    return result
 
 
-def default_source_parameters(database: Database, metric_type: str, source_type: str):
+def default_source_parameters(data_model, metric_type: str, source_type: str):
     """Return the source parameters with their default values for the specified metric."""
-    parameters = latest_datamodel(database)["sources"][source_type]["parameters"].items()
-    return {key: value["default_value"] for key, value in parameters if metric_type in value["metrics"]}
+    return datamodel_index(data_model).default_source_parameters(metric_type, source_type)
 
 
-def default_metric_attributes(database: Database, metric_type: str = ""):
+def default_metric_attributes(data_model, metric_type: str = ""):
     """Return the metric attributes with their default values for the specified metric type.
 
     If no metric type is specified, use the first one from the data model.
     """
-    metric_types = latest_datamodel(database)["metrics"]
+    metric_types = data_model["metrics"]
     if not metric_type:
         metric_type = list(metric_types.keys())[0]
     defaults = metric_types[metric_type]
@@ -45,9 +55,9 @@ def default_metric_attributes(database: Database, metric_type: str = ""):
         near_target=defaults["near_target"], tags=defaults["tags"])
 
 
-def default_subject_attributes(database: Database, subject_type: str = "") -> Dict[str, Any]:
+def default_subject_attributes(data_model, subject_type: str = "") -> Dict[str, Any]:
     """Return the default attributes for the subject."""
-    subject_types = latest_datamodel(database)["subjects"]
+    subject_types = data_model["subjects"]
     if not subject_type:
         subject_type = list(subject_types.keys())[0]
     defaults = subject_types[subject_type]
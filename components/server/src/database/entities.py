@@ -0,0 +1,67 @@
+"""Entities collection.
+
+Most entities of a measurement are identical to the entities of the previous measurement of the metric. To not store
+the same entities over and over again, entities are stored once in the entities collection, with a hash of their
+contents as id. The sources of measurements refer to their entities by hash, in the entity_hashes attribute. Sources of
+measurements stored before the entities collection was introduced still contain the entities themselves.
+
+Entities that are no longer referred to by any measurement are deliberately not removed. Finding them requires reading
+the entity hashes of all measurements, and removing an entity while a new measurement that refers to it is being
+stored would leave that measurement with a dangling hash. Because entities are shared between measurements and metrics,
+the collection grows with the number of distinct entities, not with the number of measurements.
+"""
+
+import json
+import logging
+from typing import Dict, Final, Iterable, List
+
+import pymongo
+from pymongo.database import Database
+
+from server_utilities.functions import md5_hash
+
+
+# Projection to read measurements without entities, whether they refer to their entities by hash or contain them. The
+# hash of the sources is left out as well, because it's internal and not meant for API output:
+WITHOUT_ENTITIES: Final = {"sources.entities": False, "sources.entity_hashes": False, "sources_hash": False}
+
+
+def entity_hash(entity: Dict) -> str:
+    """Return a hash of the contents of the entity."""
+    return md5_hash(json.dumps(entity, sort_keys=True))
+
+
+def store_entities(database: Database, sources: List[Dict]) -> List[Dict]:
+    """Store the entities of the sources and return copies of the sources that refer to their entities by hash."""
+    entities_by_hash: Dict[str, Dict] = {}
+    sources_with_entity_hashes = []
+    for source in sources:
+        source = source.copy()
+        if "entities" in source:
+            hashes = source["entity_hashes"] = []
+            for entity in source.pop("entities"):
+                hashes.append(hash_ := entity_hash(entity))
+                entities_by_hash[hash_] = entity
+        sources_with_entity_hashes.append(source)
+    if entities_by_hash:
+        database.entities.bulk_write(
+            [
+                pymongo.UpdateOne({"_id": hash_}, {"$setOnInsert": entity}, upsert=True)
+                for hash_, entity in entities_by_hash.items()
+            ],
+            ordered=False,
+        )
+    return sources_with_entity_hashes
+
+
+def load_entities(database: Database, measurements: Iterable[Dict]) -> None:
+    """Replace the entity hashes of the sources of the measurements with the entities, using one query."""
+    sources = [source for measurement in measurements for source in measurement.get("sources", [])]
+    entities: Dict[str, Dict] = {}
+    if hashes := {hash_ for source in sources for hash_ in source.get("entity_hashes", [])}:
+        entities = {entity.pop("_id"): entity for entity in database.entities.find({"_id": {"$in": sorted(hashes)}})}
+    if missing_hashes := hashes - entities.keys():
+        logging.warning("Entities with hashes %s are missing from the entities collection", sorted(missing_hashes))
+    for source in sources:
+        if "entity_hashes" in source:
+            source["entities"] = [entities[hash_].copy() for hash_ in source.pop("entity_hashes") if hash_ in entities]
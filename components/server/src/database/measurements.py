@@ -1,37 +1,88 @@
 """Measurements collection."""
 
+import json
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, cast
+from functools import partial
+from typing import Dict, Final, Iterable, Iterator, List, Optional, Tuple, cast
 
 import pymongo
+from bson import ObjectId
 from pymongo.database import Database
 
 from model.metric import Metric
-from model.queries import get_attribute_type, get_measured_attribute
-from server_utilities.functions import iso_timestamp, percentage
+from model.datamodel_index import datamodel_index
+from server_utilities.functions import iso_timestamp, md5_hash, percentage
 from server_utilities.type import MeasurementId, MetricId, Scale, Status, TargetType
+from . import changes, metric_state, rollups
+from .batch import current_batch
+from .entities import WITHOUT_ENTITIES, load_entities, store_entities
+from .reports import uuid_index
+from .write_behind import buffer_measurement_end, flush_measurement_ends
 
 
 def latest_measurement(database: Database, metric_uuid: MetricId):
     """Return the latest measurement."""
-    return database.measurements.find_one(filter={"metric_uuid": metric_uuid}, sort=[("start", pymongo.DESCENDING)])
+    latest = database.measurements.find_one(filter={"metric_uuid": metric_uuid}, sort=[("start", pymongo.DESCENDING)])
+    if latest:
+        load_entities(database, [latest])
+    return latest
+
+
+def latest_measurement_without_entities(database: Database, metric_uuid: MetricId):
+    """Return the latest measurement, without the entities."""
+    return database.measurements.find_one(
+        filter={"metric_uuid": metric_uuid},
+        sort=[("start", pymongo.DESCENDING)],
+        # The sources hash is needed to detect whether a new measurement is unchanged:
+        projection={key: value for key, value in WITHOUT_ENTITIES.items() if key != "sources_hash"},
+    )
 
 
 def latest_successful_measurement(database: Database, metric_uuid: MetricId):
-    """Return the latest successful measurement."""
+    """Return the latest successful measurement, without the entities."""
     return database.measurements.find_one(
-        filter={"metric_uuid": metric_uuid, "sources.value": {"$ne": None}}, sort=[("start", pymongo.DESCENDING)]
+        filter={"metric_uuid": metric_uuid, "sources.value": {"$ne": None}},
+        sort=[("start", pymongo.DESCENDING)],
+        projection=WITHOUT_ENTITIES,
     )
 
 
-def recent_measurements_by_metric_uuid(database: Database, max_iso_timestamp: str = "", days=7):
-    """Return all recent measurements."""
+def is_successful(measurement: Dict) -> bool:
+    """Return whether the measurement is successful, meaning it has sources and all sources have a value."""
+    return bool(measurement["sources"]) and all(source.get("value") is not None for source in measurement["sources"])
+
+
+def sources_hash(sources: List[Dict]) -> str:
+    """Return a hash of the sources, including their values, totals, errors, entities, and entity user data."""
+    return md5_hash(json.dumps(sources, sort_keys=True))
+
+
+def recent_measurements_by_metric_uuid(
+    database: Database, max_iso_timestamp: str = "", days=7, metric_uuids: Iterable[MetricId] = None
+):
+    """Return all recent measurements, or only those of the metrics with the specified uuids.
+
+    If the metric uuids are specified and the measurements of at most a week ago until now are needed, read the recent
+    measurements from the metric state collection and only read the measurements collection for metrics without state.
+    """
+    flush_measurement_ends(database)
+    if metric_uuids is not None and not max_iso_timestamp and days <= metric_state.SPARKLINE_DAYS:
+        uuids = set(metric_uuids)
+        state_measurements = metric_state.recent_measurements(database, uuids, days)
+        if uuids_without_state := uuids - set(state_measurements):
+            state_measurements.update(
+                recent_measurements_by_metric_uuid(database, iso_timestamp(), days, uuids_without_state)
+            )
+        return state_measurements
     max_iso_timestamp = max_iso_timestamp or iso_timestamp()
     min_iso_timestamp = (datetime.fromisoformat(max_iso_timestamp) - timedelta(days=days)).isoformat()
+    measurement_filter: Dict = {"end": {"$gte": min_iso_timestamp}, "start": {"$lte": max_iso_timestamp}}
+    if metric_uuids is not None:
+        measurement_filter["metric_uuid"] = {"$in": sorted(metric_uuids)}
     recent_measurements = database.measurements.find(
-        filter={"end": {"$gte": min_iso_timestamp}, "start": {"$lte": max_iso_timestamp}},
+        filter=measurement_filter,
         sort=[("start", pymongo.ASCENDING)],
-        projection={"_id": False, "sources.entities": False},
+        projection={"_id": False, **WITHOUT_ENTITIES},
     )
     measurements_by_metric_uuid: Dict[MetricId, List] = {}
     for measurement in recent_measurements:
@@ -44,22 +95,100 @@ def measurements_by_metric(
     *metric_uuids: MetricId,
     min_iso_timestamp: str = "",
     max_iso_timestamp: str = "",
-):
-    """Return all measurements for one metric, without the entities, except for the most recent one."""
+) -> Iterator[Dict]:
+    """Return all measurements for one metric, sorted by start, without the entities, except for the most recent one."""
+    flush_measurement_ends(database)
     measurement_filter: Dict = {"metric_uuid": {"$in": metric_uuids}}
     if min_iso_timestamp:
         measurement_filter["end"] = {"$gt": min_iso_timestamp}
     if max_iso_timestamp:
         measurement_filter["start"] = {"$lt": max_iso_timestamp}
     latest_with_entities = database.measurements.find_one(
-        measurement_filter, sort=[("start", pymongo.DESCENDING)], projection={"_id": False}
+        measurement_filter, sort=[("start", pymongo.DESCENDING)], projection={"_id": False, "sources_hash": False}
     )
     if not latest_with_entities:
-        return []
+        return
+    load_entities(database, [latest_with_entities])
     all_measurements_without_entities = database.measurements.find(
-        measurement_filter, projection={"_id": False, "sources.entities": False}
+        measurement_filter, sort=[("start", pymongo.ASCENDING)], projection={"_id": False, **WITHOUT_ENTITIES}
+    )
+    # Yield the measurements one behind, so the last one can be replaced by the latest measurement with entities:
+    previous_measurement = None
+    for measurement in all_measurements_without_entities:
+        if previous_measurement is not None:
+            yield previous_measurement
+        previous_measurement = measurement
+    yield latest_with_entities
+
+
+def measurements_of_metrics(
+    database: Database,
+    metric_uuids: Iterable[MetricId],
+    min_iso_timestamp: str,
+    max_iso_timestamp: str = "",
+    latest_with_entities: bool = False,
+) -> Dict[MetricId, List[Dict]]:
+    """Return the measurements of the metrics, without entities, grouped by metric uuid and sorted by start.
+
+    If latest with entities is true, the latest measurement of each metric includes the entities.
+    """
+    flush_measurement_ends(database)
+    measurement_filter: Dict = {"metric_uuid": {"$in": sorted(metric_uuids)}, "end": {"$gt": min_iso_timestamp}}
+    if max_iso_timestamp:
+        measurement_filter["start"] = {"$lt": max_iso_timestamp}
+    # Group the measurements here rather than in the database, so the groups aren't limited by the maximum document
+    # size and the memory limit of the aggregation pipeline:
+    measurements = database.measurements.find(
+        measurement_filter,
+        sort=[("metric_uuid", pymongo.ASCENDING), ("start", pymongo.ASCENDING)],
+        projection={"_id": False, **WITHOUT_ENTITIES},
+    )
+    measurements_by_metric_uuid: Dict[MetricId, List[Dict]] = {}
+    for measurement in measurements:
+        measurements_by_metric_uuid.setdefault(measurement["metric_uuid"], []).append(measurement)
+    if latest_with_entities and measurements_by_metric_uuid:
+        latest_measurements = database.measurements.aggregate(
+            [
+                {"$match": measurement_filter},
+                # Sort both keys descending so the (metric_uuid, start) index can be walked backwards:
+                {"$sort": {"metric_uuid": pymongo.DESCENDING, "start": pymongo.DESCENDING}},
+                {"$group": {"_id": "$metric_uuid", "latest": {"$first": "$$ROOT"}}},
+                {"$project": {"latest._id": False, "latest.sources_hash": False}},
+            ],
+            allowDiskUse=True,
+        )
+        latest_measurements_by_metric_uuid = {group["_id"]: group["latest"] for group in latest_measurements}
+        load_entities(database, latest_measurements_by_metric_uuid.values())
+        for metric_uuid, latest in latest_measurements_by_metric_uuid.items():
+            measurements_by_metric_uuid[metric_uuid][-1] = latest
+    return measurements_by_metric_uuid
+
+
+def measurements_page(
+    database: Database,
+    metric_uuid: MetricId,
+    limit: int,
+    after: Optional[Tuple[str, ObjectId]] = None,
+    max_iso_timestamp: str = "",
+) -> Iterator[Dict]:
+    """Return at most limit measurements of the metric, without the entities, sorted by start and id.
+
+    If after is given, only return the measurements after the measurement with that start and id. The measurement ids
+    are included so the caller can pass the start and id of the last measurement to get the next page.
+    """
+    flush_measurement_ends(database)
+    measurement_filter: Dict = {"metric_uuid": metric_uuid}
+    if max_iso_timestamp:
+        measurement_filter["start"] = {"$lt": max_iso_timestamp}
+    if after:
+        start, measurement_id = after
+        measurement_filter["$or"] = [{"start": {"$gt": start}}, {"start": start, "_id": {"$gt": measurement_id}}]
+    return database.measurements.find(
+        measurement_filter,
+        sort=[("start", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)],
+        limit=limit,
+        projection=WITHOUT_ENTITIES,
     )
-    return list(all_measurements_without_entities)[:-1] + [latest_with_entities]
 
 
 def count_measurements(database: Database) -> int:
@@ -67,15 +196,26 @@ def count_measurements(database: Database) -> int:
     return int(database.measurements.count_documents(filter={}))
 
 
-def update_measurement_end(database: Database, measurement_id: MeasurementId):
-    """Set the end date and time of the measurement to the current date and time."""
-    return database.measurements.update_one(filter={"_id": measurement_id}, update={"$set": {"end": iso_timestamp()}})
+def update_measurement_end(database: Database, measurement_id: MeasurementId, metric_uuid: MetricId) -> None:
+    """Set the end date and time of the measurement to the current date and time.
+
+    The update is buffered and written to the database later, together with other measurement end updates.
+    """
+    buffer_measurement_end(database, measurement_id, metric_uuid, iso_timestamp())
 
 
 def insert_new_measurement(
     database: Database, data_model, metric_data: Dict, measurement: Dict, previous_measurement: Dict
 ) -> Dict:
-    """Insert a new measurement."""
+    """Insert a new measurement.
+
+    If a batch of report changes is in progress, the measurement is inserted after the changed reports are inserted.
+    """
+    if batch := current_batch(database):
+        insert = partial(insert_new_measurement, database, data_model, metric_data, measurement, previous_measurement)
+        batch.deferred_writes.append(insert)
+        return dict(ok=True)
+    flush_measurement_ends(database)  # Make sure the end of the previous measurement is written before inserting
     if "_id" in measurement:
         del measurement["_id"]
     metric = Metric(data_model, metric_data)
@@ -92,8 +232,13 @@ def insert_new_measurement(
         for target in ("target", "near_target", "debt_target"):
             target_type = cast(TargetType, target)
             measurement[scale][target] = determine_target_value(metric, measurement, scale, target_type)
-    database.measurements.insert_one(measurement)
-    del measurement["_id"]
+    measurement["sources_hash"] = sources_hash(measurement["sources"])
+    database.measurements.insert_one(dict(measurement, sources=store_entities(database, measurement["sources"])))
+    metric_state.update_state(database, metric_type["scales"], measurement, previous_measurement)
+    rollups.update_rollups(database, metric_type["scales"], measurement)
+    if changes.has_listeners(database) and measurement["metric_uuid"] in (index := uuid_index(database)):
+        changes.notify(database, index.report_uuid(measurement["metric_uuid"]))
+    del measurement["sources_hash"]
     return measurement
 
 
@@ -125,10 +270,8 @@ def value_of_entities_to_ignore(data_model, metric: Metric, source) -> int:
         entity[0] for entity in entities if entity[1].get("status") in ("fixed", "false_positive", "wont_fix")
     ]
     source_type = metric.sources()[source["source_uuid"]]["type"]
-    if attribute := get_measured_attribute(data_model, metric.type(), source_type):
-        entity = data_model["sources"][source_type]["entities"].get(metric.type(), {})
-        attribute_type = get_attribute_type(entity, attribute)
-        convert = dict(float=float, integer=int, minutes=int)[attribute_type]
+    if measured_attribute := datamodel_index(data_model).measured_attribute(metric.type(), source_type):
+        attribute, convert = measured_attribute
         value = sum(convert(entity[attribute]) for entity in source["entities"] if entity["key"] in ignored_entities)
     else:
         value = len(ignored_entities)
@@ -0,0 +1,157 @@
+"""Metric state collection.
+
+The metric state collection contains one document per metric with the latest measurement of the metric, without
+entities, and a sparkline of the measurements before the latest one that ended in the last week. The sparkline holds at
+most SPARKLINE_MAX_POINTS measurements, so state documents and their updates stay small, even for metrics whose value
+changes often. The state is updated whenever a measurement is inserted or its end date changes, so the recent
+measurements of metrics can be read without reading the measurements collection.
+
+Inserting a measurement and updating the state are separate writes. If the state update fails, the state lags behind
+the measurements. Each state update therefore checks that the state contains the previous measurement of the metric as
+latest measurement, and rebuilds the state from the measurements collection if not.
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, Final, Iterable, List, Optional
+
+import pymongo
+from pymongo.database import Database
+
+from server_utilities.functions import iso_timestamp
+from server_utilities.type import MetricId
+from .entities import WITHOUT_ENTITIES
+
+
+SPARKLINE_DAYS: Final = 7  # The number of days of measurements before the latest one to keep
+SPARKLINE_MAX_POINTS: Final = 100  # The maximum number of measurements before the latest one to keep
+
+
+def recent_measurements(database: Database, metric_uuids: Iterable[MetricId], days: int = 7) -> Dict[MetricId, List]:
+    """Return the recent measurements of the metrics with the specified uuids, by metric uuid.
+
+    Metrics without state are not included in the result.
+    """
+    min_iso_timestamp = (datetime.fromisoformat(iso_timestamp()) - timedelta(days=days)).isoformat()
+    state_filter = {"metric_uuid": {"$in": sorted(metric_uuids)}}
+    measurements_by_metric_uuid: Dict[MetricId, List] = {}
+    for state in database.metric_state.find(state_filter, projection={"_id": False, "latest.sources_hash": False}):
+        measurements = state["sparkline"] + [state["latest"]]
+        measurements_by_metric_uuid[state["metric_uuid"]] = [m for m in measurements if m["end"] >= min_iso_timestamp]
+    return measurements_by_metric_uuid
+
+
+def latest_measurements(database: Database, metric_uuids: Iterable[MetricId]) -> Dict[MetricId, Dict]:
+    """Return the latest measurements of the metrics, without sources and end, by metric uuid.
+
+    The end of the latest measurement changes whenever the measurement is unchanged, so it's left out to have the
+    result change only when the latest measurements change.
+    """
+    state_filter = {"metric_uuid": {"$in": sorted(metric_uuids)}}
+    projection = dict.fromkeys(
+        ("_id", "end", "previous_status", "sparkline", "latest.sources", "latest.end", "latest.sources_hash"), False
+    )
+    return {state["metric_uuid"]: state["latest"] for state in database.metric_state.find(state_filter, projection)}
+
+
+def latest_measurement_end(database: Database, metric_uuids: Iterable[MetricId]) -> str:
+    """Return the most recent end date and time of the latest measurements of the metrics."""
+    state = database.metric_state.find_one(
+        {"metric_uuid": {"$in": sorted(metric_uuids)}}, sort=[("end", pymongo.DESCENDING)], projection={"end": True}
+    )
+    return str(state["end"]) if state else ""
+
+
+def update_state(database: Database, scales: Iterable[str], measurement: Dict, previous_measurement: Optional[Dict]):
+    """Make the measurement the latest measurement of the metric and add the previous measurement to the sparkline.
+
+    If the state doesn't have the previous measurement as latest measurement, rebuild the state from the measurements.
+    """
+    metric_uuid = measurement["metric_uuid"]
+    latest = dict(latest={"$literal": _without_entities(measurement)}, end=measurement["end"])
+    if not previous_measurement:
+        state = dict(latest=_without_entities(measurement), end=measurement["end"], previous_status={}, sparkline=[])
+        database.metric_state.update_one({"metric_uuid": metric_uuid}, {"$set": state}, upsert=True)
+        return
+    point = _sparkline_point(scales, previous_measurement)
+    min_end = _sparkline_start(measurement["end"])
+    # Add the point to the sparkline, remove the points that ended before the start of the sparkline, and keep at most
+    # the maximum number of points:
+    sparkline_filter = {
+        "$filter": {
+            "input": {"$concatArrays": [{"$ifNull": ["$sparkline", []]}, [{"$literal": point}]]},
+            "cond": {"$gte": ["$$this.end", min_end]},
+        }
+    }
+    sparkline = {"$slice": [sparkline_filter, -SPARKLINE_MAX_POINTS]}
+    previous_status = {"$literal": {scale: point[scale]["status"] for scale in scales}}
+    update = [{"$set": dict(latest, previous_status=previous_status, sparkline=sparkline)}]
+    state_filter = {"metric_uuid": metric_uuid, "latest.start": previous_measurement.get("start")}
+    if database.metric_state.update_one(state_filter, update).matched_count == 0:
+        rebuild_state(database, scales, metric_uuid)
+
+
+def update_state_ends(database: Database, ends: Dict[MetricId, str]) -> None:
+    """Set the end date and time of the latest measurement of the metrics, given as dict of metric uuid to end."""
+    database.metric_state.bulk_write(
+        [
+            pymongo.UpdateOne({"metric_uuid": metric_uuid}, {"$set": {"latest.end": end, "end": end}})
+            for metric_uuid, end in ends.items()
+        ],
+        ordered=False,
+    )
+
+
+def rebuild_state(database: Database, scales: Iterable[str], metric_uuid: MetricId) -> None:
+    """Rebuild the state of the metric from the measurements collection."""
+    projection = {"_id": False, **WITHOUT_ENTITIES}
+    measurement_filter = {"metric_uuid": metric_uuid, "end": {"$gte": _sparkline_start(iso_timestamp())}}
+    measurements = list(
+        database.measurements.find(
+            measurement_filter,
+            sort=[("start", pymongo.DESCENDING)],
+            projection=projection,
+            limit=SPARKLINE_MAX_POINTS + 1,  # The sparkline points plus the latest measurement
+        )
+    )
+    if not measurements:
+        latest = database.measurements.find_one(
+            {"metric_uuid": metric_uuid}, sort=[("start", pymongo.DESCENDING)], projection=projection
+        )
+        measurements = [latest] if latest else []
+    if measurements:
+        create_state(database, scales, measurements[::-1])
+
+
+def create_state(database: Database, scales: Iterable[str], measurements: List[Dict]) -> None:
+    """Create the state of a metric from its recent measurements, sorted from oldest to newest."""
+    sparkline = [_sparkline_point(scales, measurement) for measurement in measurements[:-1][-SPARKLINE_MAX_POINTS:]]
+    previous_status = {scale: sparkline[-1][scale]["status"] for scale in scales} if sparkline else {}
+    latest = measurements[-1]
+    state = dict(
+        latest=_without_entities(latest), end=latest["end"], previous_status=previous_status, sparkline=sparkline
+    )
+    database.metric_state.update_one({"metric_uuid": latest["metric_uuid"]}, {"$set": state}, upsert=True)
+
+
+def _sparkline_start(iso_timestamp_: str) -> str:
+    """Return the minimum end of the measurements in the sparkline of a metric with a latest measurement ending at the
+    timestamp."""
+    return (datetime.fromisoformat(iso_timestamp_) - timedelta(days=SPARKLINE_DAYS)).isoformat()
+
+
+def _sparkline_point(scales: Iterable[str], measurement: Dict) -> Dict:
+    """Return the parts of the measurement needed to draw a sparkline and to detect status changes."""
+    point = dict(start=measurement.get("start"), end=measurement.get("end"))
+    for scale in scales:
+        point[scale] = {key: measurement.get(scale, {}).get(key) for key in ("value", "status")}
+    return point
+
+
+def _without_entities(measurement: Dict) -> Dict:
+    """Return a copy of the measurement without id, sources hash, and without the entities of the sources."""
+    measurement = {key: value for key, value in measurement.items() if key not in ("_id", "sources_hash")}
+    measurement["sources"] = [
+        {key: value for key, value in source.items() if key not in ("entities", "entity_hashes")}
+        for source in measurement.get("sources", [])
+    ]
+    return measurement
@@ -1,17 +1,37 @@
-"""Reports collection."""
+"""Reports collection.
 
-from typing import Any, Dict, List, Union, cast
+Each change to a report results in a new version of the report in the reports collection. The last version of each
+report is stored in full. To save storage, the previous version is replaced by a JSON patch that changes the new
+version back into the previous version. Every SNAPSHOT_INTERVAL versions, the previous version is kept in full, as
+snapshot. Old versions are reconstructed by applying the patches, newest first, to the next full version. Report
+versions stored before patches were introduced are all full versions.
+"""
+
+from contextlib import contextmanager
+from datetime import date
+from functools import partial
+from typing import Any, Dict, Final, Iterator, List, Tuple, Union, cast
 
 import pymongo
 from pymongo.database import Database
 
+from model.index import UUIDIndex
 from server_utilities.functions import iso_timestamp, unique
+from server_utilities.json_patch import apply_json_patch, json_patch
 from server_utilities.type import Change, MetricId, ReportId, SubjectId
-from . import sessions
+from . import changes, metric_state, sessions
+from .batch import current_batch, start_batch
+from .cache import bump_generation, cached, cached_version, generation, latest
+from .datamodels import latest_datamodel
+from .write_behind import flush_measurement_ends
 
 
+SNAPSHOT_INTERVAL: Final = 20  # Keep every so many versions of a report in full
+# Attributes of report versions that are not part of the report contents and thus not patched:
+VERSION_ATTRIBUTES: Final = ("_id", "report_uuid", "timestamp", "delta", "deleted", "version", "last", "patch")
 # Sort order:
 TIMESTAMP_DESCENDING = [("timestamp", pymongo.DESCENDING)]
+VERSION_DESCENDING = [("version", pymongo.DESCENDING)]
 # Filters:
 DOES_EXIST = {"$exists": True}
 DOES_NOT_EXIST = {"$exists": False}
@@ -19,13 +39,27 @@ DOES_NOT_EXIST = {"$exists": False}
 
 def latest_reports(database: Database, max_iso_timestamp: str = ""):
     """Return the latest, undeleted, reports in the reports collection."""
+    if not max_iso_timestamp and (batch := current_batch(database)):
+        return batch.latest_reports()
+    return cached(database, "reports", partial(_read_latest_reports, database, max_iso_timestamp), max_iso_timestamp)
+
+
+def _read_latest_reports(database: Database, max_iso_timestamp: str):
+    """Read the latest, undeleted, reports from the reports collection."""
     if max_iso_timestamp and max_iso_timestamp < iso_timestamp():
-        report_filter = dict(deleted=DOES_NOT_EXIST, timestamp={"$lt": max_iso_timestamp})
-        report_uuids = database.reports.distinct("report_uuid", report_filter)
+        pipeline: List[Dict] = [
+            {"$match": {"timestamp": {"$lt": max_iso_timestamp}}},
+            # Sort in the reverse order of the (report_uuid, timestamp) index so the index can be used:
+            {"$sort": {"report_uuid": pymongo.DESCENDING, "timestamp": pymongo.DESCENDING}},
+            {"$group": {"_id": "$report_uuid", "report": {"$first": "$$ROOT"}}},
+            {"$replaceRoot": {"newRoot": "$report"}},
+            {"$match": {"deleted": DOES_NOT_EXIST}},
+        ]
         reports = []
-        for report_uuid in report_uuids:
-            report_filter["report_uuid"] = report_uuid
-            reports.append(database.reports.find_one(report_filter, sort=TIMESTAMP_DESCENDING))
+        for report in database.reports.aggregate(pipeline, allowDiskUse=True):
+            if "patch" in report:
+                report = cached_version(database, str(report["_id"]), partial(_reconstruct_report, database, report))
+            reports.append(report)
     else:
         reports = list(database.reports.find({"last": True, "deleted": DOES_NOT_EXIST}))
     for report in reports:
@@ -33,8 +67,35 @@ def latest_reports(database: Database, max_iso_timestamp: str = ""):
     return reports
 
 
+def _reconstruct_report(database: Database, report_patch: Dict) -> Dict:
+    """Reconstruct the version of the report from the next full version of the report and the patches in between."""
+    version = report_patch["version"]
+    next_snapshot_version = (version // SNAPSHOT_INTERVAL + 1) * SNAPSHOT_INTERVAL
+    versions = {"$gte": version, "$lte": next_snapshot_version}
+    version_filter = dict(report_uuid=report_patch["report_uuid"], version=versions)
+    report: Dict = {}
+    for report_version in database.reports.find(version_filter, sort=VERSION_DESCENDING):
+        if "patch" in report_version:
+            apply_json_patch(report, report_version["patch"])
+        else:
+            report = _report_contents(report_version)
+    report.update((key, value) for key, value in report_patch.items() if key != "patch")
+    return report
+
+
+def _report_contents(report: Dict) -> Dict:
+    """Return the contents of the report version, without the version attributes."""
+    return {key: value for key, value in report.items() if key not in VERSION_ATTRIBUTES}
+
+
 def latest_reports_overview(database: Database, max_iso_timestamp: str = "") -> Dict:
     """Return the latest reports overview."""
+    read_overview = partial(_read_latest_reports_overview, database, max_iso_timestamp)
+    return cached(database, "reports_overviews", read_overview, max_iso_timestamp)
+
+
+def _read_latest_reports_overview(database: Database, max_iso_timestamp: str) -> Dict:
+    """Read the latest reports overview from the reports overviews collection."""
     timestamp_filter = dict(timestamp={"$lt": max_iso_timestamp}) if max_iso_timestamp else None
     overview = database.reports_overviews.find_one(timestamp_filter, sort=TIMESTAMP_DESCENDING)
     if overview:
@@ -42,19 +103,68 @@ def latest_reports_overview(database: Database, max_iso_timestamp: str = "") ->
     return overview or {}
 
 
-def report_exists(database: Database, report_uuid: ReportId):
-    """Return whether a report with the specified report uuid exists."""
-    return report_uuid in database.reports.distinct("report_uuid")
+def uuid_index(database: Database) -> UUIDIndex:
+    """Return the index of the uuids in the latest reports."""
+    if batch := current_batch(database):
+        return batch.uuid_index()
+    return latest(database, "reports", lambda: UUIDIndex(latest_reports(database)), key="uuid_index")
+
+
+def reports_version(database: Database, max_iso_timestamp: str, report_uuid: ReportId = None) -> Tuple:
+    """Return values that change whenever the reports, as of the timestamp, or the measurements of the metrics change.
+
+    If a report uuid is given, only the measurements of the metrics in that report are taken into account. Reports and
+    measurements as of a date in the past don't change, so the measurements need not be checked then. The current date
+    is part of the version because metric statuses depend on the date, e.g. when technical debt expires.
+    """
+    flush_measurement_ends(database)
+    collections = ("datamodels", "reports", "reports_overviews")
+    generations = tuple(generation(database, collection) for collection in collections)
+    if max_iso_timestamp:
+        return (max_iso_timestamp,) + generations
+    metric_uuids = uuid_index(database).metric_uuids(report_uuid)
+    return (date.today().isoformat(), metric_state.latest_measurement_end(database, metric_uuids)) + generations
+
+
+def report_state(database: Database, report_uuid: ReportId) -> Dict:
+    """Return the timestamp and version of the report and the latest measurements of its metrics.
+
+    The state changes when the report is changed or when the latest measurement of one of its metrics changes.
+    """
+    metric_uuids = uuid_index(database).metric_uuids(report_uuid)
+    return dict(
+        report=report_versions(database).get(report_uuid, {}),
+        metrics=metric_state.latest_measurements(database, metric_uuids),
+    )
+
+
+def report_versions(database: Database) -> Dict[ReportId, Dict]:
+    """Return the timestamp and version of the latest reports, by report uuid."""
+
+    def read_report_versions() -> Dict[ReportId, Dict]:
+        """Read the timestamp and version of the latest reports."""
+        return {
+            report["report_uuid"]: dict(timestamp=report.get("timestamp"), version=report.get("version"))
+            for report in latest_reports(database)
+        }
+
+    return latest(database, "reports", read_report_versions, key="report_versions")
+
+
+def latest_data(database: Database) -> Tuple[Dict, List[Dict], UUIDIndex]:
+    """Return the latest data model, the latest reports, and the index of the reports, to create report data with."""
+    return latest_datamodel(database), latest_reports(database), uuid_index(database)
 
 
 def latest_metric(database: Database, metric_uuid: MetricId):
     """Return the latest metric with the specified metric uuid."""
-    for report in latest_reports(database):
-        for subject in report.get("subjects", {}).values():
-            metrics = subject.get("metrics", {})
-            if metric_uuid in metrics:
-                return metrics[metric_uuid]
-    return None
+    if metric_uuid not in (index := uuid_index(database)):
+        return None
+    report_uuid, subject_uuid = index.path(metric_uuid)[:2]
+    report_filter = dict(report_uuid=report_uuid, last=True, deleted=DOES_NOT_EXIST)
+    projection = {"_id": False, f"subjects.{subject_uuid}.metrics.{metric_uuid}": True}
+    report = database.reports.find_one(report_filter, projection=projection) or {}
+    return report.get("subjects", {}).get(subject_uuid, {}).get("metrics", {}).get(metric_uuid)
 
 
 def metrics_of_subject(database: Database, subject_uuid: SubjectId) -> List[MetricId]:
@@ -67,22 +177,79 @@ def metrics_of_subject(database: Database, subject_uuid: SubjectId) -> List[Metr
 
 
 def insert_new_report(database: Database, delta_description: str, *reports_and_uuids) -> Dict[str, Any]:
-    """Insert one or more new reports in the reports collection."""
-    _prepare_documents_for_insertion(database, delta_description, *reports_and_uuids, last=True)
+    """Insert one or more new reports in the reports collection and replace the previous versions by patches.
+
+    If a batch is in progress, the reports are added to the batch instead, to be inserted when the batch ends.
+    """
+    if batch := current_batch(database):
+        batch.add_change(delta_description, *reports_and_uuids)
+        return dict(ok=True)
     reports = [report for report, uuids in reports_and_uuids]
     report_uuids = [report["report_uuid"] for report in reports]
-    database.reports.update_many({"report_uuid": {"$in": report_uuids}, "last": DOES_EXIST}, {"$unset": {"last": ""}})
+    previous_reports = database.reports.find({"report_uuid": {"$in": report_uuids}, "last": True})
+    previous_versions = {previous_report["report_uuid"]: previous_report for previous_report in previous_reports}
+    previous_ids = [previous_version["_id"] for previous_version in previous_versions.values()]
+    patches = []
+    for report in reports:
+        previous_version = previous_versions.get(report["report_uuid"], {})
+        version = previous_version.get("version", 0)
+        if version % SNAPSHOT_INTERVAL:
+            report_patch = _report_patch(previous_version, report)
+            patches.append(pymongo.ReplaceOne({"_id": previous_version["_id"]}, report_patch))
+        report["version"] = version + 1
+    _prepare_documents_for_insertion(database, delta_description, *reports_and_uuids, last=True)
+    # Insert the new versions before replacing the previous versions by patches, so that if a write fails, each report
+    # still has a full version marked as last:
     if len(reports) > 1:
         database.reports.insert_many(reports, ordered=False)
     else:
         database.reports.insert(reports[0])
+    if previous_ids:
+        database.reports.update_many({"_id": {"$in": previous_ids}}, {"$unset": {"last": ""}})
+    if patches:
+        database.reports.bulk_write(patches, ordered=False)
+    bump_generation(database, "reports")
+    changes.notify(database, *report_uuids)
     return dict(ok=True)
 
 
+@contextmanager
+def batched_report_changes(database: Database) -> Iterator[None]:
+    """Collect the report changes made in the context and insert each changed report once when the context ends.
+
+    If an exception occurs in the context, no changes are written. The delta descriptions of the changes are combined
+    into one delta description.
+    """
+    with start_batch(database, latest_reports(database)) as batch:
+        yield
+    if batch.changes:
+        insert_new_report(database, _combined_description(batch.descriptions), *batch.changes.values())
+    for deferred_write in batch.deferred_writes:
+        deferred_write()
+
+
+def _combined_description(descriptions: List[str]) -> str:
+    """Combine the delta descriptions, that each start with the {user} placeholder, into one description."""
+    if len(descriptions) == 1:
+        return descriptions[0]
+    changes = [description.removeprefix("{user} ").removesuffix(".") for description in descriptions]
+    return f"{{user}} made {len(changes)} changes: " + "; ".join(changes) + "."
+
+
+def _report_patch(previous_version: Dict, report: Dict) -> Dict:
+    """Return the previous version of the report as patch that changes the report into the previous version."""
+    report_patch = {key: value for key, value in previous_version.items() if key in VERSION_ATTRIBUTES}
+    del report_patch["_id"]  # The _id of a document can't be replaced
+    report_patch.pop("last", None)
+    report_patch["patch"] = json_patch(_report_contents(report), _report_contents(previous_version))
+    return report_patch
+
+
 def insert_new_reports_overview(database: Database, delta_description: str, reports_overview) -> Dict[str, Any]:
     """Insert a new reports overview in the reports overview collection."""
     _prepare_documents_for_insertion(database, delta_description, (reports_overview, []))
     database.reports_overviews.insert(reports_overview)
+    bump_generation(database, "reports_overviews")
     return dict(ok=True)
 
 
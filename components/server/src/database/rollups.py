@@ -0,0 +1,116 @@
+"""Rollups collection.
+
+The rollups collection contains the measurement history of metrics downsampled to periods of an hour, a day, and a
+week. Each rollup document summarizes the measurements of one metric that started in one period: per scale, the
+minimum, maximum, and last value, and the last status. Rollups are updated incrementally when measurements are inserted
+or their end date changes, so trend graphs can be drawn without reading all measurements of a metric.
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, Final, Iterable, List, Optional, Union
+
+import pymongo
+from pymongo.database import Database
+
+from server_utilities.type import MetricId
+
+
+# The rollup periods, from fine to coarse:
+PERIODS: Final = dict(hour=timedelta(hours=1), day=timedelta(days=1), week=timedelta(weeks=1))
+
+
+def period_start(period: str, iso_timestamp: str) -> str:
+    """Return the start of the period that contains the timestamp."""
+    timestamp = datetime.fromisoformat(iso_timestamp).replace(minute=0, second=0, microsecond=0)
+    if period in ("day", "week"):
+        timestamp = timestamp.replace(hour=0)
+    if period == "week":
+        timestamp -= timedelta(days=timestamp.weekday())
+    return timestamp.isoformat()
+
+
+def coarsest_adequate_period(min_iso_timestamp: str, max_iso_timestamp: str, nr_points: int) -> str:
+    """Return the coarsest period that still results in at least the number of points for the time window."""
+    window = datetime.fromisoformat(max_iso_timestamp) - datetime.fromisoformat(min_iso_timestamp)
+    adequate_periods = [period for period, duration in PERIODS.items() if window / duration >= nr_points]
+    return adequate_periods[-1] if adequate_periods else "hour"
+
+
+def update_rollups(database: Database, scales: Iterable[str], measurement: Dict) -> None:
+    """Add the new measurement to the rollups of its metric."""
+    metric_uuid = measurement["metric_uuid"]
+    # The new measurement is the latest measurement of the metric, so it determines the end of the rollups it's added
+    # to. Remove the latest flag from the other rollups so update_rollups_ends() only changes the rollups updated here:
+    requests: List[Union[pymongo.UpdateMany, pymongo.UpdateOne]] = [
+        pymongo.UpdateMany({"metric_uuid": metric_uuid, "latest": True}, {"$unset": {"latest": ""}})
+    ]
+    for period in PERIODS:
+        rollup_filter = dict(metric_uuid=metric_uuid, period=period, start=period_start(period, measurement["start"]))
+        requests.append(pymongo.UpdateOne(rollup_filter, _rollup_update(scales, measurement), upsert=True))
+    database.rollups.bulk_write(requests, ordered=True)
+
+
+def update_rollups_ends(database: Database, ends: Dict[MetricId, str]) -> None:
+    """Set the end of the rollups containing the latest measurement of the metrics, given as metric uuid to end dict."""
+    database.rollups.bulk_write(
+        [
+            pymongo.UpdateMany({"metric_uuid": metric_uuid, "latest": True}, {"$set": {"end": end}})
+            for metric_uuid, end in ends.items()
+        ],
+        ordered=False,
+    )
+
+
+def create_rollups(database: Database, scales: Iterable[str], measurements: Iterable[Dict]) -> None:
+    """Create the rollups of a metric from its measurements, sorted from oldest to newest."""
+    rollups: Dict[str, Dict[str, Dict]] = {period: {} for period in PERIODS}
+    latest: Optional[Dict] = None
+    for latest in measurements:
+        for period, rollups_of_period in rollups.items():
+            start = period_start(period, latest["start"])
+            rollup = rollups_of_period.setdefault(start, dict(metric_uuid=latest["metric_uuid"], period=period))
+            rollup.update(start=start, end=latest["end"])
+            for scale in scales:
+                _add_to_rollup(rollup.setdefault(scale, {}), latest.get(scale, {}))
+    if latest is None:
+        return
+    for rollups_of_period in rollups.values():
+        rollups_of_period[max(rollups_of_period)]["latest"] = True
+    documents = [rollup for rollups_of_period in rollups.values() for rollup in rollups_of_period.values()]
+    database.rollups.insert_many(documents)
+
+
+def rollups_by_metric(
+    database: Database, metric_uuid: MetricId, period: str, min_iso_timestamp: str, max_iso_timestamp: str
+) -> List[Dict]:
+    """Return the rollups of the metric for the period that overlap with the time window, sorted by start."""
+    rollup_filter = {
+        "metric_uuid": metric_uuid,
+        "period": period,
+        "start": {"$lt": max_iso_timestamp},
+        "end": {"$gt": min_iso_timestamp},
+    }
+    return list(
+        database.rollups.find(
+            rollup_filter, sort=[("start", pymongo.ASCENDING)], projection={"_id": False, "latest": False}
+        )
+    )
+
+
+def _rollup_update(scales: Iterable[str], measurement: Dict) -> Dict:
+    """Return the update to add the measurement to a rollup."""
+    update: Dict[str, Dict] = {"$set": dict(end=measurement["end"], latest=True), "$min": {}, "$max": {}}
+    for scale in scales:
+        value = measurement.get(scale, {}).get("value")
+        update["$set"].update({f"{scale}.value": value, f"{scale}.status": measurement.get(scale, {}).get("status")})
+        if value is not None:
+            update["$min"][f"{scale}.min"] = update["$max"][f"{scale}.max"] = float(value)
+    return {operator: fields for operator, fields in update.items() if fields}
+
+
+def _add_to_rollup(rollup_scale: Dict, measurement_scale: Dict) -> None:
+    """Add the scale of the measurement to the scale of the rollup."""
+    rollup_scale.update(value=(value := measurement_scale.get("value")), status=measurement_scale.get("status"))
+    if value is not None:
+        rollup_scale["min"] = min(rollup_scale.get("min", float(value)), float(value))
+        rollup_scale["max"] = max(rollup_scale.get("max", float(value)), float(value))
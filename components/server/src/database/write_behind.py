@@ -0,0 +1,107 @@
+"""Write-behind buffer for measurement end updates.
+
+Most measurements posted by the collector are unchanged. The only effect of an unchanged measurement is that the end
+date and time of the latest measurement of the metric moves to now. Rather than writing each of these updates to the
+database right away, each server process buffers them, keeping only the most recent end per measurement. The buffer is
+written to the database with bulk writes when it's full, when the flush interval has passed since the first update was
+buffered, when the server process exits, and before reads that need exact end dates and times. Callers that read the
+end of measurements or insert new measurements need to flush the buffer first. If writing the buffer fails, the updates
+are put back in the buffer, so the next flush retries them.
+"""
+
+import atexit
+import logging
+import threading
+import weakref
+from typing import Dict, Final, Optional, Tuple
+
+import pymongo
+from pymongo.database import Database
+
+from server_utilities.type import MeasurementId, MetricId
+from . import metric_state, rollups
+
+
+FLUSH_INTERVAL: Final = 1.0  # Maximum number of seconds an update is buffered
+MAX_BUFFERED_UPDATES: Final = 500  # Maximum number of updates buffered
+
+
+class MeasurementEndBuffer:  # pylint: disable=too-few-public-methods
+    """Buffered measurement end updates of one database."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()  # Serializes flushes so newer ends aren't overwritten by older ones
+        self.ends: Dict[MeasurementId, Tuple[MetricId, str]] = {}  # Measurement id -> (metric uuid, end)
+        self.timer: Optional[threading.Timer] = None
+
+
+BUFFERS: "weakref.WeakKeyDictionary[Database, MeasurementEndBuffer]" = weakref.WeakKeyDictionary()
+
+
+def buffer_measurement_end(database: Database, measurement_id: MeasurementId, metric_uuid: MetricId, end: str) -> None:
+    """Buffer the update of the end date and time of the measurement."""
+    buffer = BUFFERS.setdefault(database, MeasurementEndBuffer())
+    with buffer.lock:
+        buffer.ends[measurement_id] = (metric_uuid, end)
+        full = len(buffer.ends) >= MAX_BUFFERED_UPDATES
+        if not full:
+            _start_timer(database, buffer)
+    if full:
+        flush_measurement_ends(database)
+
+
+def _start_timer(database: Database, buffer: MeasurementEndBuffer) -> None:
+    """Start the timer that flushes the buffer after the flush interval, if it's not running. Assumes the buffer lock
+    is held."""
+    if buffer.timer is None:
+        buffer.timer = threading.Timer(FLUSH_INTERVAL, flush_measurement_ends, args=(database,))
+        buffer.timer.daemon = True
+        buffer.timer.start()
+
+
+def flush_measurement_ends(database: Database) -> None:
+    """Write the buffered measurement end updates to the database."""
+    if (buffer := BUFFERS.get(database)) is None:
+        return
+    with buffer.flush_lock:
+        with buffer.lock:
+            ends, buffer.ends = buffer.ends, {}
+            if buffer.timer is not None:
+                buffer.timer.cancel()
+                buffer.timer = None
+        if not ends:
+            return
+        try:
+            write_measurement_ends(database, ends)
+        except Exception:  # pylint: disable=broad-except
+            logging.exception("Writing %d buffered measurement end updates failed", len(ends))
+            with buffer.lock:
+                # Updates buffered during the failed write may be newer than the ones put back, so keep the newest:
+                for measurement_id, (metric_uuid, end) in ends.items():
+                    if measurement_id not in buffer.ends or buffer.ends[measurement_id][1] < end:
+                        buffer.ends[measurement_id] = (metric_uuid, end)
+                _start_timer(database, buffer)
+
+
+def write_measurement_ends(database: Database, ends: Dict[MeasurementId, Tuple[MetricId, str]]) -> None:
+    """Write the measurement ends to the measurements, and to the metric states and rollups of the metrics."""
+    database.measurements.bulk_write(
+        [
+            pymongo.UpdateOne({"_id": measurement_id}, {"$set": {"end": end}})
+            for measurement_id, (_, end) in ends.items()
+        ],
+        ordered=False,
+    )
+    metric_ends: Dict[MetricId, str] = {}
+    for metric_uuid, end in ends.values():
+        metric_ends[metric_uuid] = max(end, metric_ends.get(metric_uuid, end))
+    metric_state.update_state_ends(database, metric_ends)
+    rollups.update_rollups_ends(database, metric_ends)
+
+
+@atexit.register
+def flush_all_measurement_ends() -> None:  # pragma: no cover-behave
+    """Write the buffered measurement end updates of all databases to the database."""
+    for database in list(BUFFERS.keys()):
+        flush_measurement_ends(database)
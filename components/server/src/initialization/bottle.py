@@ -9,6 +9,7 @@ from routes.plugins import AuthPlugin, InjectionPlugin
 # pylint: disable=unused-import
 from routes import (  # lgtm [py/unused-import]
     auth,
+    batch,
     changelog,
     datamodel,
     documentation,
@@ -6,7 +6,13 @@ import os
 import pymongo  # pylint: disable=wrong-import-order
 from pymongo.database import Database
 
+from database.cache import bump_generation
+from database.datamodels import latest_datamodel
+from database.metric_state import rebuild_state
+from database.rollups import create_rollups
+
 from .datamodel import import_datamodel
+from .indexes import reconcile_indexes
 from .report import import_example_reports, initialize_reports_overview
 
 
@@ -21,7 +27,7 @@ def init_database() -> Database:  # pragma: no cover-behave
     nr_reports = database.reports.count_documents({})
     nr_measurements = database.measurements.count_documents({})
     logging.info("Database has %d report documents and %d measurement documents", nr_reports, nr_measurements)
-    create_indexes(database)
+    reconcile_indexes(database)
     import_datamodel(database)
     initialize_reports_overview(database)
     if os.environ.get("LOAD_EXAMPLE_REPORTS", "True").lower() == "true":
@@ -29,16 +35,12 @@ def init_database() -> Database:  # pragma: no cover-behave
     add_last_flag_to_reports(database)
     rename_ready_user_story_points_metric(database)
     rename_teams_webhook_notification_destination(database)
+    create_metric_states(database)
+    create_metric_rollups(database)
+    bump_generation(database, "reports")  # The migrations above may have changed reports without inserting new ones
     return database
 
 
-def create_indexes(database: Database) -> None:
-    """Create any indexes."""
-    database.datamodels.create_index("timestamp")
-    database.reports.create_index("timestamp")
-    database.measurements.create_index("start")
-
-
 def add_last_flag_to_reports(database: Database) -> None:
     """Add last flag to all reports."""
     # Introduced when the most recent version of Quality-time was 2.5.2.
@@ -84,3 +86,36 @@ def rename_teams_webhook_notification_destination(database: Database) -> None:
             report_id = report["_id"]
             del report["_id"]
             database.reports.replace_one({"_id": report_id}, report)
+
+
+def create_metric_states(database: Database) -> None:
+    """Create the state of metrics that have measurements, but no state yet."""
+    # Introduced when the most recent version of Quality-time was 3.17.1.
+    data_model = latest_datamodel(database)
+    metric_uuids_with_state = set(database.metric_state.distinct("metric_uuid"))
+    for report in database.reports.find({"last": True, "deleted": {"$exists": False}}):
+        for subject in report["subjects"].values():
+            for metric_uuid, metric in subject["metrics"].items():
+                if metric_uuid not in metric_uuids_with_state:
+                    scales = data_model.get("metrics", {}).get(metric["type"], {}).get("scales", ["count"])
+                    rebuild_state(database, scales, metric_uuid)
+
+
+def create_metric_rollups(database: Database) -> None:
+    """Create the rollups of metrics that have measurements, but no rollups yet."""
+    # Introduced when the most recent version of Quality-time was 3.17.1.
+    data_model = latest_datamodel(database)
+    metric_uuids_with_rollups = set(database.rollups.distinct("metric_uuid"))
+    for report in database.reports.find({"last": True, "deleted": {"$exists": False}}):
+        for subject in report["subjects"].values():
+            for metric_uuid, metric in subject["metrics"].items():
+                if metric_uuid in metric_uuids_with_rollups:
+                    continue
+                # Pass the cursor, so the measurements are streamed instead of read into memory all at once:
+                measurements = database.measurements.find(
+                    {"metric_uuid": metric_uuid},
+                    sort=[("start", pymongo.ASCENDING)],
+                    projection={"_id": False, "sources": False, "delta": False},
+                )
+                scales = data_model.get("metrics", {}).get(metric["type"], {}).get("scales", ["count"])
+                create_rollups(database, scales, measurements)
@@ -0,0 +1,66 @@
+"""Database indexes.
+
+The indexes are defined per collection. On startup, the indexes in the database are reconciled with the definitions:
+missing indexes are created, indexes whose definition changed are recreated, and indexes that are no longer defined
+are dropped.
+"""
+
+import logging
+from typing import Dict, Final, List
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.collection import Collection
+from pymongo.database import Database
+
+
+INDEXES: Final[Dict[str, List[IndexModel]]] = dict(
+    datamodels=[IndexModel("timestamp", background=True)],
+    measurements=[
+        IndexModel("start", background=True),
+        IndexModel([("metric_uuid", ASCENDING), ("start", ASCENDING)], background=True),
+        IndexModel("delta.uuids", background=True),
+    ],
+    metric_state=[IndexModel("metric_uuid", unique=True, background=True)],
+    reports=[
+        IndexModel("timestamp", background=True),
+        IndexModel([("report_uuid", ASCENDING), ("timestamp", ASCENDING)], background=True),
+        IndexModel([("report_uuid", ASCENDING), ("version", ASCENDING)], background=True),
+        IndexModel("last", background=True),
+        IndexModel("delta.uuids", background=True),
+    ],
+    reports_overviews=[IndexModel("timestamp", background=True)],
+    rollups=[
+        IndexModel(
+            [("metric_uuid", ASCENDING), ("period", ASCENDING), ("start", ASCENDING)], unique=True, background=True
+        )
+    ],
+    sessions=[IndexModel("session_id", background=True), IndexModel("user", background=True)],
+)
+
+
+def reconcile_indexes(database: Database) -> None:
+    """Reconcile the indexes in the database with the index definitions."""
+    for collection_name, indexes in INDEXES.items():
+        reconcile_collection_indexes(getattr(database, collection_name), indexes)
+
+
+def reconcile_collection_indexes(collection: Collection, indexes: List[IndexModel]) -> None:
+    """Reconcile the indexes of the collection with the index definitions."""
+    existing_indexes = collection.index_information()
+    defined_indexes = {index.document["name"]: index.document for index in indexes}
+    for name, existing_index in list(existing_indexes.items()):
+        if name == "_id_":
+            continue  # The _id index can't be dropped
+        if name not in defined_indexes or not same_index(existing_index, defined_indexes[name]):
+            logging.info("Dropping index %s of collection %s", name, collection.name)
+            collection.drop_index(name)
+            del existing_indexes[name]
+    if missing_indexes := [index for index in indexes if index.document["name"] not in existing_indexes]:
+        logging.info("Creating %d indexes for collection %s", len(missing_indexes), collection.name)
+        collection.create_indexes(missing_indexes)
+
+
+def same_index(existing_index: Dict, defined_index: Dict) -> bool:
+    """Return whether the existing index has the same keys and uniqueness as the defined index."""
+    same_keys = [tuple(key) for key in existing_index["key"]] == list(defined_index["key"].items())
+    return same_keys and existing_index.get("unique", False) == defined_index.get("unique", False)
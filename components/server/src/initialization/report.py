@@ -3,11 +3,17 @@
 import json
 import logging
 import pathlib
+from typing import Dict, Iterable
 
 from pymongo.database import Database
 
-from database.datamodels import default_metric_attributes, default_source_parameters, default_subject_attributes
-from database.reports import insert_new_report, insert_new_reports_overview, latest_reports_overview, report_exists
+from database.datamodels import (
+    default_metric_attributes,
+    default_source_parameters,
+    default_subject_attributes,
+    latest_datamodel,
+)
+from database.reports import insert_new_report, insert_new_reports_overview, latest_reports_overview
 from server_utilities.functions import uuid
 
 
@@ -25,50 +31,79 @@ def initialize_reports_overview(database: Database) -> None:
         )  # pragma: no cover-behave
 
 
-def import_report(database: Database, filename: pathlib.Path) -> None:
-    """Read the report and store it in the database."""
+def import_reports(database: Database, *filenames: pathlib.Path) -> None:
+    """Read the reports and store the ones that aren't in the database yet."""
     # The coverage measurement of the behave feature tests is unstable. Most of the time it reports the last two lines
     # as covered, sometimes not. It's unclear why. To prevent needless checking of the coverage report coverage
     # measurement of the last two lines and the if-statement has been turned off.
-    with filename.open() as json_report:
-        imported_report = json.load(json_report)
-    if report_exists(database, imported_report["report_uuid"]):  # pragma: no-cover behave
-        logging.info("Skipping import of %s; it already exists", filename)
+    existing_report_uuids = set(database.reports.distinct("report_uuid"))
+    imported_reports = []
+    for filename in filenames:
+        with filename.open() as json_report:
+            imported_report = json.load(json_report)
+        if imported_report["report_uuid"] in existing_report_uuids:  # pragma: no-cover behave
+            logging.info("Skipping import of %s; it already exists", filename)
+        else:
+            imported_reports.append(imported_report)  # pragma: no cover-behave
+            logging.info("Importing report %s", filename)  # pragma: no cover-behave
+    if imported_reports:
+        import_json_reports(database, imported_reports)
+
+
+def import_json_reports(database: Database, imported_reports: Iterable[Dict]) -> Dict:
+    """Store the reports given as json in the database, with one insert.
+
+    The data model is read once and used to check the types of the subjects, metrics, and sources, and to add the
+    default attributes and parameters. Raise a ValueError if the reports contain a type that the data model lacks.
+    """
+    data_model = latest_datamodel(database)
+    reports_to_store = [_report_to_store(data_model, imported_report) for imported_report in imported_reports]
+    if not reports_to_store:
+        raise ValueError("There are no reports to import")
+    if len(reports_to_store) == 1:
+        delta_description = "{user} imported a new report."
     else:
-        import_json_report(database, imported_report)  # pragma: no cover-behave
-        logging.info("Report %s imported", filename)  # pragma: no cover-behave
+        delta_description = f"{{user}} imported {len(reports_to_store)} new reports."
+    reports_and_uuids = [(report, [report["report_uuid"]]) for report in reports_to_store]
+    return insert_new_report(database, delta_description, *reports_and_uuids)
 
 
-def import_json_report(database: Database, imported_report):
-    """ Store the report given as json in the database. """
+def _report_to_store(data_model, imported_report: Dict) -> Dict:
+    """Return the report to store, given the imported report."""
     report_to_store = dict(
         title=imported_report.get("title", "Example report"), report_uuid=imported_report["report_uuid"], subjects={}
     )
     for imported_subject in imported_report.get("subjects", []):
-        subject_to_store = default_subject_attributes(database, imported_subject["type"])
+        _check_type(data_model, "subject", imported_subject["type"])
+        subject_to_store = default_subject_attributes(data_model, imported_subject["type"])
         subject_to_store["metrics"] = {}  # Remove default metrics
         subject_to_store["name"] = imported_subject["name"]
         report_to_store["subjects"][uuid()] = subject_to_store
         for imported_metric in imported_subject.get("metrics", []):
-            metric_to_store = default_metric_attributes(database, imported_metric["type"])
+            _check_type(data_model, "metric", imported_metric["type"])
+            metric_to_store = default_metric_attributes(data_model, imported_metric["type"])
             metric_to_store.update(imported_metric)
             metric_to_store["sources"] = {}  # Sources in the example report json are lists, we transform them to dicts
             subject_to_store["metrics"][uuid()] = metric_to_store
             for imported_source in imported_metric.get("sources", []):
+                _check_type(data_model, "source", imported_source["type"])
                 source_to_store = metric_to_store["sources"][uuid()] = imported_source
                 source_parameters = default_source_parameters(
-                    database, imported_metric["type"], imported_source["type"]
+                    data_model, imported_metric["type"], imported_source["type"]
                 )
                 for key, value in source_parameters.items():
                     if key not in source_to_store["parameters"]:
                         source_to_store["parameters"][key] = value
-    return insert_new_report(
-        database, "{{user}} imported a new report", (report_to_store, report_to_store["report_uuid"])
-    )
+    return report_to_store
+
+
+def _check_type(data_model, item: str, item_type: str) -> None:
+    """Raise a ValueError if the data model doesn't contain the type of the subject, metric, or source."""
+    if item_type not in data_model[f"{item}s"]:
+        raise ValueError(f"The {item} type '{item_type}' does not exist")
 
 
 def import_example_reports(database: Database) -> None:
     """Import the example reports."""
     example_reports_path = pathlib.Path(__file__).resolve().parent.parent / "data" / "example-reports"
-    for filename in example_reports_path.glob("example-report*.json"):
-        import_report(database, filename)
+    import_reports(database, *sorted(example_reports_path.glob("example-report*.json")))
@@ -0,0 +1,76 @@
+"""Index of the data model."""
+
+from collections import OrderedDict
+from typing import Callable, Dict, Final, FrozenSet, Optional, Tuple, Union
+
+
+MAX_INDEXES: Final = 4  # Maximum number of data model versions to keep an index for
+Converter = Callable[[str], Union[int, float]]
+CONVERTERS: Final[Dict[str, Converter]] = dict(float=float, integer=int, minutes=int)
+
+
+class DataModelIndex:
+    """Lookups in the data model that would otherwise need walks of the data model JSON.
+
+    The index is built once per data model version. Source parameters that aren't in the data model, for example
+    because they were removed from the data model, are considered to be passwords to err on the safe side.
+    """
+
+    def __init__(self, data_model) -> None:
+        self.__parameter_keys: Dict[str, FrozenSet[str]] = {}
+        self.__password_parameters: Dict[str, FrozenSet[str]] = {}
+        self.__default_parameters: Dict[Tuple[str, str], Dict[str, str]] = {}
+        self.__measured_attributes: Dict[Tuple[str, str], Tuple[str, Converter]] = {}
+        for source_type, source in data_model.get("sources", {}).items():
+            parameters = source.get("parameters", {})
+            self.__parameter_keys[source_type] = frozenset(parameters)
+            self.__password_parameters[source_type] = frozenset(
+                key for key, parameter in parameters.items() if str(parameter.get("type")) == "password"
+            )
+            for key, parameter in parameters.items():
+                for metric_type in parameter.get("metrics", []):
+                    default_parameters = self.__default_parameters.setdefault((source_type, metric_type), {})
+                    default_parameters[key] = parameter.get("default_value")
+            for metric_type, entity in source.get("entities", {}).items():
+                if attribute := entity.get("measured_attribute"):
+                    attribute_types = {attr["key"]: attr.get("type", "text") for attr in entity.get("attributes", [])}
+                    convert = CONVERTERS.get(attribute_types.get(attribute, "text"), float)
+                    self.__measured_attributes[(metric_type, source_type)] = (str(attribute), convert)
+
+    def is_password_parameter(self, source_type: str, parameter_key: str) -> bool:
+        """Return whether the parameter of the source type is a password."""
+        return parameter_key in self.__password_parameters[source_type] or (
+            parameter_key not in self.__parameter_keys[source_type]
+        )
+
+    def default_source_parameters(self, metric_type: str, source_type: str) -> Dict[str, str]:
+        """Return the source parameters with their default values for the specified metric."""
+        return dict(self.__default_parameters.get((source_type, metric_type), {}))
+
+    def measured_attribute(self, metric_type: str, source_type: str) -> Optional[Tuple[str, Converter]]:
+        """Return the attribute of the entities of a source that are measured in the context of a metric, together with
+        the function that converts attribute values to numbers. For example, when using Jira as source for user story
+        points, the points of user stories (the source entities) are summed to arrive at the total number of user
+        story points."""
+        return self.__measured_attributes.get((metric_type, source_type))
+
+
+INDEXES: "OrderedDict[Tuple[str, str], DataModelIndex]" = OrderedDict()  # (Data model id, timestamp) -> index
+
+
+def datamodel_index(data_model) -> DataModelIndex:
+    """Return the index of the data model, built once per data model version.
+
+    Data model versions are identified by their id and timestamp. Data models without id or timestamp, that haven't
+    been read from the database, are indexed on each call.
+    """
+    if not (data_model.get("_id") and data_model.get("timestamp")):
+        return DataModelIndex(data_model)
+    version = (str(data_model["_id"]), str(data_model["timestamp"]))
+    if version in INDEXES:
+        INDEXES.move_to_end(version)
+        return INDEXES[version]
+    index = INDEXES[version] = DataModelIndex(data_model)
+    if len(INDEXES) > MAX_INDEXES:
+        INDEXES.popitem(last=False)
+    return index
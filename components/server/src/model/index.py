@@ -0,0 +1,59 @@
+"""Index of the reports by uuid."""
+
+from typing import Dict, List, Tuple, cast
+
+from server_utilities.type import MetricId, ReportId, SourceId, SubjectId
+
+
+class UUIDIndex:
+    """Map the uuids of reports, subjects, metrics, sources, and notification destinations to their containing path.
+
+    The path of an item is the tuple of the uuids of the report, subject, metric and source containing it, ending with
+    the uuid of the item itself. So the path of a source is (report uuid, subject uuid, metric uuid, source uuid) and
+    the path of a notification destination is (report uuid, notification destination uuid).
+    """
+
+    def __init__(self, reports) -> None:
+        self.__paths: Dict[str, Tuple[str, ...]] = {}
+        self.__metric_uuids: Dict[ReportId, List[MetricId]] = {}
+        for report in reports:
+            report_path = (report["report_uuid"],)
+            self.__paths[report["report_uuid"]] = report_path
+            report_metric_uuids = self.__metric_uuids.setdefault(report["report_uuid"], [])
+            for destination_uuid in report.get("notification_destinations", {}):
+                self.__paths[destination_uuid] = report_path + (destination_uuid,)
+            for subject_uuid, subject in report.get("subjects", {}).items():
+                subject_path = report_path + (subject_uuid,)
+                self.__paths[subject_uuid] = subject_path
+                for metric_uuid, metric in subject.get("metrics", {}).items():
+                    metric_path = subject_path + (metric_uuid,)
+                    self.__paths[metric_uuid] = metric_path
+                    report_metric_uuids.append(metric_uuid)
+                    for source_uuid in metric.get("sources", {}):
+                        self.__paths[source_uuid] = metric_path + (source_uuid,)
+
+    def __contains__(self, uuid: str) -> bool:
+        """Return whether the uuid is in the index."""
+        return uuid in self.__paths
+
+    def path(self, uuid: str) -> Tuple[str, ...]:
+        """Return the path of the item with the uuid. Raise a KeyError if the uuid is not in the index."""
+        return self.__paths[uuid]
+
+    def metric_uuids(self, report_uuid: ReportId = None) -> List[MetricId]:
+        """Return the uuids of the metrics in the report, or in all reports if no report uuid is given."""
+        if report_uuid:
+            return self.__metric_uuids.get(report_uuid, [])
+        return [metric_uuid for metric_uuids in self.__metric_uuids.values() for metric_uuid in metric_uuids]
+
+    def report_uuid(self, uuid: str) -> ReportId:
+        """Return the uuid of the report containing the item with the uuid."""
+        return cast(ReportId, self.__paths[uuid][0])
+
+    def subject_uuid(self, uuid: str) -> SubjectId:
+        """Return the uuid of the subject containing the metric or source with the uuid."""
+        return cast(SubjectId, self.__paths[uuid][1])
+
+    def metric_uuid(self, uuid: SourceId) -> MetricId:
+        """Return the uuid of the metric containing the source with the uuid."""
+        return cast(MetricId, self.__paths[uuid][2])
@@ -2,6 +2,15 @@
 
 from typing import Iterator
 
+from server_utilities.type import MetricId
+
+
+def metric_uuids(reports) -> Iterator[MetricId]:
+    """Return all metric uuids in the reports."""
+    for report in reports:
+        for subject in report.get("subjects", {}).values():
+            yield from subject.get("metrics", {}).keys()
+
 
 def sources(reports) -> Iterator:
     """Return all sources in the reports."""
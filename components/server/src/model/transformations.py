@@ -7,14 +7,15 @@ from server_utilities.functions import unique
 from server_utilities.type import Color, EditScope, ItemId, Status
 
 from .iterators import sources as iter_sources
-from .queries import is_password_parameter
+from .datamodel_index import datamodel_index
 
 
 def hide_credentials(data_model, *reports) -> None:
     """Hide the credentials in the reports."""
+    index = datamodel_index(data_model)
     for source in iter_sources(reports):
         for parameter_key, parameter_value in source.get("parameters", {}).items():
-            if parameter_value and is_password_parameter(data_model, source["type"], parameter_key):
+            if parameter_value and index.is_password_parameter(source["type"], parameter_key):
                 source["parameters"][parameter_key] = "this string replaces credentials"
 
 
@@ -0,0 +1,54 @@
+"""Batch route."""
+
+import re
+from typing import Dict, List
+
+import bottle
+from pymongo.database import Database
+
+from database.reports import batched_report_changes
+
+
+# The modules with the routes that can be used in a batch:
+BATCH_ROUTE_MODULES = ("routes.metric", "routes.notification", "routes.report", "routes.source", "routes.subject")
+# Paths can refer to results of earlier operations, e.g. "/api/v3/metric/{0.new_metric_uuid}/attribute/name":
+RESULT_REFERENCE = re.compile(r"\{(\d+)\.(\w+)\}")
+
+
+@bottle.post("/api/v3/batch")
+def post_batch(database: Database):
+    """Apply a list of operations to the reports and insert each changed report once.
+
+    Each operation has a method (POST or DELETE), a path of one of the report, subject, metric, source, or notification
+    routes, and optionally a body. The operations are applied in order, with the same semantics as the routes, to one
+    copy of the latest reports. If an operation fails, none of the changes are written.
+    """
+    operations = dict(bottle.request.json)["operations"]
+    results: List[Dict] = []
+    request_json = bottle.request.json
+    try:
+        with batched_report_changes(database):
+            for index, operation in enumerate(operations):
+                results.append(_apply_operation(database, index, operation, results))
+    finally:
+        bottle.request.environ["bottle.request.json"] = request_json
+    return dict(ok=True, results=results)
+
+
+def _apply_operation(database: Database, index: int, operation: Dict, results: List[Dict]):
+    """Apply the operation by calling the route callback that matches the operation's method and path."""
+    method = str(operation.get("method", "POST")).upper()
+    try:
+        path = RESULT_REFERENCE.sub(lambda match: str(results[int(match[1])][match[2]]), operation["path"])
+        route, url_args = bottle.default_app().router.match(dict(REQUEST_METHOD=method, PATH_INFO=path))
+    except (bottle.HTTPError, IndexError, KeyError):
+        bottle.abort(400, f"Operation {index} has an invalid method or path: {method} {operation.get('path')}")
+    if method not in ("POST", "DELETE") or route.callback.__module__ not in BATCH_ROUTE_MODULES:
+        bottle.abort(400, f"Operation {index} can't be used in a batch: {method} {path}")
+    bottle.request.environ["bottle.request.json"] = operation.get("body", {})
+    try:
+        return route.callback(database=database, **url_args)
+    except bottle.HTTPError:
+        raise
+    except Exception as reason:  # pylint: disable=broad-except
+        bottle.abort(400, f"Operation {index} failed: {method} {path}: {reason!r}")
@@ -1,10 +1,21 @@
-"""Data model routes."""
+"""Data model routes.
+
+Besides the whole data model, the data model is served as a compact index and as fragments per metric type and per
+source type, so clients can get the parts they need. Each response has an ETag, so clients can revalidate their copy.
+Responses for a data model version requested explicitly, with the version from the index as query parameter, never
+change and can be cached for a long time.
+"""
+
+from typing import Final
 
 import bottle
 from pymongo.database import Database
 
 from database.datamodels import latest_datamodel
-from server_utilities.functions import md5_hash, report_date_time
+from server_utilities.functions import check_etag, md5_hash, report_date_time
+
+
+IMMUTABLE: Final = "public, max-age=31536000, immutable"  # Cache-Control header for a requested data model version
 
 
 @bottle.get("/api/v3/datamodel")
@@ -12,8 +23,57 @@ def get_data_model(database: Database):
     """Return the data model."""
     data_model = latest_datamodel(database, report_date_time())
     if data_model:
-        md5 = md5_hash(data_model['timestamp'])
-        if "W/" + md5 == bottle.request.headers.get("If-None-Match"):  # pylint: disable=no-member
-            bottle.abort(304)  # Data model unchanged
-        bottle.response.set_header("ETag", md5)
+        check_data_model_version(data_model)
     return data_model
+
+
+@bottle.get("/api/v3/datamodel/index")
+def get_data_model_index(database: Database):
+    """Return a compact index of the data model, with the names of the metric types and the source types."""
+    data_model = latest_datamodel(database, report_date_time())
+    if not data_model:
+        return {}
+    check_data_model_version(data_model, "index")
+    return dict(
+        _id=data_model["_id"],
+        timestamp=data_model["timestamp"],
+        version=data_model_version(data_model),
+        scales=data_model["scales"],
+        subjects=data_model["subjects"],
+        metrics={metric_type: dict(name=metric["name"]) for metric_type, metric in data_model["metrics"].items()},
+        sources={source_type: dict(name=source["name"]) for source_type, source in data_model["sources"].items()},
+    )
+
+
+@bottle.get("/api/v3/datamodel/metrics/<metric_type>")
+def get_data_model_metric(metric_type: str, database: Database):
+    """Return the metric type from the data model."""
+    return _data_model_fragment(database, "metrics", metric_type)
+
+
+@bottle.get("/api/v3/datamodel/sources/<source_type>")
+def get_data_model_source(source_type: str, database: Database):
+    """Return the source type from the data model."""
+    return _data_model_fragment(database, "sources", source_type)
+
+
+def _data_model_fragment(database: Database, kind: str, item_type: str):
+    """Return the metric or source type from the data model. Abort with 404 if the data model doesn't contain it."""
+    data_model = latest_datamodel(database, report_date_time())
+    if item_type not in data_model.get(kind, {}):
+        return bottle.abort(404, f"The data model does not contain {kind} type '{item_type}'")
+    check_data_model_version(data_model, kind, item_type)
+    return data_model[kind][item_type]
+
+
+def data_model_version(data_model) -> str:
+    """Return the version of the data model."""
+    return md5_hash(data_model["timestamp"])
+
+
+def check_data_model_version(data_model, *fragment: str) -> None:
+    """Set the cache headers for the data model (fragment) and abort with 304 if the client's version matches."""
+    version = data_model_version(data_model)
+    requested_version = dict(bottle.request.query).get("version")
+    bottle.response.set_header("Cache-Control", IMMUTABLE if requested_version == version else "no-cache")
+    check_etag(version, *fragment)
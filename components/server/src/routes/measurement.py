@@ -1,29 +1,46 @@
 """Measurement routes."""
 
+import base64
+import json
 import logging
-import time
-from datetime import date
-from typing import Dict, Iterator, cast
+import weakref
+from datetime import date, datetime, timedelta
+from functools import partial
+from typing import Dict, Iterable, Iterator, Tuple, cast
 
 import bottle
+from bson import ObjectId
+from bson.errors import InvalidId
 from pymongo.database import Database
 
 from database import sessions
 from database.datamodels import latest_datamodel
 from database.measurements import (
     measurements_by_metric,
+    measurements_of_metrics,
+    measurements_page,
     count_measurements,
     insert_new_measurement,
+    is_successful,
     latest_measurement,
+    latest_measurement_without_entities,
     latest_successful_measurement,
+    sources_hash,
     update_measurement_end,
 )
-from database.reports import latest_metric, latest_reports
+from database.reports import latest_data, latest_metric
+from database.rollups import coarsest_adequate_period, rollups_by_metric
+from database.write_behind import flush_measurement_ends
 from model.data import SourceData
-from server_utilities.functions import report_date_time
+from server_utilities.broadcaster import Broadcaster
+from server_utilities.functions import iso_timestamp, report_date_time, sse_pack
 from server_utilities.type import MetricId, SourceId
 
 
+NR_MEASUREMENTS_INTERVAL = 10  # Number of seconds between counts of the measurements for the nr_measurements stream
+NR_MEASUREMENTS_BROADCASTERS: "weakref.WeakKeyDictionary[Database, Broadcaster[int]]" = weakref.WeakKeyDictionary()
+
+
 @bottle.post("/internal-api/v3/measurements")
 def post_measurement(database: Database) -> Dict:
     """Put the measurement in the database."""
@@ -32,13 +49,18 @@ def post_measurement(database: Database) -> Dict:
     if not (metric := latest_metric(database, metric_uuid)):  # pylint: disable=superfluous-parens
         return dict(ok=False)  # Metric does not exist, must've been deleted while being measured
     data_model = latest_datamodel(database)
-    if latest := latest_measurement(database, metric_uuid):
-        latest_successful = latest_successful_measurement(database, metric_uuid)
+    if latest := latest_measurement_without_entities(database, metric_uuid):
+        if is_successful(latest):
+            latest_successful = latest
+        else:
+            latest_successful = latest_successful_measurement(database, metric_uuid)
         latest_sources = latest_successful["sources"] if latest_successful else latest["sources"]
         copy_entity_user_data(latest_sources, measurement["sources"])
-        if not debt_target_expired(data_model, metric, latest) and latest["sources"] == measurement["sources"]:
+        # Measurements inserted before sources hashes were introduced have no hash and are considered to be different
+        unchanged = latest.get("sources_hash") == sources_hash(measurement["sources"])
+        if unchanged and not debt_target_expired(data_model, metric, latest):
             # If the new measurement is equal to the previous one, merge them together
-            update_measurement_end(database, latest["_id"])
+            update_measurement_end(database, latest["_id"], metric_uuid)
             return dict(ok=True)
     return insert_new_measurement(database, data_model, metric, measurement, latest)
 
@@ -81,7 +103,8 @@ def set_entity_attribute(
     metric_uuid: MetricId, source_uuid: SourceId, entity_key: str, attribute: str, database: Database
 ) -> Dict:
     """Set an entity attribute."""
-    data = SourceData(latest_datamodel(database), latest_reports(database), source_uuid)
+    data_model, reports, index = latest_data(database)
+    data = SourceData(data_model, reports, index, source_uuid)
     old_measurement = latest_measurement(database, metric_uuid)
     new_measurement = old_measurement.copy()
     source = [s for s in new_measurement["sources"] if s["source_uuid"] == source_uuid][0]
@@ -100,11 +123,6 @@ def set_entity_attribute(
     return insert_new_measurement(database, data.datamodel, data.metric, new_measurement, old_measurement)
 
 
-def sse_pack(event_id: int, event: str, data: int, retry: str = "2000") -> str:
-    """Pack data in Server-Sent Events (SSE) format."""
-    return f"retry: {retry}\nid: {event_id}\nevent: {event}\ndata: {data}\n\n"
-
-
 @bottle.get("/api/v3/nr_measurements")
 def stream_nr_measurements(database: Database) -> Iterator[str]:
     """Return the number of measurements as server sent events."""
@@ -116,23 +134,25 @@ def stream_nr_measurements(database: Database) -> Iterator[str]:
     bottle.response.set_header("Content-Type", "text/event-stream")
     bottle.response.set_header("Cache-Control", "no-cache")
 
-    # Provide an initial data dump to each new client and set up our message payload with a retry value in case of
-    # connection failure
-    nr_measurements = count_measurements(database)
-    logging.info("Initializing nr_measurements stream with %s measurements", nr_measurements)
-    yield sse_pack(event_id, "init", nr_measurements)
-    skipped = 0
-    # Now give the client updates as they arrive
-    while True:
-        time.sleep(10)
-        if (new_nr_measurements := count_measurements(database)) > nr_measurements or skipped > 5:
-            skipped = 0
-            nr_measurements = new_nr_measurements
+    # All clients share one broadcaster per database, so the number of measurements is counted once per interval,
+    # regardless of the number of clients
+    broadcaster = NR_MEASUREMENTS_BROADCASTERS.setdefault(
+        database, Broadcaster(partial(count_measurements, database), NR_MEASUREMENTS_INTERVAL)
+    )
+    subscriber = broadcaster.subscribe()
+    try:
+        # Provide an initial data dump to each new client and set up our message payload with a retry value in case of
+        # connection failure
+        nr_measurements = subscriber.get()
+        logging.info("Initializing nr_measurements stream with %s measurements", nr_measurements)
+        yield sse_pack(event_id, "init", nr_measurements)
+        # Now give the client updates as they arrive
+        while True:
+            nr_measurements = subscriber.get()
             event_id += 1
-            logging.info("Updating nr_measurements stream with %s measurements", nr_measurements)
             yield sse_pack(event_id, "delta", nr_measurements)
-        else:
-            skipped += 1
+    finally:
+        broadcaster.unsubscribe(subscriber)
 
 
 @bottle.get("/api/v3/measurements/<metric_uuid>")
@@ -140,3 +160,109 @@ def get_measurements(metric_uuid: MetricId, database: Database) -> Dict:
     """Return the measurements for the metric."""
     metric_uuid = cast(MetricId, metric_uuid.split("&")[0])
     return dict(measurements=list(measurements_by_metric(database, metric_uuid, max_iso_timestamp=report_date_time())))
+
+
+@bottle.get("/api/v3/measurements")
+def get_measurements_of_metrics(database: Database) -> Dict:
+    """Return the measurements of the metrics, grouped by metric uuid.
+
+    Pass the metric uuids as comma separated list with the metric_uuids query parameter. The time window ends at the
+    report date and starts at the min report date, or 28 weeks before the report date if no min report date is given.
+    Measurements don't include entities, except for the latest measurement of each metric if the entities query
+    parameter is "latest".
+    """
+    query = dict(bottle.request.query)
+    metric_uuids = [cast(MetricId, uuid) for uuid in str(query.get("metric_uuids", "")).split(",") if uuid]
+    max_iso_timestamp = report_date_time()
+    min_iso_timestamp = min_report_date_time(max_iso_timestamp)
+    latest_with_entities = query.get("entities") == "latest"
+    return dict(
+        measurements=measurements_of_metrics(
+            database, metric_uuids, min_iso_timestamp, max_iso_timestamp, latest_with_entities
+        )
+    )
+
+
+def min_report_date_time(max_iso_timestamp: str) -> str:
+    """Return the min report date requested as query parameter, or else 28 weeks before the max timestamp.
+
+    Abort with 400 if the min report date is not an ISO-formatted date (and time).
+    """
+    if min_report_date := dict(bottle.request.query).get("min_report_date"):
+        min_iso_timestamp = str(min_report_date).replace("Z", "+00:00")
+        try:
+            datetime.fromisoformat(min_iso_timestamp)
+        except ValueError:
+            bottle.abort(400, "Invalid min_report_date")
+        return min_iso_timestamp
+    return (datetime.fromisoformat(max_iso_timestamp or iso_timestamp()) - timedelta(weeks=28)).isoformat()
+
+
+MEASUREMENTS_PAGE_SIZE = 1000  # Default maximum number of measurements per page
+
+
+@bottle.get("/api/v3/metric/<metric_uuid>/measurements")
+def get_metric_measurements(metric_uuid: MetricId, database: Database) -> Iterator[str]:
+    """Return a page of the measurements of the metric, sorted by start, without entities, as a streamed JSON object.
+
+    The number of measurements per page can be set with the limit query parameter. If there may be more measurements,
+    the response contains a next cursor. Pass it as the cursor query parameter to get the next page.
+    """
+    query = dict(bottle.request.query)
+    try:
+        limit = max(1, int(query.get("limit", MEASUREMENTS_PAGE_SIZE)))
+    except ValueError:
+        bottle.abort(400, "Invalid limit")
+    after = None
+    if cursor := query.get("cursor"):
+        try:
+            after = decode_cursor(str(cursor))
+        except (InvalidId, TypeError, ValueError):
+            bottle.abort(400, "Invalid cursor")
+    measurements = measurements_page(database, metric_uuid, limit, after, max_iso_timestamp=report_date_time())
+    bottle.response.set_header("Content-Type", "application/json")
+    return stream_measurements_page(measurements, limit)
+
+
+def stream_measurements_page(measurements: Iterable[Dict], limit: int) -> Iterator[str]:
+    """Stream the page of measurements as JSON object, so the measurements don't need to be kept in memory."""
+    yield '{"measurements": ['
+    nr_measurements, last = 0, None
+    for measurement in measurements:
+        last = (measurement["start"], measurement.pop("_id"))
+        yield (", " if nr_measurements else "") + json.dumps(measurement)
+        nr_measurements += 1
+    next_cursor = encode_cursor(last) if last and nr_measurements == limit else None
+    yield f'], "next_cursor": {json.dumps(next_cursor)}}}'
+
+
+def encode_cursor(last: Tuple[str, ObjectId]) -> str:
+    """Encode the start and id of the last measurement of a page as opaque cursor."""
+    start, measurement_id = last
+    return base64.urlsafe_b64encode(json.dumps([start, str(measurement_id)]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, ObjectId]:
+    """Decode the cursor into the start and id of the last measurement of the previous page."""
+    start, measurement_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return str(start), ObjectId(measurement_id)
+
+
+@bottle.get("/api/v3/measurements/<metric_uuid>/history")
+def get_measurement_history(metric_uuid: MetricId, database: Database) -> Dict:
+    """Return the measurement history of the metric, downsampled to hourly, daily, or weekly rollups.
+
+    The time window ends at the report date and starts at the min report date, or 28 weeks before the report date if
+    no min report date is given. The resolution is the number of points the client needs to draw the history. The
+    coarsest rollup period that still results in at least that number of points for the time window is used.
+    """
+    max_iso_timestamp = report_date_time() or iso_timestamp()
+    min_iso_timestamp = min_report_date_time(max_iso_timestamp)
+    try:
+        nr_points = int(dict(bottle.request.query).get("resolution", 100))
+    except ValueError:
+        bottle.abort(400, "Invalid resolution")
+    period = coarsest_adequate_period(min_iso_timestamp, max_iso_timestamp, nr_points)
+    flush_measurement_ends(database)
+    rollups = rollups_by_metric(database, metric_uuid, period, min_iso_timestamp, max_iso_timestamp)
+    return dict(period=period, rollups=rollups)
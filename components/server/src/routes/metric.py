@@ -5,9 +5,9 @@ from typing import Any, Dict
 import bottle
 from pymongo.database import Database
 
-from database.datamodels import default_metric_attributes, latest_datamodel
+from database.datamodels import default_metric_attributes
 from database.measurements import insert_new_measurement, latest_measurement
-from database.reports import insert_new_report, latest_reports
+from database.reports import insert_new_report, latest_data, latest_reports
 from model.actions import copy_metric, move_item
 from model.data import MetricData, SubjectData
 from server_utilities.functions import sanitize_html, uuid
@@ -29,8 +29,9 @@ def get_metrics(database: Database):
 @bottle.post("/api/v3/metric/new/<subject_uuid>")
 def post_metric_new(subject_uuid: SubjectId, database: Database):
     """Add a new metric."""
-    data = SubjectData(latest_datamodel(database), latest_reports(database), subject_uuid)
-    data.subject["metrics"][(metric_uuid := uuid())] = default_metric_attributes(database)
+    data_model, reports, index = latest_data(database)
+    data = SubjectData(data_model, reports, index, subject_uuid)
+    data.subject["metrics"][(metric_uuid := uuid())] = default_metric_attributes(data_model)
     description = f"{{user}} added a new metric to subject '{data.subject_name}' in report '{data.report_name}'."
     uuids = [data.report_uuid, data.subject_uuid, metric_uuid]
     result = insert_new_report(database, description, (data.report, uuids))
@@ -41,9 +42,9 @@ def post_metric_new(subject_uuid: SubjectId, database: Database):
 @bottle.post("/api/v3/metric/<metric_uuid>/copy/<subject_uuid>")
 def post_metric_copy(metric_uuid: MetricId, subject_uuid: SubjectId, database: Database):
     """Add a copy of the metric to the subject (new in v3)."""
-    data_model, reports = latest_datamodel(database), latest_reports(database)
-    source = MetricData(data_model, reports, metric_uuid)
-    target = SubjectData(data_model, reports, subject_uuid)
+    data_model, reports, index = latest_data(database)
+    source = MetricData(data_model, reports, index, metric_uuid)
+    target = SubjectData(data_model, reports, index, subject_uuid)
     target.subject["metrics"][(metric_copy_uuid := uuid())] = copy_metric(source.metric, source.datamodel)
     description = (
         f"{{user}} copied the metric '{source.metric_name}' of subject '{source.subject_name}' from report "
@@ -58,9 +59,9 @@ def post_metric_copy(metric_uuid: MetricId, subject_uuid: SubjectId, database: D
 @bottle.post("/api/v3/metric/<metric_uuid>/move/<target_subject_uuid>")
 def post_move_metric(metric_uuid: MetricId, target_subject_uuid: SubjectId, database: Database):
     """Move the metric to another subject."""
-    data_model, reports = latest_datamodel(database), latest_reports(database)
-    source = MetricData(data_model, reports, metric_uuid)
-    target = SubjectData(data_model, reports, target_subject_uuid)
+    data_model, reports, index = latest_data(database)
+    source = MetricData(data_model, reports, index, metric_uuid)
+    target = SubjectData(data_model, reports, index, target_subject_uuid)
     delta_description = (
         f"{{user}} moved the metric '{source.metric_name}' from subject '{source.subject_name}' in report "
         f"'{source.report_name}' to subject '{target.subject_name}' in report '{target.report_name}'."
@@ -83,7 +84,8 @@ def post_move_metric(metric_uuid: MetricId, target_subject_uuid: SubjectId, data
 @bottle.delete("/api/v3/metric/<metric_uuid>")
 def delete_metric(metric_uuid: MetricId, database: Database):
     """Delete a metric."""
-    data = MetricData(latest_datamodel(database), latest_reports(database), metric_uuid)
+    data_model, reports, index = latest_data(database)
+    data = MetricData(data_model, reports, index, metric_uuid)
     description = (
         f"{{user}} deleted metric '{data.metric_name}' from subject '{data.subject_name}' in report "
         f"'{data.report_name}'."
@@ -100,7 +102,8 @@ ATTRIBUTES_IMPACTING_STATUS = ("accept_debt", "debt_target", "debt_end_date", "d
 def post_metric_attribute(metric_uuid: MetricId, metric_attribute: str, database: Database):
     """Set the metric attribute."""
     new_value = dict(bottle.request.json)[metric_attribute]
-    data = MetricData(latest_datamodel(database), latest_reports(database), metric_uuid)
+    data_model, reports, index = latest_data(database)
+    data = MetricData(data_model, reports, index, metric_uuid)
     if metric_attribute == "comment" and new_value:
         new_value = sanitize_html(new_value)
     old_value: Any
@@ -112,7 +115,7 @@ def post_metric_attribute(metric_uuid: MetricId, metric_attribute: str, database
         return dict(ok=True)  # Nothing to do
     data.metric[metric_attribute] = new_value
     if metric_attribute == "type":
-        data.metric.update(default_metric_attributes(database, new_value))
+        data.metric.update(default_metric_attributes(data.datamodel, new_value))
     description = (
         f"{{user}} changed the {metric_attribute} of metric '{data.metric_name}' of subject "
         f"'{data.subject_name}' in report '{data.report_name}' from '{old_value}' to '{new_value}'."
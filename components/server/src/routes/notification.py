@@ -3,8 +3,7 @@
 import bottle
 from pymongo.database import Database
 
-from database.datamodels import latest_datamodel
-from database.reports import insert_new_report, latest_reports
+from database.reports import insert_new_report, latest_data
 from model.data import ReportData
 from server_utilities.functions import uuid
 from server_utilities.type import ReportId, NotificationDestinationId
@@ -13,7 +12,7 @@ from server_utilities.type import ReportId, NotificationDestinationId
 @bottle.post("/api/v3/report/<report_uuid>/notification_destination/new")
 def post_new_notification_destination(report_uuid: ReportId, database: Database):
     """Create a new notification destination."""
-    data = ReportData(latest_datamodel(database), latest_reports(database), report_uuid)
+    data = ReportData(*latest_data(database), report_uuid)
     if "notification_destinations" not in data.report:
         data.report["notification_destinations"] = {}
     data.report["notification_destinations"][(notification_destination_uuid := uuid())] = dict(
@@ -31,7 +30,7 @@ def delete_notification_destination(
     report_uuid: ReportId, notification_destination_uuid: NotificationDestinationId, database: Database
 ):
     """Delete a destination from a report."""
-    data = ReportData(latest_datamodel(database), latest_reports(database), report_uuid)
+    data = ReportData(*latest_data(database), report_uuid)
     destination_name = data.report["notification_destinations"][notification_destination_uuid]["name"]
     del data.report["notification_destinations"][notification_destination_uuid]
     delta_description = f"{{user}} deleted destination {destination_name} from report '{data.report_name}'."
@@ -44,7 +43,7 @@ def post_notification_destination_attributes(
     report_uuid: ReportId, notification_destination_uuid: NotificationDestinationId, database: Database
 ):
     """Set specified notification destination attributes."""
-    data = ReportData(latest_datamodel(database), latest_reports(database), report_uuid)
+    data = ReportData(*latest_data(database), report_uuid)
     notification_destination_name = data.report["notification_destinations"][notification_destination_uuid]["name"]
     attributes = dict(bottle.request.json)
     old_values = []
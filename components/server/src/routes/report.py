@@ -1,45 +1,149 @@
 """Report routes."""
 
+import json
 import os
+import weakref
+from functools import partial
+from typing import Dict, Iterator, Tuple
 from urllib import parse
 
 import bottle
 import requests
 from pymongo.database import Database
 
+from database import changes
 from database.datamodels import latest_datamodel
 from database.measurements import recent_measurements_by_metric_uuid
-from database.reports import insert_new_report, latest_reports
-from initialization.report import import_json_report
+from database.reports import (
+    insert_new_report,
+    latest_data,
+    latest_reports,
+    report_state,
+    reports_version,
+    uuid_index,
+)
+from initialization.report import import_json_reports
 from model.actions import copy_report
 from model.data import ReportData
+from model.iterators import metric_uuids
 from model.transformations import hide_credentials, summarize_report
-from server_utilities.functions import iso_timestamp, report_date_time, uuid
+from server_utilities.broadcaster import Broadcaster
+from server_utilities.functions import check_etag, iso_timestamp, report_date_time, sse_pack, uuid
 from server_utilities.type import ReportId
 
 
+NDJSON_CONTENT_TYPE = "application/x-ndjson"  # Content type of report imports with one report per line
+# The report streams read the report state when notified of a change and every interval, to pick up changes made by
+# other server processes:
+REPORT_STREAM_INTERVAL = 30  # Number of seconds between reads of the report state for the report streams
+REPORT_STREAM_KEEP_ALIVE = 1  # Number of unchanged intervals after which the report streams send a keep-alive
+REPORT_BROADCASTERS: "weakref.WeakKeyDictionary[Database, Dict[ReportId, Broadcaster[Dict]]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
 @bottle.get("/api/v3/report/<report_uuid>")
 def get_report(database: Database, report_uuid: ReportId):
     """Return the quality report, including information about other reports needed for move/copy actions."""
     date_time = report_date_time()
+    check_etag(*reports_version(database, date_time, report_uuid))
     data_model = latest_datamodel(database, date_time)
     reports = latest_reports(database, date_time)
     for report in reports:
         if report["report_uuid"] == report_uuid:
-            recent_measurements = recent_measurements_by_metric_uuid(database, date_time)
+            recent_measurements = recent_measurements_by_metric_uuid(
+                database, date_time, metric_uuids=metric_uuids([report])
+            )
             summarize_report(report, recent_measurements, data_model)
             break
     hide_credentials(data_model, *reports)
     return dict(reports=reports)
 
 
+@bottle.get("/api/v3/report/<report_uuid>/stream")
+def stream_report_changes(report_uuid: ReportId, database: Database) -> Iterator[str]:
+    """Return the changes of the report and of the latest measurements of its metrics as server sent events.
+
+    The init event contains the version of the report and the latest measurements of its metrics. After that, a report
+    event is sent when the report is changed and a metric event is sent when the latest measurement of a metric changes.
+    """
+    index = uuid_index(database)
+    if report_uuid not in index or index.report_uuid(report_uuid) != report_uuid:
+        bottle.abort(404, f"Report {report_uuid} does not exist")
+    try:
+        event_id = int(bottle.request.get_header("Last-Event-Id", -1)) + 1
+    except ValueError:
+        bottle.abort(400, "Last-Event-Id must be an integer")
+    bottle.response.set_header("Connection", "keep-alive")
+    bottle.response.set_header("Content-Type", "text/event-stream")
+    bottle.response.set_header("Cache-Control", "no-cache")
+    # All clients of a report share one broadcaster, so the report state is read once per change or interval per report:
+    broadcasters = REPORT_BROADCASTERS.setdefault(database, {})
+    if (broadcaster := broadcasters.get(report_uuid)) is None:
+        broadcaster = broadcasters[report_uuid] = Broadcaster(
+            partial(report_state, database, report_uuid),
+            REPORT_STREAM_INTERVAL,
+            REPORT_STREAM_KEEP_ALIVE,
+            on_stop=partial(_remove_broadcaster, database, broadcasters, report_uuid),
+        )
+        changes.add_listener(database, report_uuid, broadcaster.notify)
+    subscriber = broadcaster.subscribe()
+    try:
+        state = subscriber.get()
+        yield sse_pack(event_id, "init", json.dumps(state))
+        while True:
+            new_state = subscriber.get()
+            if events := list(_report_events(state, new_state)):
+                for event, data in events:
+                    event_id += 1
+                    yield sse_pack(event_id, event, json.dumps(data))
+            else:
+                yield ": keep-alive\n\n"  # Comment line to keep the connection open
+            state = new_state
+    finally:
+        broadcaster.unsubscribe(subscriber)
+
+
+def _remove_broadcaster(
+    database: Database,
+    broadcasters: Dict[ReportId, Broadcaster[Dict]],
+    report_uuid: ReportId,
+    broadcaster: Broadcaster[Dict],
+) -> None:
+    """Remove the stopped broadcaster of the report, so broadcasters of reports without clients don't accumulate."""
+    changes.remove_listener(database, report_uuid, broadcaster.notify)
+    if broadcasters.get(report_uuid) is broadcaster:
+        del broadcasters[report_uuid]
+
+
+def _report_events(old_state: Dict, new_state: Dict) -> Iterator[Tuple[str, Dict]]:
+    """Yield the events that describe the changes between the old and the new report state."""
+    if new_state["report"] != old_state["report"]:
+        yield "report", new_state["report"]
+    for metric_uuid, measurement in new_state["metrics"].items():
+        if measurement != old_state["metrics"].get(metric_uuid):
+            yield "metric", measurement
+
+
 @bottle.post("/api/v3/report/import")
 def post_report_import(database: Database):
-    """Import a preconfigured report into the database."""
-    report = dict(bottle.request.json)
-    report["delta"] = dict(uuids=[report["report_uuid"]])
-    result = import_json_report(database, report)
-    result["new_report_uuid"] = report["report_uuid"]
+    """Import one or more preconfigured reports into the database.
+
+    The request body is a report, a list of reports, or, if the content type is application/x-ndjson, one report per
+    line. The reports are imported with one insert, so either all or none of the reports are imported.
+    """
+    if bottle.request.content_type.startswith(NDJSON_CONTENT_TYPE):
+        imported_reports = [json.loads(line) for line in bottle.request.body if line.strip()]
+    else:
+        imported = bottle.request.json
+        imported_reports = imported if isinstance(imported, list) else [dict(imported)]
+    try:
+        result = import_json_reports(database, imported_reports)
+    except ValueError as reason:
+        return bottle.abort(400, str(reason))
+    report_uuids = [report["report_uuid"] for report in imported_reports]
+    result["new_report_uuid"] = report_uuids[0]
+    result["new_report_uuids"] = report_uuids
     return result
 
 
@@ -57,9 +161,8 @@ def post_report_new(database: Database):
 @bottle.post("/api/v3/report/<report_uuid>/copy")
 def post_report_copy(report_uuid: ReportId, database: Database):
     """Copy a report."""
-    data_model = latest_datamodel(database)
-    reports = latest_reports(database)
-    data = ReportData(data_model, reports, report_uuid)
+    data_model, reports, index = latest_data(database)
+    data = ReportData(data_model, reports, index, report_uuid)
     report_copy = copy_report(data.report, data.datamodel)
     delta_description = f"{{user}} copied the report '{data.report_name}'."
     uuids = [report_uuid, report_copy["report_uuid"]]
@@ -90,9 +193,8 @@ def export_report_as_pdf(report_uuid: ReportId):
 @bottle.delete("/api/v3/report/<report_uuid>")
 def delete_report(report_uuid: ReportId, database: Database):
     """Delete a report."""
-    data_model = latest_datamodel(database)
-    reports = latest_reports(database)
-    data = ReportData(data_model, reports, report_uuid)
+    data_model, reports, index = latest_data(database)
+    data = ReportData(data_model, reports, index, report_uuid)
     data.report["deleted"] = "true"
     delta_description = f"{{user}} deleted the report '{data.report_name}'."
     return insert_new_report(database, delta_description, (data.report, [report_uuid]))
@@ -101,9 +203,8 @@ def delete_report(report_uuid: ReportId, database: Database):
 @bottle.post("/api/v3/report/<report_uuid>/attribute/<report_attribute>")
 def post_report_attribute(report_uuid: ReportId, report_attribute: str, database: Database):
     """Set a report attribute."""
-    data_model = latest_datamodel(database)
-    reports = latest_reports(database)
-    data = ReportData(data_model, reports, report_uuid)
+    data_model, reports, index = latest_data(database)
+    data = ReportData(data_model, reports, index, report_uuid)
     value = dict(bottle.request.json)[report_attribute]
     old_value = data.report.get(report_attribute) or ""
     data.report[report_attribute] = value
@@ -118,6 +219,7 @@ def post_report_attribute(report_uuid: ReportId, report_attribute: str, database
 def get_tag_report(tag: str, database: Database):
     """Get a report with all metrics that have the specified tag."""
     date_time = report_date_time()
+    check_etag(*reports_version(database, date_time))
     reports = latest_reports(database, date_time)
     data_model = latest_datamodel(database, date_time)
     subjects = _get_subjects_and_metrics_by_tag(data_model, reports, tag)
@@ -129,7 +231,10 @@ def get_tag_report(tag: str, database: Database):
         subjects=subjects,
     )
     hide_credentials(data_model, tag_report)
-    summarize_report(tag_report, recent_measurements_by_metric_uuid(database, date_time), data_model)
+    recent_measurements = recent_measurements_by_metric_uuid(
+        database, date_time, metric_uuids=metric_uuids([tag_report])
+    )
+    summarize_report(tag_report, recent_measurements, data_model)
     return tag_report
 
 
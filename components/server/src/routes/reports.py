@@ -6,20 +6,23 @@ from pymongo.database import Database
 from database import sessions
 from database.datamodels import latest_datamodel
 from database.measurements import recent_measurements_by_metric_uuid
-from database.reports import insert_new_reports_overview, latest_reports, latest_reports_overview
+from database.reports import insert_new_reports_overview, latest_reports, latest_reports_overview, reports_version
+from model.iterators import metric_uuids
 from model.transformations import hide_credentials, summarize_report
-from server_utilities.functions import report_date_time
+from server_utilities.functions import check_etag, report_date_time
 
 
 @bottle.get("/api/v3/reports")
 def get_reports(database: Database):
     """Return all the quality reports."""
     date_time = report_date_time()
+    check_etag(*reports_version(database, date_time))
     data_model = latest_datamodel(database, date_time)
     overview = latest_reports_overview(database, date_time)
     overview["reports"] = []
-    recent_measurements = recent_measurements_by_metric_uuid(database, date_time)
-    for report in latest_reports(database, date_time):
+    reports = latest_reports(database, date_time)
+    recent_measurements = recent_measurements_by_metric_uuid(database, date_time, metric_uuids=metric_uuids(reports))
+    for report in reports:
         summarize_report(report, recent_measurements, data_model)
         overview["reports"].append(report)
     hide_credentials(data_model, *overview["reports"])
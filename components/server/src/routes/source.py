@@ -6,11 +6,11 @@ import bottle
 import requests
 from pymongo.database import Database
 
-from database.datamodels import default_source_parameters, latest_datamodel
-from database.reports import insert_new_report, latest_reports
+from database.datamodels import default_source_parameters
+from database.reports import insert_new_report, latest_data
 from model.actions import copy_source, move_item
 from model.data import MetricData, SourceData
-from model.queries import is_password_parameter
+from model.datamodel_index import datamodel_index
 from model.transformations import change_source_parameter
 from server_utilities.functions import uuid
 from server_utilities.type import URL, EditScope, MetricId, ReportId, SourceId, SubjectId
@@ -19,12 +19,11 @@ from server_utilities.type import URL, EditScope, MetricId, ReportId, SourceId,
 @bottle.post("/api/v3/source/new/<metric_uuid>")
 def post_source_new(metric_uuid: MetricId, database: Database):
     """Add a new source."""
-    data_model = latest_datamodel(database)
-    reports = latest_reports(database)
-    data = MetricData(data_model, reports, metric_uuid)
+    data_model, reports, index = latest_data(database)
+    data = MetricData(data_model, reports, index, metric_uuid)
     metric_type = data.metric["type"]
     source_type = data_model["metrics"][metric_type]["default_source"]
-    parameters = default_source_parameters(database, metric_type, source_type)
+    parameters = default_source_parameters(data_model, metric_type, source_type)
     data.metric["sources"][(source_uuid := uuid())] = dict(type=source_type, parameters=parameters)
     delta_description = (
         f"{{user}} added a new source to metric '{data.metric_name}' of subject "
@@ -39,10 +38,9 @@ def post_source_new(metric_uuid: MetricId, database: Database):
 @bottle.post("/api/v3/source/<source_uuid>/copy/<metric_uuid>")
 def post_source_copy(source_uuid: SourceId, metric_uuid: MetricId, database: Database):
     """Add a copy of the source to the metric (new in v3)."""
-    data_model = latest_datamodel(database)
-    reports = latest_reports(database)
-    source = SourceData(data_model, reports, source_uuid)
-    target = MetricData(data_model, reports, metric_uuid)
+    data_model, reports, index = latest_data(database)
+    source = SourceData(data_model, reports, index, source_uuid)
+    target = MetricData(data_model, reports, index, metric_uuid)
     target.metric["sources"][(source_copy_uuid := uuid())] = copy_source(source.source, source.datamodel)
     delta_description = (
         f"{{user}} copied the source '{source.source_name}' of metric '{source.metric_name}' of subject "
@@ -58,10 +56,9 @@ def post_source_copy(source_uuid: SourceId, metric_uuid: MetricId, database: Dat
 @bottle.post("/api/v3/source/<source_uuid>/move/<target_metric_uuid>")
 def post_move_source(source_uuid: SourceId, target_metric_uuid: MetricId, database: Database):
     """Move the source to another metric."""
-    data_model = latest_datamodel(database)
-    reports = latest_reports(database)
-    source = SourceData(data_model, reports, source_uuid)
-    target = MetricData(data_model, reports, target_metric_uuid)
+    data_model, reports, index = latest_data(database)
+    source = SourceData(data_model, reports, index, source_uuid)
+    target = MetricData(data_model, reports, index, target_metric_uuid)
     delta_description = (
         f"{{user}} moved the source '{source.source_name}' from metric '{source.metric_name}' of subject "
         f"'{source.subject_name}' in report '{source.report_name}' to metric '{target.metric_name}' of subject "
@@ -92,9 +89,8 @@ def post_move_source(source_uuid: SourceId, target_metric_uuid: MetricId, databa
 @bottle.delete("/api/v3/source/<source_uuid>")
 def delete_source(source_uuid: SourceId, database: Database):
     """Delete a source."""
-    data_model = latest_datamodel(database)
-    reports = latest_reports(database)
-    data = SourceData(data_model, reports, source_uuid)
+    data_model, reports, index = latest_data(database)
+    data = SourceData(data_model, reports, index, source_uuid)
     delta_description = (
         f"{{user}} deleted the source '{data.source_name}' from metric "
         f"'{data.metric_name}' of subject '{data.subject_name}' in report '{data.report_name}'."
@@ -107,9 +103,8 @@ def delete_source(source_uuid: SourceId, database: Database):
 @bottle.post("/api/v3/source/<source_uuid>/attribute/<source_attribute>")
 def post_source_attribute(source_uuid: SourceId, source_attribute: str, database: Database):
     """Set a source attribute."""
-    data_model = latest_datamodel(database)
-    reports = latest_reports(database)
-    data = SourceData(data_model, reports, source_uuid)
+    data_model, reports, index = latest_data(database)
+    data = SourceData(data_model, reports, index, source_uuid)
     value = dict(bottle.request.json)[source_attribute]
     old_value: Any
     if source_attribute == "position":
@@ -125,14 +120,15 @@ def post_source_attribute(source_uuid: SourceId, source_attribute: str, database
     )
     uuids = [data.report_uuid, data.subject_uuid, data.metric_uuid, source_uuid]
     if source_attribute == "type":
-        data.source["parameters"] = default_source_parameters(database, data.metric["type"], value)
+        data.source["parameters"] = default_source_parameters(data.datamodel, data.metric["type"], value)
     return insert_new_report(database, delta_description, (data.report, uuids))
 
 
 @bottle.post("/api/v3/source/<source_uuid>/parameter/<parameter_key>")
 def post_source_parameter(source_uuid: SourceId, parameter_key: str, database: Database):
     """Set the source parameter."""
-    data = SourceData(latest_datamodel(database), latest_reports(database), source_uuid)
+    data_model, reports, index = latest_data(database)
+    data = SourceData(data_model, reports, index, source_uuid)
     new_value = new_parameter_value(data, parameter_key)
     old_value = data.source["parameters"].get(parameter_key) or ""
     if old_value == new_value:
@@ -140,7 +136,7 @@ def post_source_parameter(source_uuid: SourceId, parameter_key: str, database: D
     edit_scope = cast(EditScope, dict(bottle.request.json).get("edit_scope", "source"))
     changed_ids = change_source_parameter(data, parameter_key, old_value, new_value, edit_scope)
 
-    if is_password_parameter(data.datamodel, data.source["type"], parameter_key):
+    if datamodel_index(data.datamodel).is_password_parameter(data.source["type"], parameter_key):
         new_value, old_value = "*" * len(new_value), "*" * len(old_value)
 
     source_description = _source_description(data, edit_scope, parameter_key, old_value)
@@ -5,9 +5,9 @@ from datetime import datetime, timedelta
 import bottle
 from pymongo.database import Database
 
-from database.datamodels import default_subject_attributes, latest_datamodel
+from database.datamodels import default_subject_attributes
 from database.measurements import measurements_by_metric
-from database.reports import insert_new_report, latest_reports, metrics_of_subject
+from database.reports import insert_new_report, latest_data, metrics_of_subject
 from model.actions import copy_subject, move_item
 from model.data import ReportData, SubjectData
 from server_utilities.functions import report_date_time, uuid
@@ -17,10 +17,9 @@ from server_utilities.type import MetricId, ReportId, SubjectId
 @bottle.post("/api/v3/subject/new/<report_uuid>")
 def post_new_subject(report_uuid: ReportId, database: Database):
     """Create a new subject."""
-    data_model = latest_datamodel(database)
-    reports = latest_reports(database)
-    data = ReportData(data_model, reports, report_uuid)
-    data.report["subjects"][(subject_uuid := uuid())] = default_subject_attributes(database)
+    data_model, reports, index = latest_data(database)
+    data = ReportData(data_model, reports, index, report_uuid)
+    data.report["subjects"][(subject_uuid := uuid())] = default_subject_attributes(data_model)
     delta_description = f"{{user}} created a new subject in report '{data.report_name}'."
     uuids = [report_uuid, subject_uuid]
     result = insert_new_report(database, delta_description, (data.report, uuids))
@@ -31,10 +30,9 @@ def post_new_subject(report_uuid: ReportId, database: Database):
 @bottle.post("/api/v3/subject/<subject_uuid>/copy/<report_uuid>")
 def post_subject_copy(subject_uuid: SubjectId, report_uuid: ReportId, database: Database):
     """Add a copy of the subject to the report (new in v3)."""
-    data_model = latest_datamodel(database)
-    reports = latest_reports(database)
-    source = SubjectData(data_model, reports, subject_uuid)
-    target = ReportData(data_model, reports, report_uuid)
+    data_model, reports, index = latest_data(database)
+    source = SubjectData(data_model, reports, index, subject_uuid)
+    target = ReportData(data_model, reports, index, report_uuid)
     target.report["subjects"][(subject_copy_uuid := uuid())] = copy_subject(source.subject, source.datamodel)
     delta_description = (
         f"{{user}} copied the subject '{source.subject_name}' from report "
@@ -49,10 +47,9 @@ def post_subject_copy(subject_uuid: SubjectId, report_uuid: ReportId, database:
 @bottle.post("/api/v3/subject/<subject_uuid>/move/<target_report_uuid>")
 def post_move_subject(subject_uuid: SubjectId, target_report_uuid: ReportId, database: Database):
     """Move the subject to another report."""
-    data_model = latest_datamodel(database)
-    reports = latest_reports(database)
-    source = SubjectData(data_model, reports, subject_uuid)
-    target = ReportData(data_model, reports, target_report_uuid)
+    data_model, reports, index = latest_data(database)
+    source = SubjectData(data_model, reports, index, subject_uuid)
+    target = ReportData(data_model, reports, index, target_report_uuid)
     target.report["subjects"][subject_uuid] = source.subject
     del source.report["subjects"][subject_uuid]
     delta_description = (
@@ -67,9 +64,8 @@ def post_move_subject(subject_uuid: SubjectId, target_report_uuid: ReportId, dat
 @bottle.delete("/api/v3/subject/<subject_uuid>")
 def delete_subject(subject_uuid: SubjectId, database: Database):
     """Delete the subject."""
-    data_model = latest_datamodel(database)
-    reports = latest_reports(database)
-    data = SubjectData(data_model, reports, subject_uuid)
+    data_model, reports, index = latest_data(database)
+    data = SubjectData(data_model, reports, index, subject_uuid)
     del data.report["subjects"][subject_uuid]
     delta_description = f"{{user}} deleted the subject '{data.subject_name}' from report '{data.report_name}'."
     uuids = [data.report_uuid, subject_uuid]
@@ -79,9 +75,8 @@ def delete_subject(subject_uuid: SubjectId, database: Database):
 @bottle.post("/api/v3/subject/<subject_uuid>/attribute/<subject_attribute>")
 def post_subject_attribute(subject_uuid: SubjectId, subject_attribute: str, database: Database):
     """Set the subject attribute."""
-    data_model = latest_datamodel(database)
-    reports = latest_reports(database)
-    data = SubjectData(data_model, reports, subject_uuid)
+    data_model, reports, index = latest_data(database)
+    data = SubjectData(data_model, reports, index, subject_uuid)
     value = dict(bottle.request.json)[subject_attribute]
     old_value = data.subject.get(subject_attribute) or ""
     if subject_attribute == "position":
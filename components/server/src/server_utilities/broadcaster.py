@@ -0,0 +1,93 @@
+"""Broadcaster for server-sent event streams.
+
+Rather than having each client of a server-sent event stream poll the database, one producer per server process reads
+the value to stream and fans it out to the queues of all subscribed clients. Each queue holds at most one value: if a
+client doesn't keep up, the value it hasn't received yet is replaced by the newer value, so slow clients don't cause
+values to pile up. The producer reads the value every interval, or immediately when it's notified of a change. Under
+gevent, the producer thread, the event and the queues are cooperative greenlets and gevent primitives.
+"""
+
+import logging
+import queue
+import threading
+from typing import Callable, Generic, List, Optional, TypeVar, cast
+
+
+Value = TypeVar("Value")
+
+
+class Broadcaster(Generic[Value]):
+    """Read a value every interval or when notified and broadcast it to the subscribers when it changes."""
+
+    def __init__(
+        self,
+        read: Callable[[], Value],
+        interval: float = 10.0,
+        keep_alive: int = 6,
+        on_stop: Optional[Callable[["Broadcaster[Value]"], None]] = None,
+    ) -> None:
+        self.read = read
+        self.on_stop = on_stop  # Called when the producer stops because there are no subscribers left
+        self.interval = interval  # Number of seconds between reads
+        self.keep_alive = keep_alive  # Broadcast the value after this many intervals, even if it's unchanged
+        self.changed = threading.Event()  # Set by notify() to have the producer read the value without waiting
+        self.lock = threading.Lock()
+        self.subscribers: List["queue.Queue[Value]"] = []
+        self.value: Optional[Value] = None
+        self.producer: Optional[threading.Thread] = None
+
+    def subscribe(self) -> "queue.Queue[Value]":
+        """Return a new subscriber queue, containing the current value. Start the producer if it's not running."""
+        subscriber: "queue.Queue[Value]" = queue.Queue(maxsize=1)
+        with self.lock:
+            if self.producer is None:
+                self.value = self.read()
+                self.producer = threading.Thread(target=self.produce, daemon=True)
+                self.producer.start()
+            subscriber.put(cast(Value, self.value))
+            self.subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: "queue.Queue[Value]") -> None:
+        """Remove the subscriber queue. The producer stops after its next read if there are no subscribers left."""
+        with self.lock:
+            self.subscribers.remove(subscriber)
+
+    def notify(self) -> None:
+        """Notify the producer that the value has changed, so it reads and broadcasts the value right away."""
+        self.changed.set()
+
+    def produce(self) -> None:
+        """Read the value every interval or when notified and broadcast it when it changed, if there are subscribers."""
+        nr_unchanged_intervals = 0
+        while True:
+            notified = self.changed.wait(self.interval)
+            self.changed.clear()
+            with self.lock:
+                if not self.subscribers:
+                    self.producer = None
+                    if self.on_stop:
+                        self.on_stop(self)
+                    return
+            try:
+                value = self.read()
+            except Exception:  # pylint: disable=broad-except
+                logging.exception("Reading the value to broadcast failed")
+                continue
+            if value != self.value or nr_unchanged_intervals >= self.keep_alive:
+                nr_unchanged_intervals = 0
+                self.broadcast(value)
+            elif not notified:
+                nr_unchanged_intervals += 1
+
+    def broadcast(self, value: Value) -> None:
+        """Put the value in the queue of each subscriber, replacing values the subscriber hasn't received yet."""
+        with self.lock:
+            self.value = value
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.get_nowait()
+            except queue.Empty:
+                pass
+            subscriber.put_nowait(value)
@@ -5,7 +5,7 @@ import re
 import uuid as _uuid
 from datetime import datetime, timezone
 from decimal import ROUND_HALF_UP, Decimal
-from typing import Callable, Hashable, Iterable, Iterator, Set, TypeVar
+from typing import Callable, Hashable, Iterable, Iterator, Set, TypeVar, Union
 
 import bottle
 
@@ -41,6 +41,24 @@ def md5_hash(string: str) -> str:
     return hashlib.md5(string.encode("utf-8")).hexdigest()  # noqa: DUO130, # nosec, Not used for cryptography
 
 
+def check_etag(*validators) -> None:
+    """Set the ETag of the response to a hash of the validators and abort with 304 if the client's version matches."""
+    etag = f'"{md5_hash(repr(validators))}"'
+    if_none_match = bottle.request.headers.get("If-None-Match", "")  # pylint: disable=no-member
+    # Proxies that compress the response turn strong ETags into weak ones, so accept weak ETags too:
+    if etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+        # Don't use bottle.abort(), because it drops the response headers and a 304 needs to have the headers the
+        # response would have had, such as the ETag and Cache-Control headers (RFC 7232, section 4.1):
+        headers = {name: value for name in ("Cache-Control", "Vary") if (value := bottle.response.get_header(name))}
+        raise bottle.HTTPResponse(status=304, headers=dict(headers, ETag=etag))  # Not modified
+    bottle.response.set_header("ETag", etag)
+
+
+def sse_pack(event_id: int, event: str, data: Union[int, str], retry: str = "2000") -> str:
+    """Pack data in Server-Sent Events (SSE) format."""
+    return f"retry: {retry}\nid: {event_id}\nevent: {event}\ndata: {data}\n\n"
+
+
 def sanitize_html(html_text: str) -> str:
     """Clean dangerous tags from the HTML and convert urls into anchors."""
     sanitized_html = str(autolink_html(clean_html(html_text)))
@@ -0,0 +1,57 @@
+"""JSON patches, see https://tools.ietf.org/html/rfc6902.
+
+Only the add, remove, and replace operations are used. Lists are compared and replaced as a whole, which suits the
+documents of Quality-time because their nested collections are mostly dicts keyed by uuid.
+"""
+
+from typing import Dict, List
+
+
+Patch = List[Dict]
+
+
+def json_patch(old: Dict, new: Dict) -> Patch:
+    """Return the patch that changes the old document into the new document."""
+    return list(_operations(old, new, ""))
+
+
+def apply_json_patch(document: Dict, patch: Patch) -> Dict:
+    """Apply the patch to the document, in place, and return the document.
+
+    Removing a key that doesn't exist is not an error, so patches can still be applied to documents that have been
+    changed since the patch was created, for example by database migrations.
+    """
+    for operation in patch:
+        *parent_keys, key = [_unescape(part) for part in operation["path"].split("/")[1:]]
+        parent = document
+        for parent_key in parent_keys:
+            parent = parent.setdefault(parent_key, {})
+        if operation["op"] == "remove":
+            parent.pop(key, None)
+        else:
+            parent[key] = operation["value"]
+    return document
+
+
+def _operations(old, new, path: str):
+    """Yield the operations that change the old value at the path into the new value."""
+    for key in old.keys() - new.keys():
+        yield dict(op="remove", path=f"{path}/{_escape(key)}")
+    for key, new_value in new.items():
+        key_path = f"{path}/{_escape(key)}"
+        if key not in old:
+            yield dict(op="add", path=key_path, value=new_value)
+        elif isinstance(old_value := old[key], dict) and isinstance(new_value, dict):
+            yield from _operations(old_value, new_value, key_path)
+        elif old_value != new_value or type(old_value) != type(new_value):  # pylint: disable=unidiomatic-typecheck
+            yield dict(op="replace", path=key_path, value=new_value)
+
+
+def _escape(key: str) -> str:
+    """Escape the key for use in a JSON pointer."""
+    return key.replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(part: str) -> str:
+    """Unescape the part of a JSON pointer."""
+    return part.replace("~1", "/").replace("~0", "~")
@@ -0,0 +1,49 @@
+"""Test the batches of report changes."""
+
+import unittest
+from unittest.mock import Mock
+
+from database.batch import current_batch, start_batch
+
+from ..fixtures import METRIC_ID, REPORT_ID, REPORT_ID2, SUBJECT_ID, create_report
+
+
+class BatchTest(unittest.TestCase):
+    """Unit tests for batches of report changes."""
+
+    def setUp(self):
+        """Override to create a mock database fixture."""
+        self.database = Mock()
+        self.report = create_report()
+
+    def test_current_batch(self):
+        """Test that the current batch is only available in the batch context and for the database of the batch."""
+        with start_batch(self.database, [self.report]) as batch:
+            self.assertIs(batch, current_batch(self.database))
+            self.assertIsNone(current_batch(Mock()))
+        self.assertIsNone(current_batch(self.database))
+
+    def test_nested_batch(self):
+        """Test that batches can't be nested."""
+        with start_batch(self.database, [self.report]):
+            with self.assertRaises(RuntimeError):
+                with start_batch(self.database, [self.report]):
+                    pass
+
+    def test_add_change(self):
+        """Test that the uuids of changes to the same report are combined."""
+        with start_batch(self.database, [self.report]) as batch:
+            batch.add_change("Change 1", (self.report, [REPORT_ID, SUBJECT_ID]))
+            batch.add_change("Change 2", (self.report, [REPORT_ID, SUBJECT_ID, METRIC_ID]))
+        self.assertEqual({REPORT_ID: (self.report, [REPORT_ID, SUBJECT_ID, METRIC_ID])}, batch.changes)
+        self.assertEqual(["Change 1", "Change 2"], batch.descriptions)
+
+    def test_new_and_deleted_reports(self):
+        """Test that new reports are added to the latest reports and deleted reports are removed."""
+        new_report = dict(report_uuid=REPORT_ID2, subjects={})
+        with start_batch(self.database, [self.report]) as batch:
+            batch.add_change("Add report", (new_report, [REPORT_ID2]))
+            self.report["deleted"] = "true"
+            batch.add_change("Delete report", (self.report, [REPORT_ID]))
+            self.assertEqual([new_report], batch.latest_reports())
+            self.assertEqual([], batch.uuid_index().metric_uuids())
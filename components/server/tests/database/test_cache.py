@@ -0,0 +1,68 @@
+"""Test the cache."""
+
+import unittest
+from unittest.mock import Mock
+
+from database.cache import MAX_PAST_VALUES, bump_generation, cached
+
+
+class CacheTest(unittest.TestCase):
+    """Unit tests for the cache."""
+
+    def setUp(self):
+        """Override to create a mock database and a reader that counts the number of reads."""
+        self.database = Mock()
+        self.database.generations.find_one.return_value = dict(generation=1)
+        self.read = Mock(side_effect=lambda: dict(reports=[]))
+
+    def test_read_once(self):
+        """Test that the value is read once if the generation does not change."""
+        cached(self.database, "reports", self.read)
+        self.assertEqual(dict(reports=[]), cached(self.database, "reports", self.read))
+        self.read.assert_called_once()
+
+    def test_read_again_when_generation_changes(self):
+        """Test that the value is read again if the generation changes."""
+        cached(self.database, "reports", self.read)
+        self.database.generations.find_one.return_value = dict(generation=2)
+        cached(self.database, "reports", self.read)
+        self.assertEqual(2, self.read.call_count)
+
+    def test_return_copies(self):
+        """Test that changing a value does not change the cached value."""
+        cached(self.database, "reports", self.read)["reports"].append("report")
+        value = cached(self.database, "reports", self.read)
+        value["reports"].append("report")
+        self.assertEqual(dict(reports=[]), cached(self.database, "reports", self.read))
+
+    def test_keys(self):
+        """Test that multiple values can be cached for the same collection."""
+        cached(self.database, "reports", self.read)
+        self.assertEqual("other", cached(self.database, "reports", lambda: "other", key="other"))
+
+    def test_read_past_once(self):
+        """Test that values read as of a date in the past are read once, regardless of the generation."""
+        cached(self.database, "reports", self.read, "2020-01-01")
+        self.database.generations.find_one.return_value = dict(generation=2)
+        cached(self.database, "reports", self.read, "2020-01-01")
+        self.read.assert_called_once()
+
+    def test_evict_least_recently_used_past_value(self):
+        """Test that the least recently used value read as of a date in the past is evicted."""
+        for day in range(MAX_PAST_VALUES + 1):
+            cached(self.database, "reports", self.read, f"2020-01-{day + 1:02d}")
+        cached(self.database, "reports", self.read, "2020-01-01")
+        self.assertEqual(MAX_PAST_VALUES + 2, self.read.call_count)
+
+    def test_read_future_as_latest(self):
+        """Test that values read as of a date in the future are the latest values."""
+        cached(self.database, "reports", self.read)
+        cached(self.database, "reports", self.read, "3000-01-01")
+        self.read.assert_called_once()
+
+    def test_bump_generation(self):
+        """Test that the generation of a collection is incremented."""
+        bump_generation(self.database, "reports")
+        self.database.generations.update_one.assert_called_once_with(
+            {"_id": "reports"}, {"$inc": {"generation": 1}}, upsert=True
+        )
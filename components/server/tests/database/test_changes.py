@@ -0,0 +1,46 @@
+"""Unit tests for the notification of report and measurement changes."""
+
+import unittest
+from unittest.mock import Mock
+
+from database import changes
+from ..fixtures import REPORT_ID, REPORT_ID2
+
+
+class ChangesTest(unittest.TestCase):
+    """Unit tests for the change listeners."""
+
+    def setUp(self):
+        """Override to create a database and a listener fixture."""
+        self.database = Mock()
+        self.listener = Mock()
+        changes.add_listener(self.database, REPORT_ID, self.listener)
+
+    def tearDown(self):
+        """Override to remove the listener."""
+        changes.remove_listener(self.database, REPORT_ID, self.listener)
+
+    def test_notify(self):
+        """Test that the listener of a changed report is called."""
+        changes.notify(self.database, REPORT_ID)
+        self.listener.assert_called_once_with()
+
+    def test_notify_other_report(self):
+        """Test that the listener of an unchanged report is not called."""
+        changes.notify(self.database, REPORT_ID2)
+        self.listener.assert_not_called()
+
+    def test_has_listeners(self):
+        """Test that the database has listeners until the last listener is removed."""
+        self.assertTrue(changes.has_listeners(self.database))
+        changes.remove_listener(self.database, REPORT_ID, self.listener)
+        self.assertFalse(changes.has_listeners(self.database))
+
+    def test_failing_listener(self):
+        """Test that a failing listener doesn't prevent other listeners from being called."""
+        self.listener.side_effect = RuntimeError
+        other_listener = Mock()
+        changes.add_listener(self.database, REPORT_ID, other_listener)
+        with self.assertLogs(level="ERROR"):
+            changes.notify(self.database, REPORT_ID)
+        other_listener.assert_called_once_with()
@@ -0,0 +1,95 @@
+"""Test the entities collection."""
+
+import unittest
+from unittest.mock import Mock
+
+import pymongo
+
+from database.entities import entity_hash, load_entities, store_entities
+
+
+class EntityHashTest(unittest.TestCase):
+    """Unit tests for the entity hash."""
+
+    def test_hash_ignores_key_order(self):
+        """Test that the hash doesn't depend on the order of the entity attributes."""
+        self.assertEqual(entity_hash(dict(key="a", name="A")), entity_hash(dict(name="A", key="a")))
+
+    def test_hash_depends_on_values(self):
+        """Test that entities with different attribute values have different hashes."""
+        self.assertNotEqual(entity_hash(dict(key="a", name="A")), entity_hash(dict(key="a", name="B")))
+
+
+class StoreEntitiesTest(unittest.TestCase):
+    """Unit tests for storing entities."""
+
+    def setUp(self):
+        """Override to create a mock database fixture."""
+        self.database = Mock()
+        self.entity = dict(key="a", name="A")
+
+    def test_store_entities(self):
+        """Test that the entities are upserted and the sources refer to them by hash."""
+        sources = [dict(source_uuid="source_uuid", entities=[self.entity])]
+        stored_sources = store_entities(self.database, sources)
+        self.assertEqual([dict(source_uuid="source_uuid", entity_hashes=[entity_hash(self.entity)])], stored_sources)
+        self.assertEqual([self.entity], sources[0]["entities"])  # The sources passed are not changed
+        self.database.entities.bulk_write.assert_called_once_with(
+            [pymongo.UpdateOne({"_id": entity_hash(self.entity)}, {"$setOnInsert": self.entity}, upsert=True)],
+            ordered=False,
+        )
+
+    def test_store_same_entity_once(self):
+        """Test that an entity that occurs in multiple sources is upserted once."""
+        sources = [dict(source_uuid="source_uuid1", entities=[self.entity]), dict(entities=[self.entity])]
+        store_entities(self.database, sources)
+        self.assertEqual(1, len(self.database.entities.bulk_write.call_args[0][0]))
+
+    def test_store_without_entities(self):
+        """Test that the database isn't accessed if the sources have no entities."""
+        sources = [dict(source_uuid="source_uuid")]
+        self.assertEqual(sources, store_entities(self.database, sources))
+        self.database.entities.bulk_write.assert_not_called()
+
+
+class LoadEntitiesTest(unittest.TestCase):
+    """Unit tests for loading entities."""
+
+    def setUp(self):
+        """Override to create a mock database fixture."""
+        self.database = Mock()
+        self.entity = dict(key="a", name="A")
+
+    def test_load_entities(self):
+        """Test that the entity hashes of the sources of all measurements are replaced with entities in one query."""
+        self.database.entities.find.return_value = [dict(_id=entity_hash(self.entity), **self.entity)]
+        measurements = [
+            dict(sources=[dict(entity_hashes=[entity_hash(self.entity)])]),
+            dict(sources=[dict(entity_hashes=[entity_hash(self.entity)])]),
+        ]
+        load_entities(self.database, measurements)
+        self.assertEqual([dict(sources=[dict(entities=[self.entity])])] * 2, measurements)
+        self.database.entities.find.assert_called_once_with({"_id": {"$in": [entity_hash(self.entity)]}})
+
+    def test_load_legacy_entities(self):
+        """Test that sources that still contain their entities are left alone."""
+        measurements = [dict(sources=[dict(entities=[self.entity])])]
+        load_entities(self.database, measurements)
+        self.assertEqual([dict(sources=[dict(entities=[self.entity])])], measurements)
+        self.database.entities.find.assert_not_called()
+
+    def test_load_no_entities(self):
+        """Test that sources without entity hashes get an empty list of entities."""
+        measurements = [dict(sources=[dict(entity_hashes=[])])]
+        load_entities(self.database, measurements)
+        self.assertEqual([dict(sources=[dict(entities=[])])], measurements)
+        self.database.entities.find.assert_not_called()
+
+    def test_log_missing_entities(self):
+        """Test that entities whose hash is missing from the entities collection are logged and left out."""
+        self.database.entities.find.return_value = []
+        measurements = [dict(sources=[dict(entity_hashes=[entity_hash(self.entity)])])]
+        with self.assertLogs(level="WARNING") as logs:
+            load_entities(self.database, measurements)
+        self.assertIn(entity_hash(self.entity), logs.output[0])
+        self.assertEqual([dict(sources=[dict(entities=[])])], measurements)
@@ -3,7 +3,10 @@
 import unittest
 from unittest.mock import Mock
 
-from database.measurements import calculate_measurement_value, measurements_by_metric
+import pymongo
+from bson import ObjectId
+
+from database.measurements import calculate_measurement_value, measurements_by_metric, measurements_page
 from model.metric import Metric
 
 from ..fixtures import SOURCE_ID, SOURCE_ID2, METRIC_ID, METRIC_ID2, METRIC_ID3
@@ -171,22 +174,60 @@ class MeasurementsByMetricTest(unittest.TestCase):
 
     def test_get_from_one_metric(self):
         """Test that we get all three measurement fields."""
-        measurements = measurements_by_metric(self.database, METRIC_ID)
+        measurements = list(measurements_by_metric(self.database, METRIC_ID))
         self.assertEqual(len(measurements), 3)
         for measurement in measurements:
             self.assertEqual(measurement["metric_uuid"], METRIC_ID)
 
     def test_get_from_multiple_metric(self):
         """Test that we get all three measurement fields."""
-        measurements = measurements_by_metric(self.database, *[METRIC_ID, METRIC_ID2])
+        measurements = list(measurements_by_metric(self.database, *[METRIC_ID, METRIC_ID2]))
         self.assertEqual(len(measurements), 6)
         for measurement in measurements:
             self.assertIn(measurement["metric_uuid"], [METRIC_ID, METRIC_ID2])
 
     def test_get_timestamp_restriction(self):
         """Test that we get all three measurement fields."""
-        measurements = measurements_by_metric(self.database, METRIC_ID, min_iso_timestamp="0.5", max_iso_timestamp="4")
+        measurements = list(
+            measurements_by_metric(self.database, METRIC_ID, min_iso_timestamp="0.5", max_iso_timestamp="4")
+        )
         self.assertEqual(len(measurements), 2)
         for measurement in measurements:
             self.assertEqual(measurement["metric_uuid"], METRIC_ID)
             self.assertIn(measurement["start"], ["0", "3"])
+
+    def test_sorted_by_start(self):
+        """Test that the measurements are sorted by start, so the last one can be replaced by the latest one."""
+        list(measurements_by_metric(self.database, METRIC_ID))
+        self.assertEqual([("start", pymongo.ASCENDING)], self.database.measurements.find.call_args.kwargs["sort"])
+
+
+class MeasurementsPageTest(unittest.TestCase):
+    """Unit tests for reading a page of measurements."""
+
+    def setUp(self):
+        """Override to create a mock database fixture."""
+        self.database = Mock()
+
+    def test_first_page(self):
+        """Test that the first page of measurements is read, sorted by start and id."""
+        measurements_page(self.database, METRIC_ID, 10)
+        self.database.measurements.find.assert_called_once_with(
+            {"metric_uuid": METRIC_ID},
+            sort=[("start", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)],
+            limit=10,
+            projection={"sources.entities": False, "sources.entity_hashes": False, "sources_hash": False},
+        )
+
+    def test_next_page(self):
+        """Test that the next page of measurements starts after the last measurement of the previous page."""
+        measurement_id = ObjectId()
+        measurements_page(self.database, METRIC_ID, 10, after=("2021-01-01", measurement_id), max_iso_timestamp="2022")
+        self.assertEqual(
+            {
+                "metric_uuid": METRIC_ID,
+                "start": {"$lt": "2022"},
+                "$or": [{"start": {"$gt": "2021-01-01"}}, {"start": "2021-01-01", "_id": {"$gt": measurement_id}}],
+            },
+            self.database.measurements.find.call_args.args[0],
+        )
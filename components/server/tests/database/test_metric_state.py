@@ -0,0 +1,132 @@
+"""Test the metric state collection."""
+
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+import pymongo
+
+from database.measurements import recent_measurements_by_metric_uuid
+from database.metric_state import (
+    SPARKLINE_MAX_POINTS,
+    latest_measurement_end,
+    latest_measurements,
+    update_state,
+    update_state_ends,
+)
+
+from ..fixtures import METRIC_ID, METRIC_ID2
+
+
+class MetricStateTest(unittest.TestCase):
+    """Unit tests for the metric state collection."""
+
+    def setUp(self):
+        """Override to create a mock database fixture."""
+        self.database = Mock()
+        self.now = datetime.now().isoformat()
+        self.measurement = dict(
+            _id="id",
+            metric_uuid=METRIC_ID,
+            start=self.now,
+            end=self.now,
+            count=dict(value="1", status="target_not_met", status_start=self.now),
+            sources=[dict(source_uuid="source_uuid", value="1", entities=[dict(key="entity")])],
+            sources_hash="hash",
+        )
+
+    def update(self):
+        """Return the update of the metric state."""
+        return self.database.metric_state.update_one.call_args.args[1]
+
+    def test_first_measurement(self):
+        """Test that the first measurement becomes the latest measurement, without entities."""
+        update_state(self.database, ["count"], self.measurement, None)
+        self.assertEqual([dict(source_uuid="source_uuid", value="1")], self.update()["$set"]["latest"]["sources"])
+        self.assertNotIn("_id", self.update()["$set"]["latest"])
+        self.assertNotIn("sources_hash", self.update()["$set"]["latest"])
+        self.assertEqual([], self.update()["$set"]["sparkline"])
+
+    def test_next_measurement(self):
+        """Test that the previous measurement is added to the sparkline, if the state has it as latest measurement."""
+        self.database.metric_state.update_one.return_value.matched_count = 1
+        previous = dict(start="2020-01-01", end="2020-01-02", count=dict(value="0", status="target_met"))
+        update_state(self.database, ["count"], self.measurement, previous)
+        state_filter = self.database.metric_state.update_one.call_args.args[0]
+        self.assertEqual(dict(metric_uuid=METRIC_ID, **{"latest.start": "2020-01-01"}), state_filter)
+        update = self.update()[0]["$set"]
+        self.assertEqual({"$literal": dict(count="target_met")}, update["previous_status"])
+        point = dict(start="2020-01-01", end="2020-01-02", count=previous["count"])
+        sparkline_input = update["sparkline"]["$slice"][0]["$filter"]["input"]["$concatArrays"]
+        self.assertEqual([{"$ifNull": ["$sparkline", []]}, [{"$literal": point}]], sparkline_input)
+        self.database.measurements.find.assert_not_called()
+
+    def test_sparkline_window(self):
+        """Test that the points of the sparkline that ended more than a week before the measurement are removed."""
+        self.database.metric_state.update_one.return_value.matched_count = 1
+        previous = dict(start="2020-01-01", end="2020-01-02", count=dict(value="0", status="target_met"))
+        update_state(self.database, ["count"], self.measurement, previous)
+        week_ago = (datetime.fromisoformat(self.now) - timedelta(days=7)).isoformat()
+        sparkline_filter = self.update()[0]["$set"]["sparkline"]["$slice"][0]
+        self.assertEqual({"$gte": ["$$this.end", week_ago]}, sparkline_filter["$filter"]["cond"])
+
+    def test_sparkline_size(self):
+        """Test that the sparkline keeps at most the maximum number of points."""
+        self.database.metric_state.update_one.return_value.matched_count = 1
+        previous = dict(start="2020-01-01", end="2020-01-02", count=dict(value="0", status="target_met"))
+        update_state(self.database, ["count"], self.measurement, previous)
+        self.assertEqual(-SPARKLINE_MAX_POINTS, self.update()[0]["$set"]["sparkline"]["$slice"][1])
+
+    def test_rebuild_stale_state(self):
+        """Test that the state is rebuilt from the measurements if it doesn't have the previous measurement."""
+        self.database.metric_state.update_one.return_value.matched_count = 0
+        count = dict(value="0", status="target_met")
+        previous = dict(metric_uuid=METRIC_ID, start="2020-01-01", end=self.now, count=count)
+        self.database.measurements.find.return_value = [self.measurement, previous]
+        update_state(self.database, ["count"], self.measurement, previous)
+        state = self.update()["$set"]
+        self.assertEqual(self.now, state["latest"]["start"])
+        self.assertEqual([dict(start="2020-01-01", end=self.now, count=previous["count"])], state["sparkline"])
+
+    def test_update_ends(self):
+        """Test that the end of the latest measurement of metrics can be updated."""
+        update_state_ends(self.database, {METRIC_ID: self.now})
+        self.database.metric_state.bulk_write.assert_called_once_with(
+            [pymongo.UpdateOne({"metric_uuid": METRIC_ID}, {"$set": {"latest.end": self.now, "end": self.now}})],
+            ordered=False,
+        )
+
+    def test_recent_measurements(self):
+        """Test that the recent measurements are read from the metric state."""
+        week_ago = (datetime.now() - timedelta(days=8)).isoformat()
+        old_point = dict(start=week_ago, end=week_ago, count=dict(value="0", status="target_met"))
+        point = dict(start=week_ago, end=self.now, count=dict(value="0", status="target_met"))
+        self.database.metric_state.find.return_value = [
+            dict(metric_uuid=METRIC_ID, latest=self.measurement, sparkline=[old_point, point])
+        ]
+        self.database.measurements.find.return_value = []
+        self.assertEqual(
+            {METRIC_ID: [point, self.measurement]},
+            recent_measurements_by_metric_uuid(self.database, metric_uuids=[METRIC_ID, METRIC_ID2]),
+        )
+        self.assertEqual(
+            {"$in": [METRIC_ID2]}, self.database.measurements.find.call_args.kwargs["filter"]["metric_uuid"]
+        )
+
+    def test_latest_measurements(self):
+        """Test that the latest measurements of the metrics are returned by metric uuid, without sources and end."""
+        latest = dict(metric_uuid=METRIC_ID, start=self.now, count=dict(value="1", status="target_met"))
+        self.database.metric_state.find.return_value = [dict(metric_uuid=METRIC_ID, latest=latest)]
+        self.assertEqual({METRIC_ID: latest}, latest_measurements(self.database, [METRIC_ID]))
+        projection = self.database.metric_state.find.call_args[0][1]
+        self.assertFalse(projection["latest.sources"] or projection["latest.end"])
+
+    def test_latest_measurement_end(self):
+        """Test that the most recent end of the latest measurements of the metrics is returned."""
+        self.database.metric_state.find_one.return_value = dict(end=self.now)
+        self.assertEqual(self.now, latest_measurement_end(self.database, [METRIC_ID]))
+
+    def test_latest_measurement_end_without_state(self):
+        """Test that an empty string is returned if the metrics have no state."""
+        self.database.metric_state.find_one.return_value = None
+        self.assertEqual("", latest_measurement_end(self.database, [METRIC_ID]))
@@ -2,9 +2,12 @@
 import unittest
 from unittest.mock import Mock
 
-from database.reports import latest_metric, metrics_of_subject
+import pymongo
+
+from database import changes
+from database.reports import insert_new_report, latest_metric, latest_reports, metrics_of_subject
 from server_utilities.type import MetricId
-from ..fixtures import METRIC_ID, METRIC_ID2, SUBJECT_ID
+from ..fixtures import METRIC_ID, METRIC_ID2, REPORT_ID, SUBJECT_ID
 
 
 class MetricsTest(unittest.TestCase):
@@ -14,13 +17,13 @@ class MetricsTest(unittest.TestCase):
         """Override to create a mock database fixture."""
         self.database = Mock()
         self.database.datamodels.find_one.return_value = dict(_id="id", metrics=dict(metric_type={}))
-        self.database.reports.find.return_value = [
-            dict(
-                _id="1",
-                report_uuid="report_uuid",
-                subjects=dict(subject_uuid=dict(metrics=dict(metric_uuid=dict(type="metric_type", tags=[])))),
-            )
-        ]
+        self.report = dict(
+            _id="1",
+            report_uuid="report_uuid",
+            subjects=dict(subject_uuid=dict(metrics=dict(metric_uuid=dict(type="metric_type", tags=[])))),
+        )
+        self.database.reports.find.return_value = [self.report]
+        self.database.reports.find_one.return_value = self.report
 
     def test_latest_metrics(self):
         """Test that the latest metrics are returned."""
@@ -38,6 +41,32 @@ class MetricsTest(unittest.TestCase):
         """Test that None is returned for missing metrics."""
         self.database.measurements.find.return_value = []
         self.assertEqual(None, latest_metric(self.database, MetricId("non-existing")))
+        self.database.reports.find_one.assert_not_called()
+
+    def test_latest_metric_reads_one_report(self):
+        """Test that only the metric is read from the report containing the metric."""
+        latest_metric(self.database, MetricId("metric_uuid"))
+        self.database.reports.find_one.assert_called_once_with(
+            dict(report_uuid="report_uuid", last=True, deleted={"$exists": False}),
+            projection={"_id": False, "subjects.subject_uuid.metrics.metric_uuid": True},
+        )
+
+    def test_index_is_reused(self):
+        """Test that the index of the reports is built once."""
+        latest_metric(self.database, MetricId("metric_uuid"))
+        latest_metric(self.database, MetricId("metric_uuid"))
+        self.database.reports.find.assert_called_once()
+
+    def test_index_is_rebuilt_after_report_change(self):
+        """Test that the index is rebuilt after a new version of a report has been inserted."""
+        self.database.sessions.find_one.return_value = None
+        self.database.generations.find_one.return_value = dict(generation=1)
+        latest_metric(self.database, MetricId("metric_uuid"))
+        insert_new_report(self.database, "Delta", (dict(self.report), ["report_uuid"]))
+        self.database.generations.find_one.return_value = dict(generation=2)
+        latest_metric(self.database, MetricId("metric_uuid"))
+        # The latest reports are read twice and insert_new_report() reads the previous version of the report once:
+        self.assertEqual(3, self.database.reports.find.call_count)
 
 
 class MetricsForSubjectTest(unittest.TestCase):
@@ -57,3 +86,124 @@ class MetricsForSubjectTest(unittest.TestCase):
         self.assertEqual(len(metric_uuids), 2)
         for m_id in metric_uuids:
             self.assertIn(m_id, [METRIC_ID, METRIC_ID2])
+
+
+class ReportVersionsTest(unittest.TestCase):
+    """Unit tests for storing previous versions of reports as patches."""
+
+    def setUp(self):
+        """Override to create a mock database fixture."""
+        self.database = Mock()
+        self.database.sessions.find_one.return_value = None
+        self.previous_version = dict(
+            _id="id",
+            report_uuid=REPORT_ID,
+            title="Old",
+            timestamp="2021-01-01T00:00:00+00:00",
+            delta=dict(description="Old change", email=""),
+            version=1,
+            last=True,
+        )
+        self.database.reports.find.return_value = [self.previous_version]
+
+    def test_previous_version_is_replaced_by_patch(self):
+        """Test that the previous version of the report is replaced by a patch that changes the report back."""
+        report = dict(report_uuid=REPORT_ID, title="New")
+        insert_new_report(self.database, "New change", (report, [REPORT_ID]))
+        self.assertEqual(2, report["version"])
+        self.database.reports.bulk_write.assert_called_once_with(
+            [
+                pymongo.ReplaceOne(
+                    {"_id": "id"},
+                    dict(
+                        report_uuid=REPORT_ID,
+                        timestamp="2021-01-01T00:00:00+00:00",
+                        delta=dict(description="Old change", email=""),
+                        version=1,
+                        patch=[dict(op="replace", path="/title", value="Old")],
+                    ),
+                )
+            ],
+            ordered=False,
+        )
+
+    def test_new_version_is_inserted_first(self):
+        """Test that the new version is inserted before the previous version loses its last flag and is patched."""
+        report = dict(report_uuid=REPORT_ID, title="New")
+        insert_new_report(self.database, "New change", (report, [REPORT_ID]))
+        write_methods = ("insert", "update_many", "bulk_write")
+        writes = [name for name, _, _ in self.database.reports.mock_calls if name in write_methods]
+        self.assertEqual(list(write_methods), writes)
+        self.database.reports.update_many.assert_called_once_with({"_id": {"$in": ["id"]}}, {"$unset": {"last": ""}})
+
+    def test_listeners_are_notified(self):
+        """Test that the listeners of the report are notified of the new version."""
+        listener = Mock()
+        changes.add_listener(self.database, REPORT_ID, listener)
+        insert_new_report(self.database, "New change", (dict(report_uuid=REPORT_ID, title="New"), [REPORT_ID]))
+        listener.assert_called_once_with()
+
+    def test_snapshot(self):
+        """Test that every so many versions, the previous version of the report is kept in full."""
+        self.previous_version["version"] = 20
+        report = dict(report_uuid=REPORT_ID, title="New")
+        insert_new_report(self.database, "New change", (report, [REPORT_ID]))
+        self.assertEqual(21, report["version"])
+        self.database.reports.bulk_write.assert_not_called()
+
+    def test_report_without_version(self):
+        """Test that a previous version of the report stored before versions were introduced is kept in full."""
+        del self.previous_version["version"]
+        report = dict(report_uuid=REPORT_ID, title="New")
+        insert_new_report(self.database, "New change", (report, [REPORT_ID]))
+        self.assertEqual(1, report["version"])
+        self.database.reports.bulk_write.assert_not_called()
+
+    def test_reconstruct_previous_version(self):
+        """Test that a previous version of the report is reconstructed from the next full version and the patches."""
+        remove_tags = [dict(op="remove", path="/tags")]
+        report_patch = dict(_id="id21", report_uuid=REPORT_ID, timestamp="2021-01-21", version=21, patch=remove_tags)
+        self.database.reports.aggregate.return_value = [report_patch]
+        self.database.reports.find.return_value = [
+            dict(_id="id23", report_uuid=REPORT_ID, title="Version 23", tags=["tag"], version=23, last=True),
+            dict(_id="id22", report_uuid=REPORT_ID, version=22, patch=[dict(op="replace", path="/title", value="22")]),
+            dict(report_patch),
+        ]
+        expected_report = dict(_id="id21", report_uuid=REPORT_ID, timestamp="2021-01-21", version=21, title="22")
+        self.assertEqual([expected_report], latest_reports(self.database, "2021-01-22T00:00:00+00:00"))
+        self.database.reports.find.assert_called_once_with(
+            dict(report_uuid=REPORT_ID, version={"$gte": 21, "$lte": 40}), sort=[("version", pymongo.DESCENDING)]
+        )
+
+    def test_reconstructed_versions_are_cached(self):
+        """Test that reconstructed versions of the report are cached."""
+        self.database.reports.aggregate.return_value = [
+            dict(_id="id2", report_uuid=REPORT_ID, timestamp="2021-01-02", version=2, patch=[])
+        ]
+        self.database.reports.find.return_value = [dict(_id="id3", report_uuid=REPORT_ID, version=3, last=True)]
+        latest_reports(self.database, "2021-01-03T00:00:00+00:00")
+        latest_reports(self.database, "2021-01-04T00:00:00+00:00")
+        self.database.reports.find.assert_called_once()
+
+
+class LatestReportsTest(unittest.TestCase):
+    """Unit tests for reading the latest reports."""
+
+    def setUp(self):
+        """Override to create a mock database fixture."""
+        self.database = Mock()
+
+    def test_latest_reports(self):
+        """Test that the latest reports are the last versions of the reports."""
+        self.database.reports.find.return_value = [dict(_id="id", report_uuid=REPORT_ID, last=True)]
+        self.assertEqual([dict(_id="id", report_uuid=REPORT_ID, last=True)], latest_reports(self.database))
+        self.database.reports.find.assert_called_once_with({"last": True, "deleted": {"$exists": False}})
+
+    def test_latest_reports_in_the_past(self):
+        """Test that the latest reports as of a date in the past are read with one aggregation."""
+        self.database.reports.aggregate.return_value = [dict(_id="id", report_uuid=REPORT_ID)]
+        self.assertEqual([dict(_id="id", report_uuid=REPORT_ID)], latest_reports(self.database, "2021-01-01"))
+        pipeline = self.database.reports.aggregate.call_args[0][0]
+        self.assertEqual({"$match": {"timestamp": {"$lt": "2021-01-01"}}}, pipeline[0])
+        self.assertEqual({"$match": {"deleted": {"$exists": False}}}, pipeline[-1])
+        self.database.reports.find_one.assert_not_called()
@@ -0,0 +1,89 @@
+"""Test the rollups collection."""
+
+import unittest
+from unittest.mock import Mock
+
+import pymongo
+
+from database.rollups import coarsest_adequate_period, period_start, update_rollups, update_rollups_ends
+
+from ..fixtures import METRIC_ID
+
+
+class PeriodTest(unittest.TestCase):
+    """Unit tests for the rollup periods."""
+
+    def test_period_start(self):
+        """Test the start of the hour, day, and week containing a timestamp."""
+        timestamp = "2021-01-28T13:45:12+00:00"  # A Thursday
+        self.assertEqual("2021-01-28T13:00:00+00:00", period_start("hour", timestamp))
+        self.assertEqual("2021-01-28T00:00:00+00:00", period_start("day", timestamp))
+        self.assertEqual("2021-01-25T00:00:00+00:00", period_start("week", timestamp))
+
+    def test_coarsest_adequate_period(self):
+        """Test that the coarsest period with enough points for the time window is picked."""
+        year_2020 = ("2020-01-01T00:00:00+00:00", "2021-01-01T00:00:00+00:00")
+        self.assertEqual("week", coarsest_adequate_period(*year_2020, 52))
+        self.assertEqual("day", coarsest_adequate_period(*year_2020, 100))
+        self.assertEqual("hour", coarsest_adequate_period(*year_2020, 1000))
+        self.assertEqual("hour", coarsest_adequate_period(*year_2020, 100000))
+
+
+class UpdateRollupsTest(unittest.TestCase):
+    """Unit tests for updating the rollups."""
+
+    def setUp(self):
+        """Override to create a mock database fixture."""
+        self.database = Mock()
+        self.measurement = dict(
+            metric_uuid=METRIC_ID,
+            start="2021-01-28T13:45:12+00:00",
+            end="2021-01-28T13:45:12+00:00",
+            count=dict(value="10", status="target_met"),
+        )
+
+    @staticmethod
+    def rollup_filter(period: str, start: str):
+        """Return the filter of the rollup of the metric for the period starting at start."""
+        return dict(metric_uuid=METRIC_ID, period=period, start=start)
+
+    def test_update_rollups(self):
+        """Test that the measurement is added to the hourly, daily, and weekly rollup."""
+        update_rollups(self.database, ["count"], self.measurement)
+        update = {
+            "$set": {"end": self.measurement["end"], "latest": True, "count.value": "10", "count.status": "target_met"},
+            "$min": {"count.min": 10.0},
+            "$max": {"count.max": 10.0},
+        }
+        self.assertEqual(
+            [
+                pymongo.UpdateMany({"metric_uuid": METRIC_ID, "latest": True}, {"$unset": {"latest": ""}}),
+                pymongo.UpdateOne(self.rollup_filter("hour", "2021-01-28T13:00:00+00:00"), update, upsert=True),
+                pymongo.UpdateOne(self.rollup_filter("day", "2021-01-28T00:00:00+00:00"), update, upsert=True),
+                pymongo.UpdateOne(self.rollup_filter("week", "2021-01-25T00:00:00+00:00"), update, upsert=True),
+            ],
+            self.database.rollups.bulk_write.call_args.args[0],
+        )
+
+    def test_update_rollups_without_value(self):
+        """Test that the minimum and maximum are not changed if the measurement has no value."""
+        self.measurement["count"] = dict(value=None, status="unknown")
+        update_rollups(self.database, ["count"], self.measurement)
+        end = self.measurement["end"]
+        update = {"$set": {"end": end, "latest": True, "count.value": None, "count.status": "unknown"}}
+        self.assertEqual(
+            pymongo.UpdateOne(self.rollup_filter("hour", "2021-01-28T13:00:00+00:00"), update, upsert=True),
+            self.database.rollups.bulk_write.call_args.args[0][1],
+        )
+
+    def test_update_rollups_ends(self):
+        """Test that the end of the latest rollups is updated."""
+        update_rollups_ends(self.database, {METRIC_ID: "2021-01-28T14:00:00+00:00"})
+        self.database.rollups.bulk_write.assert_called_once_with(
+            [
+                pymongo.UpdateMany(
+                    {"metric_uuid": METRIC_ID, "latest": True}, {"$set": {"end": "2021-01-28T14:00:00+00:00"}}
+                )
+            ],
+            ordered=False,
+        )
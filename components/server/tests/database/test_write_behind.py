@@ -0,0 +1,94 @@
+"""Test the write-behind buffer for measurement end updates."""
+
+import unittest
+from unittest.mock import Mock, patch
+
+import pymongo
+
+from database.write_behind import MAX_BUFFERED_UPDATES, buffer_measurement_end, flush_measurement_ends
+
+from ..fixtures import METRIC_ID, METRIC_ID2
+
+
+@patch("database.write_behind.threading.Timer", Mock())
+class WriteBehindTest(unittest.TestCase):
+    """Unit tests for the write-behind buffer."""
+
+    def setUp(self):
+        """Override to create a mock database fixture."""
+        self.database = Mock()
+
+    def test_buffer(self):
+        """Test that the update is not written right away."""
+        buffer_measurement_end(self.database, "id", METRIC_ID, "2021-01-01")
+        self.database.measurements.bulk_write.assert_not_called()
+
+    def test_flush(self):
+        """Test that the buffered updates are written to the measurements, metric states, and rollups."""
+        buffer_measurement_end(self.database, "id", METRIC_ID, "2021-01-01")
+        flush_measurement_ends(self.database)
+        self.database.measurements.bulk_write.assert_called_once_with(
+            [pymongo.UpdateOne({"_id": "id"}, {"$set": {"end": "2021-01-01"}})], ordered=False
+        )
+        self.database.metric_state.bulk_write.assert_called_once()
+        self.database.rollups.bulk_write.assert_called_once()
+
+    def test_coalesce(self):
+        """Test that only the most recent end per measurement is written."""
+        buffer_measurement_end(self.database, "id", METRIC_ID, "2021-01-01")
+        buffer_measurement_end(self.database, "id", METRIC_ID, "2021-01-02")
+        buffer_measurement_end(self.database, "id2", METRIC_ID2, "2021-01-02")
+        flush_measurement_ends(self.database)
+        self.database.measurements.bulk_write.assert_called_once_with(
+            [
+                pymongo.UpdateOne({"_id": "id"}, {"$set": {"end": "2021-01-02"}}),
+                pymongo.UpdateOne({"_id": "id2"}, {"$set": {"end": "2021-01-02"}}),
+            ],
+            ordered=False,
+        )
+
+    def test_flush_empty_buffer(self):
+        """Test that nothing is written if the buffer is empty."""
+        flush_measurement_ends(self.database)
+        buffer_measurement_end(self.database, "id", METRIC_ID, "2021-01-01")
+        flush_measurement_ends(self.database)
+        flush_measurement_ends(self.database)
+        self.database.measurements.bulk_write.assert_called_once()
+
+    def test_flush_when_full(self):
+        """Test that the buffer is written when it's full."""
+        for index in range(MAX_BUFFERED_UPDATES):
+            buffer_measurement_end(self.database, f"id{index}", METRIC_ID, "2021-01-01")
+        self.assertEqual(MAX_BUFFERED_UPDATES, len(self.database.measurements.bulk_write.call_args.args[0]))
+
+    def test_flush_after_interval(self):
+        """Test that a timer is started to write the buffer after the flush interval."""
+        with patch("database.write_behind.threading.Timer") as timer:
+            buffer_measurement_end(self.database, "id", METRIC_ID, "2021-01-01")
+            buffer_measurement_end(self.database, "id2", METRIC_ID, "2021-01-01")
+        timer.assert_called_once_with(1.0, flush_measurement_ends, args=(self.database,))
+        timer.return_value.start.assert_called_once()
+
+    def test_failed_flush(self):
+        """Test that the updates are put back in the buffer if writing them fails, without overwriting newer ends."""
+        buffer_measurement_end(self.database, "id", METRIC_ID, "2021-01-01")
+        buffer_measurement_end(self.database, "id2", METRIC_ID, "2021-01-01")
+
+
+        def fail(*args, **kwargs):
+            """Buffer a newer end while the write is in progress and then fail."""
+            buffer_measurement_end(self.database, "id2", METRIC_ID, "2021-01-02")
+            raise pymongo.errors.AutoReconnect
+
+        self.database.measurements.bulk_write.side_effect = fail
+        with self.assertLogs(level="ERROR"):
+            flush_measurement_ends(self.database)
+        self.database.measurements.bulk_write.side_effect = None
+        flush_measurement_ends(self.database)
+        self.assertCountEqual(
+            [
+                pymongo.UpdateOne({"_id": "id"}, {"$set": {"end": "2021-01-01"}}),
+                pymongo.UpdateOne({"_id": "id2"}, {"$set": {"end": "2021-01-02"}}),
+            ],
+            self.database.measurements.bulk_write.call_args.args[0],
+        )
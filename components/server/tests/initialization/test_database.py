@@ -5,6 +5,7 @@ import unittest
 from unittest.mock import Mock, mock_open, patch
 
 from initialization.database import init_database
+from initialization.indexes import INDEXES
 
 
 class DatabaseInitTest(unittest.TestCase):
@@ -21,6 +22,12 @@ class DatabaseInitTest(unittest.TestCase):
         self.database.reports.count_documents.return_value = 0
         self.database.sessions.find_one.return_value = dict(user="jodoe")
         self.database.measurements.count_documents.return_value = 0
+        self.database.measurements.find.return_value = []
+        self.database.measurements.find_one.return_value = None
+        self.database.metric_state.distinct.return_value = []
+        self.database.rollups.distinct.return_value = []
+        for collection in INDEXES:
+            getattr(self.database, collection).index_information.return_value = {}
         self.mongo_client().quality_time_db = self.database
 
     def init_database(self, data_model_json: str, assert_glob_called: bool = True) -> None:
@@ -125,3 +132,58 @@ class DatabaseInitTest(unittest.TestCase):
                 },
             },
         )
+
+    def test_create_metric_states(self):
+        """Test that the state is created for metrics with measurements, but without state."""
+        self.database.datamodels.find_one.return_value = dict(
+            _id="id", timestamp="now", metrics=dict(violations=dict(scales=["count"]))
+        )
+        self.database.reports.find.return_value = [
+            {"_id": "1", "subjects": {"subject": {"metrics": {"metric": {"type": "violations"}}}}}
+        ]
+        self.database.measurements.find.return_value = [
+            dict(metric_uuid="metric", start="2", end="3", count=dict(value="1", status="target_not_met"), sources=[]),
+            dict(metric_uuid="metric", start="1", end="2", count=dict(value="0", status="target_met"), sources=[]),
+        ]
+        self.database.rollups.distinct.return_value = ["metric"]
+        self.init_database("{}")
+        state = self.database.metric_state.update_one.call_args.args[1]["$set"]
+        self.assertEqual("3", state["latest"]["end"])
+        self.assertEqual(dict(count="target_met"), state["previous_status"])
+        self.assertEqual([dict(start="1", end="2", count=dict(value="0", status="target_met"))], state["sparkline"])
+
+    def test_skip_metrics_with_state(self):
+        """Test that the state is not created for metrics that already have state."""
+        self.database.reports.find.return_value = [
+            {"_id": "1", "subjects": {"subject": {"metrics": {"metric": {"type": "violations"}}}}}
+        ]
+        self.database.metric_state.distinct.return_value = ["metric"]
+        self.init_database("{}")
+        self.database.metric_state.update_one.assert_not_called()
+
+    def test_create_metric_rollups(self):
+        """Test that rollups are created for metrics with measurements, but without rollups."""
+        self.database.datamodels.find_one.return_value = dict(
+            _id="id", timestamp="now", metrics=dict(violations=dict(scales=["count"]))
+        )
+        self.database.reports.find.return_value = [
+            {"_id": "1", "subjects": {"subject": {"metrics": {"metric": {"type": "violations"}}}}}
+        ]
+        self.database.metric_state.distinct.return_value = ["metric"]
+        self.database.measurements.find.return_value = [
+            dict(metric_uuid="metric", start="2021-01-01T10:00:00", end="2021-01-01T11:30:00", count=dict(value="1")),
+            dict(metric_uuid="metric", start="2021-01-01T11:30:00", end="2021-01-01T12:00:00", count=dict(value="0")),
+        ]
+        self.init_database("{}")
+        rollups = self.database.rollups.insert_many.call_args.args[0]
+        self.assertEqual(["hour", "hour", "day", "week"], [rollup["period"] for rollup in rollups])
+        self.assertEqual(dict(value="0", status=None, min=0.0, max=1.0), rollups[2]["count"])
+
+    def test_skip_metrics_with_rollups(self):
+        """Test that rollups are not created for metrics that already have rollups."""
+        self.database.reports.find.return_value = [
+            {"_id": "1", "subjects": {"subject": {"metrics": {"metric": {"type": "violations"}}}}}
+        ]
+        self.database.rollups.distinct.return_value = ["metric"]
+        self.init_database("{}")
+        self.database.rollups.insert_many.assert_not_called()
@@ -0,0 +1,61 @@
+"""Unit tests for the database indexes."""
+
+import unittest
+from unittest.mock import Mock
+
+from pymongo import ASCENDING, IndexModel
+
+from initialization.indexes import INDEXES, reconcile_collection_indexes, reconcile_indexes
+
+
+class ReconcileIndexesTest(unittest.TestCase):
+    """Unit tests for reconciling the indexes in the database with the index definitions."""
+
+    def setUp(self):
+        """Override to create a mock collection fixture."""
+        self.collection = Mock()
+        self.indexes = [IndexModel([("metric_uuid", ASCENDING), ("start", ASCENDING)])]
+
+    def test_create_missing_indexes(self):
+        """Test that missing indexes are created."""
+        self.collection.index_information.return_value = {"_id_": dict(key=[("_id", 1)])}
+        reconcile_collection_indexes(self.collection, self.indexes)
+        self.collection.create_indexes.assert_called_once_with(self.indexes)
+        self.collection.drop_index.assert_not_called()
+
+    def test_keep_existing_indexes(self):
+        """Test that existing indexes are kept."""
+        self.collection.index_information.return_value = {
+            "_id_": dict(key=[("_id", 1)]),
+            "metric_uuid_1_start_1": dict(key=[("metric_uuid", 1), ("start", 1)]),
+        }
+        reconcile_collection_indexes(self.collection, self.indexes)
+        self.collection.create_indexes.assert_not_called()
+        self.collection.drop_index.assert_not_called()
+
+    def test_drop_obsolete_indexes(self):
+        """Test that indexes that are no longer defined are dropped."""
+        self.collection.index_information.return_value = {
+            "metric_uuid_1_start_1": dict(key=[("metric_uuid", 1), ("start", 1)]),
+            "obsolete_1": dict(key=[("obsolete", 1)]),
+        }
+        reconcile_collection_indexes(self.collection, self.indexes)
+        self.collection.drop_index.assert_called_once_with("obsolete_1")
+
+    def test_recreate_changed_indexes(self):
+        """Test that indexes whose definition changed are dropped and created again."""
+        self.collection.index_information.return_value = {
+            "metric_uuid_1_start_1": dict(key=[("metric_uuid", 1), ("start", 1)]),
+        }
+        indexes = [IndexModel([("metric_uuid", ASCENDING), ("start", ASCENDING)], unique=True)]
+        reconcile_collection_indexes(self.collection, indexes)
+        self.collection.drop_index.assert_called_once_with("metric_uuid_1_start_1")
+        self.collection.create_indexes.assert_called_once_with(indexes)
+
+    def test_reconcile_all_collections(self):
+        """Test that the indexes of all collections with index definitions are reconciled."""
+        database = Mock()
+        for collection in INDEXES:
+            getattr(database, collection).index_information.return_value = {}
+        reconcile_indexes(database)
+        database.sessions.create_indexes.assert_called_once_with(INDEXES["sessions"])
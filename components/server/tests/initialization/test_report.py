@@ -5,7 +5,7 @@ import pathlib
 import unittest
 from unittest.mock import Mock, mock_open, patch
 
-from initialization.report import import_example_reports, import_report
+from initialization.report import import_example_reports, import_json_reports, import_reports
 
 
 class ReportInitTest(unittest.TestCase):
@@ -15,6 +15,7 @@ class ReportInitTest(unittest.TestCase):
         """Override to create database and JSON fixtures."""
         self.database = Mock()
         self.database.reports.distinct.return_value = []
+        self.database.reports.find.return_value = []
         self.database.datamodels.find_one.return_value = dict(
             _id="id",
             subjects=dict(subject_type=dict(name="name", description="")),
@@ -45,7 +46,7 @@ class ReportInitTest(unittest.TestCase):
     def import_report(self, report_json: str) -> None:
         """Import the report."""
         with patch.object(pathlib.Path, "open", mock_open(read_data=report_json)):
-            import_report(self.database, pathlib.Path("filename"))
+            import_reports(self.database, pathlib.Path("filename"))
 
     def test_import(self):
         """Test that a report can be imported."""
@@ -64,3 +65,26 @@ class ReportInitTest(unittest.TestCase):
             with patch.object(pathlib.Path, "open", mock_open(read_data=self.report_json)):
                 import_example_reports(self.database)
         self.database.reports.insert.assert_called_once()
+
+    def test_import_many_reports(self):
+        """Test that many reports are imported with one read of the data model and one insert."""
+        report = json.loads(self.report_json)
+        import_json_reports(self.database, [report, dict(report, report_uuid="id2")])
+        self.database.datamodels.find_one.assert_called_once()
+        inserted_reports = self.database.reports.insert_many.call_args[0][0]
+        self.assertEqual(["id", "id2"], [inserted_report["report_uuid"] for inserted_report in inserted_reports])
+        for inserted_report in inserted_reports:
+            subject = list(inserted_report["subjects"].values())[0]
+            source = list(list(subject["metrics"].values())[0]["sources"].values())[0]
+            self.assertEqual(dict(p1={}, p2="p2"), source["parameters"])
+
+    def test_import_unknown_type(self):
+        """Test that reports with unknown types aren't imported."""
+        report = json.loads(self.report_json)
+        report["subjects"][0]["metrics"][0]["type"] = "unknown_metric_type"
+        self.assertRaises(ValueError, import_json_reports, self.database, [json.loads(self.report_json), report])
+        self.database.reports.insert_many.assert_not_called()
+
+    def test_import_nothing(self):
+        """Test that importing no reports is an error."""
+        self.assertRaises(ValueError, import_json_reports, self.database, [])
@@ -0,0 +1,63 @@
+"""Unit tests for the data model index."""
+
+import unittest
+
+from model.datamodel_index import DataModelIndex, datamodel_index
+
+
+class DataModelIndexTest(unittest.TestCase):
+    """Unit tests for the data model index."""
+
+    def setUp(self):
+        """Override to create the data model and the index."""
+        self.data_model = dict(
+            sources=dict(
+                jira=dict(
+                    parameters=dict(
+                        url=dict(type="url", default_value="", metrics=["user_story_points", "issues"]),
+                        password=dict(type="password", default_value="", metrics=["user_story_points"]),
+                    ),
+                    entities=dict(
+                        user_story_points=dict(
+                            measured_attribute="points", attributes=[dict(key="points", type="float")]
+                        ),
+                        issues=dict(attributes=[dict(key="summary")]),
+                    ),
+                )
+            )
+        )
+        self.index = DataModelIndex(self.data_model)
+
+    def test_is_password_parameter(self):
+        """Test that password parameters, and parameters that are not in the data model, are passwords."""
+        self.assertTrue(self.index.is_password_parameter("jira", "password"))
+        self.assertTrue(self.index.is_password_parameter("jira", "removed_parameter"))
+        self.assertFalse(self.index.is_password_parameter("jira", "url"))
+
+    def test_default_source_parameters(self):
+        """Test that the default source parameters depend on the metric type."""
+        self.assertEqual(dict(url="", password=""), self.index.default_source_parameters("user_story_points", "jira"))
+        self.assertEqual(dict(url=""), self.index.default_source_parameters("issues", "jira"))
+
+    def test_default_source_parameters_are_copies(self):
+        """Test that changing the default source parameters doesn't change the index."""
+        self.index.default_source_parameters("issues", "jira")["url"] = "https://jira"
+        self.assertEqual(dict(url=""), self.index.default_source_parameters("issues", "jira"))
+
+    def test_measured_attribute(self):
+        """Test that the measured attribute is returned with the converter of its type."""
+        attribute, convert = self.index.measured_attribute("user_story_points", "jira")
+        self.assertEqual("points", attribute)
+        self.assertEqual(2.5, convert("2.5"))
+        self.assertIsNone(self.index.measured_attribute("issues", "jira"))
+
+    def test_index_per_version(self):
+        """Test that the index is built once per data model version."""
+        self.data_model.update(_id="id", timestamp="2021-01-01T00:00:00+00:00")
+        self.assertIs(datamodel_index(self.data_model), datamodel_index(dict(self.data_model)))
+        newer_data_model = dict(self.data_model, timestamp="2021-02-01T00:00:00+00:00")
+        self.assertIsNot(datamodel_index(self.data_model), datamodel_index(newer_data_model))
+
+    def test_data_model_without_version(self):
+        """Test that data models without id and timestamp are indexed on each call."""
+        self.assertIsNot(datamodel_index(self.data_model), datamodel_index(self.data_model))
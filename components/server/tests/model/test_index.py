@@ -0,0 +1,47 @@
+"""Unit tests for the uuid index."""
+
+import unittest
+
+from model.index import UUIDIndex
+
+from ..fixtures import (
+    METRIC_ID,
+    NOTIFICATION_DESTINATION_ID,
+    REPORT_ID,
+    SOURCE_ID,
+    SUBJECT_ID,
+    create_report,
+)
+
+
+class UUIDIndexTest(unittest.TestCase):
+    """Unit tests for the uuid index."""
+
+    def setUp(self):
+        """Override to create the index."""
+        self.index = UUIDIndex([create_report()])
+
+    def test_path(self):
+        """Test that the path of a source contains the uuids of the report, subject, metric and source."""
+        self.assertEqual((REPORT_ID, SUBJECT_ID, METRIC_ID, SOURCE_ID), self.index.path(SOURCE_ID))
+
+    def test_notification_destination_path(self):
+        """Test that the path of a notification destination contains the report uuid."""
+        self.assertEqual((REPORT_ID, NOTIFICATION_DESTINATION_ID), self.index.path(NOTIFICATION_DESTINATION_ID))
+
+    def test_containers(self):
+        """Test that the uuids of the containing report, subject, and metric can be looked up."""
+        self.assertEqual(REPORT_ID, self.index.report_uuid(SOURCE_ID))
+        self.assertEqual(SUBJECT_ID, self.index.subject_uuid(SOURCE_ID))
+        self.assertEqual(METRIC_ID, self.index.metric_uuid(SOURCE_ID))
+
+    def test_missing_uuid(self):
+        """Test that missing uuids are not in the index."""
+        self.assertNotIn("missing", self.index)
+        self.assertRaises(KeyError, self.index.path, "missing")
+
+    def test_metric_uuids(self):
+        """Test that the uuids of the metrics can be looked up per report."""
+        self.assertEqual([METRIC_ID], self.index.metric_uuids(REPORT_ID))
+        self.assertEqual([METRIC_ID], self.index.metric_uuids())
+        self.assertEqual([], self.index.metric_uuids("missing"))
@@ -0,0 +1,117 @@
+"""Unit tests for the batch route."""
+
+import unittest
+from unittest.mock import Mock, patch
+
+import bottle
+
+from routes import metric, subject  # noqa: F401, pylint: disable=unused-import
+from routes.batch import post_batch
+
+from ..fixtures import JOHN, METRIC_ID, REPORT_ID, SUBJECT_ID, create_report
+
+
+class PostBatchTest(unittest.TestCase):
+    """Unit tests for the post batch route."""
+
+    def setUp(self):
+        """Override to create a mock database fixture and a request."""
+        self.report = create_report()
+        self.database = Mock()
+        self.database.reports.find.return_value = [self.report]
+        self.database.measurements.find_one.return_value = None
+        self.database.sessions.find_one.return_value = JOHN
+        self.database.datamodels.find_one.return_value = dict(
+            _id="id",
+            metrics=dict(
+                metric_type=dict(
+                    name="Metric type",
+                    scales=["count"],
+                    default_scale="count",
+                    addition="sum",
+                    direction="<",
+                    target="0",
+                    near_target="1",
+                    tags=[],
+                )
+            ),
+            subjects=dict(subject_type=dict(name="Subject type")),
+        )
+        bottle.request.bind({})
+
+    def post_batch(self, *operations):
+        """Post the operations as batch."""
+        bottle.request.environ["bottle.request.json"] = dict(operations=list(operations))
+        return post_batch(self.database)
+
+    def test_insert_changed_report_once(self):
+        """Test that the report is inserted once with a combined delta description."""
+        result = self.post_batch(
+            dict(path=f"/api/v3/metric/{METRIC_ID}/attribute/name", body=dict(name="New name")),
+            dict(path=f"/api/v3/metric/{METRIC_ID}/attribute/unit", body=dict(unit="issues")),
+        )
+        self.assertEqual(dict(ok=True, results=[dict(ok=True), dict(ok=True)]), result)
+        self.database.reports.insert.assert_called_once_with(self.report)
+        self.assertEqual(
+            "John made 2 changes: changed the name of metric 'Metric' of subject 'Subject' in report 'Report' from "
+            "'Metric' to 'New name'; changed the unit of metric 'New name' of subject 'Subject' in report 'Report' "
+            "from '' to 'issues'.",
+            self.report["delta"]["description"],
+        )
+        self.assertEqual([REPORT_ID, SUBJECT_ID, METRIC_ID], self.report["delta"]["uuids"])
+
+    def test_single_operation(self):
+        """Test that the delta description of a batch with one operation is not changed."""
+        self.post_batch(dict(path=f"/api/v3/metric/{METRIC_ID}/attribute/name", body=dict(name="New name")))
+        self.assertEqual(
+            "John changed the name of metric 'Metric' of subject 'Subject' in report 'Report' from 'Metric' to "
+            "'New name'.",
+            self.report["delta"]["description"],
+        )
+
+    def test_refer_to_earlier_result(self):
+        """Test that operations can refer to the results of earlier operations."""
+        result = self.post_batch(
+            dict(path=f"/api/v3/metric/new/{SUBJECT_ID}"),
+            dict(path="/api/v3/metric/{0.new_metric_uuid}/attribute/name", body=dict(name="New metric")),
+        )
+        new_metric_uuid = result["results"][0]["new_metric_uuid"]
+        new_metric = self.report["subjects"][SUBJECT_ID]["metrics"][new_metric_uuid]
+        self.assertEqual("New metric", new_metric["name"])
+        self.database.reports.insert.assert_called_once_with(self.report)
+
+    def test_delete(self):
+        """Test that operations can delete items."""
+        self.post_batch(dict(method="DELETE", path=f"/api/v3/metric/{METRIC_ID}"))
+        self.assertEqual({}, self.report["subjects"][SUBJECT_ID]["metrics"])
+
+    @patch("database.measurements.iso_timestamp", new=Mock(return_value="2021-01-01"))
+    def test_insert_measurement_after_report(self):
+        """Test that new measurements needed because of changed targets are inserted after the report."""
+        self.database.measurements.find_one.return_value = dict(_id="id", metric_uuid=METRIC_ID, sources=[])
+        self.post_batch(dict(path=f"/api/v3/metric/{METRIC_ID}/attribute/target", body=dict(target="10")))
+        calls = [name for name, _, _ in self.database.mock_calls]
+        self.assertLess(calls.index("reports.insert"), calls.index("measurements.insert_one"))
+
+    def test_invalid_path(self):
+        """Test that an invalid path results in an error and that no reports are inserted."""
+        self.assertRaises(
+            bottle.HTTPError,
+            self.post_batch,
+            dict(path=f"/api/v3/metric/{METRIC_ID}/attribute/name", body=dict(name="New name")),
+            dict(path="/api/v3/invalid"),
+        )
+        self.database.reports.insert.assert_not_called()
+
+    def test_operation_not_allowed(self):
+        """Test that only operations that change reports are allowed."""
+        with self.assertRaises(bottle.HTTPError) as context:
+            self.post_batch(dict(method="GET", path=f"/api/v3/subject/{SUBJECT_ID}/measurements"))
+        self.assertEqual(400, context.exception.status_code)
+
+    def test_failing_operation(self):
+        """Test that a failing operation results in an error and that no reports are inserted."""
+        with self.assertRaises(bottle.HTTPError) as context:
+            self.post_batch(dict(path="/api/v3/metric/missing/attribute/name", body=dict(name="New name")))
+        self.assertIn("Operation 0 failed", context.exception.body)
+        self.database.reports.insert.assert_not_called()
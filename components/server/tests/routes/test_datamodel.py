@@ -15,6 +15,14 @@ class DataModelTest(unittest.TestCase):
 
     def setUp(self):
         self.database = Mock()
+        self.data_model = dict(
+            _id=123,
+            timestamp="now",
+            scales=dict(count=dict(name="Count")),
+            subjects=dict(software=dict(name="Software")),
+            metrics=dict(violations=dict(name="Violations", unit="violations")),
+            sources=dict(sonarqube=dict(name="SonarQube", parameters={})),
+        )
 
     def test_get_data_model(self):
         """Test that the data model can be retrieved."""
@@ -29,9 +37,64 @@ class DataModelTest(unittest.TestCase):
     @patch("bottle.request")
     def test_get_data_model_unchanged(self, mocked_request):
         """Test that a 304 is returned when the data model is unchanged."""
-        mocked_request.headers = {"If-None-Match": "W/" + md5_hash("now")}
+        mocked_request.query = {}
+        mocked_request.headers = {"If-None-Match": f'W/"{md5_hash(repr((md5_hash("now"),)))}"'}
         self.database.datamodels.find_one.return_value = dict(_id=123, timestamp="now")
-        self.assertRaises(bottle.HTTPError, datamodel.get_data_model, self.database)
+        with self.assertRaises(bottle.HTTPResponse) as context:
+            datamodel.get_data_model(self.database)
+        self.assertEqual("no-cache", context.exception.get_header("Cache-Control"))
+
+    def test_get_data_model_index(self):
+        """Test that the data model index contains the names of the metric and source types."""
+        self.database.datamodels.find_one.return_value = self.data_model
+        self.assertEqual(
+            dict(
+                _id="123",
+                timestamp="now",
+                version=md5_hash("now"),
+                scales=dict(count=dict(name="Count")),
+                subjects=dict(software=dict(name="Software")),
+                metrics=dict(violations=dict(name="Violations")),
+                sources=dict(sonarqube=dict(name="SonarQube")),
+            ),
+            datamodel.get_data_model_index(self.database),
+        )
+        self.assertEqual("no-cache", bottle.response.get_header("Cache-Control"))
+
+    def test_get_data_model_index_missing(self):
+        """Test that the data model index is empty if the data model is not there."""
+        self.database.datamodels.find_one.return_value = None
+        self.assertEqual({}, datamodel.get_data_model_index(self.database))
+
+    def test_get_data_model_fragments(self):
+        """Test that metric types and source types can be retrieved separately."""
+        self.database.datamodels.find_one.return_value = self.data_model
+        metric = datamodel.get_data_model_metric("violations", self.database)
+        self.assertEqual(dict(name="Violations", unit="violations"), metric)
+        source = datamodel.get_data_model_source("sonarqube", self.database)
+        self.assertEqual(dict(name="SonarQube", parameters={}), source)
+
+    def test_get_data_model_fragments_have_own_etag(self):
+        """Test that the fragments have different ETags."""
+        self.database.datamodels.find_one.return_value = self.data_model
+        datamodel.get_data_model_metric("violations", self.database)
+        metric_etag = bottle.response.get_header("ETag")
+        datamodel.get_data_model_source("sonarqube", self.database)
+        self.assertNotEqual(metric_etag, bottle.response.get_header("ETag"))
+
+    def test_get_missing_data_model_fragment(self):
+        """Test that a 404 is returned if the data model doesn't contain the type."""
+        self.database.datamodels.find_one.return_value = self.data_model
+        self.assertRaises(bottle.HTTPError, datamodel.get_data_model_source, "missing", self.database)
+
+    @patch("bottle.request")
+    def test_get_data_model_version(self, mocked_request):
+        """Test that a data model version requested explicitly can be cached for a long time."""
+        mocked_request.query = dict(version=md5_hash("now"))
+        mocked_request.headers = {}
+        self.database.datamodels.find_one.return_value = self.data_model
+        datamodel.get_data_model_source("sonarqube", self.database)
+        self.assertEqual(datamodel.IMMUTABLE, bottle.response.get_header("Cache-Control"))
 
     def test_insert_data_model_with_id(self):
         """Test that a new data model can be inserted."""
@@ -45,18 +108,17 @@ class DataModelTest(unittest.TestCase):
 
     def test_default_source_parameters(self):
         """Test that the default source parameters can be retrieved from the data model."""
-        self.database.datamodels.find_one.return_value = dict(
+        data_model = dict(
             _id=123,
             sources=dict(
                 source_type=dict(parameters=dict(
                     other_parameter=dict(metrics=[]),
                     parameter=dict(default_value="name", metrics=["metric_type"])))))
-        self.assertEqual(dict(parameter="name"), default_source_parameters(self.database, "metric_type", "source_type"))
+        self.assertEqual(dict(parameter="name"), default_source_parameters(data_model, "metric_type", "source_type"))
 
     def test_default_subject_attributes(self):
         """Test that the default subject attributes can be retrieved from the data model."""
-        self.database.datamodels.find_one.return_value = dict(
-            _id=123, subjects=dict(subject_type=dict(name="name", description="description")))
+        data_model = dict(_id=123, subjects=dict(subject_type=dict(name="name", description="description")))
         self.assertEqual(
             dict(name=None, description="description", type="subject_type", metrics={}),
-            default_subject_attributes(self.database, "subject_type"))
+            default_subject_attributes(data_model, "subject_type"))
@@ -1,17 +1,28 @@
 """Unit tests for the measurement routes."""
 
+import json
 import unittest
 from datetime import date, timedelta
 from unittest.mock import Mock, patch
 
+import bottle
+import pymongo
+from bson import ObjectId
+
+from database.entities import entity_hash
+from database.measurements import sources_hash
+from database.write_behind import flush_measurement_ends
 from routes.measurement import (
+    get_measurements_of_metrics,
+    get_metric_measurements,
+    get_measurement_history,
     get_measurements,
     post_measurement,
     set_entity_attribute,
     stream_nr_measurements,
 )
 
-from ..fixtures import JOHN, METRIC_ID, REPORT_ID, SOURCE_ID, SUBJECT_ID, SUBJECT_ID2, create_report
+from ..fixtures import JOHN, METRIC_ID, METRIC_ID2, REPORT_ID, SOURCE_ID, SUBJECT_ID, SUBJECT_ID2, create_report
 
 
 class GetMeasurementsTest(unittest.TestCase):
@@ -63,6 +74,156 @@ class GetMeasurementsTest(unittest.TestCase):
         self.assertEqual(dict(measurements=[]), get_measurements(METRIC_ID, self.database))
 
 
+@patch("bottle.request")
+class GetMeasurementsOfMetricsTest(unittest.TestCase):
+    """Unit tests for the get measurements of metrics route."""
+
+    def setUp(self):
+        """Override to create a mock database fixture."""
+        self.database = Mock()
+        self.database.measurements.find.return_value = [
+            dict(metric_uuid=METRIC_ID, start="0", sources=[]),
+            dict(metric_uuid=METRIC_ID, start="1", sources=[]),
+            dict(metric_uuid=METRIC_ID2, start="1", sources=[]),
+        ]
+        self.database.measurements.aggregate.return_value = [
+            dict(
+                _id=METRIC_ID, latest=dict(metric_uuid=METRIC_ID, start="1", sources=[dict(entities=[dict(key="a")])])
+            ),
+            dict(_id=METRIC_ID2, latest=dict(metric_uuid=METRIC_ID2, start="1", sources=[dict(entities=[])])),
+        ]
+
+    def test_latest_measurements_use_index(self, request):
+        """Test that the latest measurements are sorted in the direction of the (metric_uuid, start) index."""
+        request.query = dict(metric_uuids=METRIC_ID, entities="latest")
+        get_measurements_of_metrics(self.database)
+        pipeline = self.database.measurements.aggregate.call_args.args[0]
+        self.assertEqual({"metric_uuid": -1, "start": -1}, pipeline[1]["$sort"])
+        self.assertTrue(self.database.measurements.aggregate.call_args.kwargs["allowDiskUse"])
+        self.assertEqual({"latest._id": False, "latest.sources_hash": False}, pipeline[3]["$project"])
+
+    def test_get_measurements(self, request):
+        """Test that the measurements of the metrics are returned in one request, grouped by metric uuid."""
+        request.query = dict(metric_uuids=f"{METRIC_ID},{METRIC_ID2}")
+        self.assertEqual(
+            dict(
+                measurements={
+                    METRIC_ID: [
+                        dict(metric_uuid=METRIC_ID, start="0", sources=[]),
+                        dict(metric_uuid=METRIC_ID, start="1", sources=[]),
+                    ],
+                    METRIC_ID2: [dict(metric_uuid=METRIC_ID2, start="1", sources=[])],
+                }
+            ),
+            get_measurements_of_metrics(self.database),
+        )
+        measurement_filter = self.database.measurements.find.call_args.args[0]
+        self.assertEqual({"$in": sorted([METRIC_ID, METRIC_ID2])}, measurement_filter["metric_uuid"])
+        self.database.measurements.aggregate.assert_not_called()
+
+    def test_get_measurements_with_latest_entities(self, request):
+        """Test that the latest measurement of each metric includes the entities if requested."""
+        request.query = dict(
+            metric_uuids=f"{METRIC_ID},{METRIC_ID2}", entities="latest", min_report_date="2020-01-01T00:00:00Z"
+        )
+        measurements = get_measurements_of_metrics(self.database)["measurements"]
+        latest = dict(metric_uuid=METRIC_ID, start="1", sources=[dict(entities=[dict(key="a")])])
+        self.assertEqual([dict(metric_uuid=METRIC_ID, start="0", sources=[]), latest], measurements[METRIC_ID])
+        latest2 = dict(metric_uuid=METRIC_ID2, start="1", sources=[dict(entities=[])])
+        self.assertEqual([latest2], measurements[METRIC_ID2])
+        match = self.database.measurements.aggregate.call_args.args[0][0]["$match"]
+        self.assertEqual({"$gt": "2020-01-01T00:00:00+00:00"}, match["end"])
+
+
+@patch("bottle.request")
+class GetMetricMeasurementsTest(unittest.TestCase):
+    """Unit tests for the get metric measurements route."""
+
+    def setUp(self):
+        """Override to create a mock database fixture."""
+        self.database = Mock()
+        self.ids = [ObjectId(), ObjectId()]
+        self.database.measurements.find.return_value = [
+            dict(_id=self.ids[0], start="2021-01-01", end="2021-01-02"),
+            dict(_id=self.ids[1], start="2021-01-02", end="2021-01-03"),
+        ]
+
+    def get_measurements(self):
+        """Return the parsed response of the get metric measurements route."""
+        return json.loads("".join(get_metric_measurements(METRIC_ID, self.database)))
+
+    def test_get_page(self, request):
+        """Test that the measurements are streamed without ids and without a cursor if there are no more pages."""
+        request.query = {}
+        self.assertEqual(
+            dict(
+                measurements=[dict(start="2021-01-01", end="2021-01-02"), dict(start="2021-01-02", end="2021-01-03")],
+                next_cursor=None,
+            ),
+            self.get_measurements(),
+        )
+
+    def test_get_next_page(self, request):
+        """Test that the cursor of a full page can be used to get the next page."""
+        request.query = dict(limit="2")
+        request.query["cursor"] = self.get_measurements()["next_cursor"]
+        self.database.measurements.find.return_value = []
+        self.assertEqual(dict(measurements=[], next_cursor=None), self.get_measurements())
+        self.assertEqual(
+            [{"start": {"$gt": "2021-01-02"}}, {"start": "2021-01-02", "_id": {"$gt": self.ids[1]}}],
+            self.database.measurements.find.call_args.args[0]["$or"],
+        )
+
+    def test_invalid_cursor(self, request):
+        """Test that an invalid cursor results in an error."""
+        request.query = dict(cursor="invalid")
+        self.assertRaises(bottle.HTTPError, get_metric_measurements, METRIC_ID, self.database)
+
+    def test_invalid_limit(self, request):
+        """Test that an invalid limit results in an error."""
+        request.query = dict(limit="invalid")
+        self.assertRaises(bottle.HTTPError, get_metric_measurements, METRIC_ID, self.database)
+
+
+@patch("bottle.request")
+class GetMeasurementHistoryTest(unittest.TestCase):
+    """Unit tests for the get measurement history route."""
+
+    def setUp(self):
+        """Override to create a mock database fixture."""
+        self.database = Mock()
+        self.rollups = [dict(period="day", start="2020-12-31T00:00:00+00:00", count=dict(value="1"))]
+        self.database.rollups.find.return_value = self.rollups
+
+    def test_get_history(self, request):
+        """Test that the measurement history of the last 28 weeks is returned as daily rollups by default."""
+        request.query = {}
+        self.assertEqual(dict(period="day", rollups=self.rollups), get_measurement_history(METRIC_ID, self.database))
+        self.assertEqual("day", self.database.rollups.find.call_args.args[0]["period"])
+
+    def test_get_history_with_window_and_resolution(self, request):
+        """Test that the coarsest period that results in enough points for the requested window is used."""
+        request.query = dict(
+            min_report_date="2019-01-01T00:00:00Z", report_date="2021-01-01T00:00:00Z", resolution="52"
+        )
+        self.assertEqual("week", get_measurement_history(METRIC_ID, self.database)["period"])
+        rollup_filter = self.database.rollups.find.call_args.args[0]
+        self.assertEqual(METRIC_ID, rollup_filter["metric_uuid"])
+        self.assertEqual("week", rollup_filter["period"])
+        self.assertEqual({"$gt": "2019-01-01T00:00:00+00:00"}, rollup_filter["end"])
+        self.assertEqual({"$lt": "2021-01-01T00:00:00+00:00"}, rollup_filter["start"])
+
+    def test_invalid_resolution(self, request):
+        """Test that an invalid resolution results in an error."""
+        request.query = dict(resolution="invalid")
+        self.assertRaises(bottle.HTTPError, get_measurement_history, METRIC_ID, self.database)
+
+    def test_invalid_min_report_date(self, request):
+        """Test that an invalid min report date results in an error."""
+        request.query = dict(min_report_date="invalid")
+        self.assertRaises(bottle.HTTPError, get_measurement_history, METRIC_ID, self.database)
+
+
 @patch("database.measurements.iso_timestamp", new=Mock(return_value="2019-01-01"))
 @patch("bottle.request")
 class PostMeasurementTests(unittest.TestCase):
@@ -96,6 +257,7 @@ class PostMeasurementTests(unittest.TestCase):
             },
         )
         self.database.reports.find.return_value = [self.report]
+        self.database.reports.find_one.return_value = self.report
         self.database.datamodels.find_one.return_value = dict(
             _id="",
             metrics=dict(metric_type=dict(direction="<", scales=["count"])),
@@ -153,10 +315,46 @@ class PostMeasurementTests(unittest.TestCase):
 
     def test_unchanged_measurement(self, request):
         """Post an unchanged measurement for a metric."""
+        self.old_measurement["sources_hash"] = sources_hash(self.old_measurement["sources"])
         self.posted_measurement["sources"] = self.old_measurement["sources"]
         request.json = self.posted_measurement
         self.assertEqual(dict(ok=True), post_measurement(self.database))
-        self.database.measurements.update_one.assert_called_once()
+        flush_measurement_ends(self.database)
+        self.database.measurements.bulk_write.assert_called_once()
+
+    def test_unchanged_measurement_without_hash(self, request):
+        """Post an unchanged measurement for a metric whose latest measurement was stored without sources hash."""
+        self.posted_measurement["sources"] = self.old_measurement["sources"]
+        request.json = self.posted_measurement
+        post_measurement(self.database)
+        self.database.measurements.insert_one.assert_called_once()
+
+    def test_only_read_latest_measurement_if_successful(self, request):
+        """Test that the latest measurement is read once, without entities, if it is successful."""
+        self.old_measurement["sources_hash"] = sources_hash(self.old_measurement["sources"])
+        self.posted_measurement["sources"] = self.old_measurement["sources"]
+        request.json = self.posted_measurement
+        post_measurement(self.database)
+        self.database.measurements.find_one.assert_called_once_with(
+            filter={"metric_uuid": METRIC_ID},
+            sort=[("start", pymongo.DESCENDING)],
+            projection={"sources.entities": False, "sources.entity_hashes": False},
+        )
+
+    def test_store_sources_hash(self, request):
+        """Test that the hash of the sources is stored with a new measurement."""
+        inserted_measurements = []
+
+        def insert_one(measurement):
+            """Fake inserting the measurement and keep a copy of it."""
+            measurement["_id"] = "measurement_id"
+            inserted_measurements.append(dict(measurement))
+
+        self.database.measurements.insert_one.side_effect = insert_one
+        self.posted_measurement["sources"].append(self.source())
+        request.json = self.posted_measurement
+        post_measurement(self.database)
+        self.assertEqual(sources_hash([self.source()]), inserted_measurements[0]["sources_hash"])
 
     def test_changed_measurement_value(self, request):
         """Post a changed measurement for a metric."""
@@ -185,14 +383,15 @@ class PostMeasurementTests(unittest.TestCase):
         request.json = self.posted_measurement
         self.new_measurement["count"].update(dict(status="near_target_met", value="1"))
         self.assertEqual(self.new_measurement, post_measurement(self.database))
+        source = self.source(entities=[dict(key="b", old_key="a")], entity_user_data=dict(b=dict(status="confirmed")))
+        stored_source = {key: value for key, value in source.items() if key != "entities"}
+        stored_source["entity_hashes"] = [entity_hash(dict(key="b", old_key="a"))]
         self.database.measurements.insert_one.assert_called_once_with(
             dict(
+                _id="measurement_id",
                 metric_uuid=METRIC_ID,
-                sources=[
-                    self.source(
-                        entities=[dict(key="b", old_key="a")], entity_user_data=dict(b=dict(status="confirmed"))
-                    )
-                ],
+                sources=[stored_source],
+                sources_hash=sources_hash([source]),
                 count=dict(
                     value="1",
                     status="near_target_met",
@@ -206,6 +405,16 @@ class PostMeasurementTests(unittest.TestCase):
                 end="2019-01-01",
             )
         )
+        self.database.entities.bulk_write.assert_called_once_with(
+            [
+                pymongo.UpdateOne(
+                    {"_id": entity_hash(dict(key="b", old_key="a"))},
+                    {"$setOnInsert": dict(key="b", old_key="a")},
+                    upsert=True,
+                )
+            ],
+            ordered=False,
+        )
 
     def test_ignored_measurement_entities(self, request):
         """Post a measurement where the old one has ignored entities."""
@@ -215,11 +424,13 @@ class PostMeasurementTests(unittest.TestCase):
                 entity_user_data=dict(entity1=dict(status="false_positive", rationale="Rationale")),
             )
         ]
+        self.old_measurement["sources_hash"] = sources_hash(self.old_measurement["sources"])
         self.posted_measurement["sources"].append(self.source(entities=[dict(key="entity1")]))
         request.json = self.posted_measurement
         self.assertEqual(dict(ok=True), post_measurement(self.database))
-        self.database.measurements.update_one.assert_called_once_with(
-            filter={"_id": "id"}, update={"$set": {"end": "2019-01-01"}}
+        flush_measurement_ends(self.database)
+        self.database.measurements.bulk_write.assert_called_once_with(
+            [pymongo.UpdateOne({"_id": "id"}, {"$set": {"end": "2019-01-01"}})], ordered=False
         )
 
     def test_ignored_measurement_entities_and_failed_measurement(self, request):
@@ -228,7 +439,7 @@ class PostMeasurementTests(unittest.TestCase):
             dict(
                 _id="id1",
                 count=dict(status=None, status_start="2018-12-01"),
-                sources=[self.source()],
+                sources=[self.source(value=None, connection_error="Error")],
             ),
             dict(
                 _id="id2",
@@ -348,17 +559,24 @@ class SetEntityAttributeTest(unittest.TestCase):
 class StreamNrMeasurementsTest(unittest.TestCase):
     """Unit tests for the number of measurements stream."""
 
+    @patch("routes.measurement.NR_MEASUREMENTS_INTERVAL", 0.01)
     def test_stream(self):
         """Test that the stream returns the number of measurements whenever it changes."""
-
-        def sleep(seconds):
-            """Fake the time.sleep method."""
-            return seconds
-
         database = Mock()
-        database.measurements.count_documents.side_effect = [42, 42, 42, 43, 43, 43, 43, 43, 43, 43, 43]
-        with patch("time.sleep", sleep):
-            stream = stream_nr_measurements(database)
+        database.measurements.count_documents.return_value = 42
+        stream = stream_nr_measurements(database)
+        self.assertEqual("retry: 2000\nid: 0\nevent: init\ndata: 42\n\n", next(stream))
+        database.measurements.count_documents.return_value = 43
+        self.assertEqual("retry: 2000\nid: 1\nevent: delta\ndata: 43\n\n", next(stream))
+        self.assertEqual("retry: 2000\nid: 2\nevent: delta\ndata: 43\n\n", next(stream))
+        stream.close()
+
+    def test_streams_share_count(self):
+        """Test that streams of multiple clients share the count of the measurements."""
+        database = Mock()
+        database.measurements.count_documents.return_value = 42
+        streams = [stream_nr_measurements(database) for _ in range(3)]
+        for stream in streams:
             self.assertEqual("retry: 2000\nid: 0\nevent: init\ndata: 42\n\n", next(stream))
-            self.assertEqual("retry: 2000\nid: 1\nevent: delta\ndata: 43\n\n", next(stream))
-            self.assertEqual("retry: 2000\nid: 2\nevent: delta\ndata: 43\n\n", next(stream))
+            stream.close()
+        database.measurements.count_documents.assert_called_once()
@@ -1,11 +1,19 @@
 """Unit tests for the report routes."""
 
+import io
+import json
+import time
 import unittest
 from datetime import datetime
 from typing import cast
 from unittest.mock import Mock, patch
 
+import bottle
+import requests
+
+from database import changes
 from routes.report import (
+    REPORT_BROADCASTERS,
     delete_report,
     export_report_as_pdf,
     get_report,
@@ -14,10 +22,11 @@ from routes.report import (
     post_report_copy,
     post_report_import,
     post_report_new,
+    stream_report_changes,
 )
 from server_utilities.type import ReportId
 
-from ..fixtures import JENNY, JOHN, REPORT_ID, REPORT_ID2, SUBJECT_ID, create_report
+from ..fixtures import JENNY, JOHN, METRIC_ID, REPORT_ID, REPORT_ID2, SUBJECT_ID, create_report
 
 
 @patch("bottle.request")
@@ -74,6 +83,8 @@ class ReportTest(unittest.TestCase):
         self.report = create_report()
         self.database.reports.find.return_value = [self.report]
         self.database.measurements.find.return_value = []
+        self.database.metric_state.find.return_value = []
+        self.database.metric_state.find_one.return_value = None
         self.options = (
             "emulateScreenMedia=false&goto.timeout=60000&scrollPage=true&waitFor=10000&pdf.scale=0.7&"
             "pdf.margin.top=25&pdf.margin.bottom=25&pdf.margin.left=25&pdf.margin.right=25"
@@ -83,11 +94,36 @@ class ReportTest(unittest.TestCase):
         """Test that a report can be retrieved."""
         self.assertEqual(REPORT_ID, get_report(self.database, REPORT_ID)["reports"][0]["report_uuid"])
 
+    def test_get_report_only_reads_measurements_of_report(self):
+        """Test that only the recent measurements of the metrics in the report are retrieved."""
+        self.database.reports.find.return_value.insert(0, dict(_id="id2", report_uuid=REPORT_ID2, subjects={}))
+        get_report(self.database, REPORT_ID)
+        self.assertEqual(
+            {"$in": [METRIC_ID]}, self.database.measurements.find.call_args.kwargs["filter"]["metric_uuid"]
+        )
+
     def test_get_report_and_info_about_other_reports(self):
         """Test that a report can be retrieved, and that other reports are also returned."""
         self.database.reports.find.return_value.insert(0, dict(_id="id2", report_uuid=REPORT_ID2))
         self.assertEqual(2, len(get_report(self.database, REPORT_ID)["reports"]))
 
+    @patch("bottle.request")
+    def test_get_report_unchanged(self, request):
+        """Test that a 304 is returned if the report and its measurements are unchanged."""
+        request.query = request.headers = {}
+        get_report(self.database, REPORT_ID)
+        request.headers = {"If-None-Match": bottle.response.get_header("ETag")}
+        self.assertRaises(bottle.HTTPResponse, get_report, self.database, REPORT_ID)
+
+    @patch("bottle.request")
+    def test_get_report_after_change(self, request):
+        """Test that the report is returned if it has changed."""
+        request.query = request.headers = {}
+        get_report(self.database, REPORT_ID)
+        request.headers = {"If-None-Match": bottle.response.get_header("ETag")}
+        self.database.generations.find_one.return_value = dict(generation=2)
+        self.assertEqual(REPORT_ID, get_report(self.database, REPORT_ID)["reports"][0]["report_uuid"])
+
     def test_get_report_missing(self):
         """Test that a report can be retrieved."""
         self.database.reports.find.return_value = []
@@ -152,12 +188,43 @@ class ReportTest(unittest.TestCase):
     @patch("bottle.request")
     def test_post_report_import(self, request):
         """Test that a report is imported correctly."""
+        request.content_type = "application/json"
         request.json = dict(_id="id", title="Title", report_uuid="report_uuid", subjects={})
         post_report_import(self.database)
         inserted = self.database.reports.insert.call_args_list[0][0][0]
         self.assertEqual("Title", inserted["title"])
         self.assertEqual("report_uuid", inserted["report_uuid"])
 
+    @patch("bottle.request")
+    def test_post_report_import_list(self, request):
+        """Test that a list of reports is imported with one insert."""
+        request.content_type = "application/json"
+        request.json = [dict(title="Title", report_uuid=REPORT_ID), dict(title="Title 2", report_uuid=REPORT_ID2)]
+        result = post_report_import(self.database)
+        self.assertEqual([REPORT_ID, REPORT_ID2], result["new_report_uuids"])
+        inserted = self.database.reports.insert_many.call_args[0][0]
+        self.assertEqual(["Title", "Title 2"], [report["title"] for report in inserted])
+
+    @patch("bottle.request")
+    def test_post_report_import_ndjson(self, request):
+        """Test that reports can be imported as newline delimited JSON."""
+        request.content_type = "application/x-ndjson"
+        lines = [json.dumps(dict(title="Title", report_uuid=REPORT_ID)), "", json.dumps(dict(report_uuid=REPORT_ID2))]
+        request.body = io.BytesIO("\n".join(lines).encode())
+        result = post_report_import(self.database)
+        self.assertEqual([REPORT_ID, REPORT_ID2], result["new_report_uuids"])
+        self.database.reports.insert_many.assert_called_once()
+
+    @patch("bottle.abort")
+    @patch("bottle.request")
+    def test_post_report_import_unknown_type(self, request, abort):
+        """Test that a report with an unknown subject type isn't imported."""
+        request.content_type = "application/json"
+        request.json = dict(report_uuid=REPORT_ID, subjects=[dict(name="Subject", type="unknown")])
+        post_report_import(self.database)
+        abort.assert_called_once_with(400, "The subject type 'unknown' does not exist")
+        self.database.reports.insert.assert_not_called()
+
     @patch("server_utilities.functions.datetime")
     def test_get_tag_report(self, date_time):
         """Test that a tag report can be retrieved."""
@@ -208,3 +275,97 @@ class ReportTest(unittest.TestCase):
             ),
             get_tag_report("tag", self.database),
         )
+        self.assertEqual(
+            {"$in": ["metric_with_tag"]}, self.database.measurements.find.call_args.kwargs["filter"]["metric_uuid"]
+        )
+
+
+@patch("routes.report.REPORT_STREAM_INTERVAL", 0.01)
+class StreamReportChangesTest(unittest.TestCase):
+    """Unit tests for the report changes stream."""
+
+    def setUp(self):
+        """Override to create a mock database fixture."""
+        self.database = Mock()
+        self.database.generations.find_one.return_value = dict(generation=1)
+        self.report = create_report()
+        self.report.update(timestamp="2021-01-01T00:00:00+00:00", version=1)
+        self.database.reports.find.return_value = [self.report]
+        self.measurement = dict(metric_uuid=METRIC_ID, start="2021-01-01", count=dict(value="1", status="target_met"))
+        self.database.metric_state.find.return_value = [dict(metric_uuid=METRIC_ID, latest=self.measurement)]
+        self.stream = stream_report_changes(REPORT_ID, self.database)
+
+    def tearDown(self):
+        """Override to close the stream."""
+        self.stream.close()
+
+    def test_init(self):
+        """Test that the stream starts with the report version and the latest measurements of the metrics."""
+        self.assertEqual(
+            "retry: 2000\nid: 0\nevent: init\ndata: "
+            '{"report": {"timestamp": "2021-01-01T00:00:00+00:00", "version": 1}, "metrics": {"metric_uuid": '
+            '{"metric_uuid": "metric_uuid", "start": "2021-01-01", "count": {"value": "1", "status": "target_met"}}}}'
+            "\n\n",
+            next(self.stream),
+        )
+
+    def test_metric_event(self):
+        """Test that the stream sends a metric event when the latest measurement of a metric changes."""
+        next(self.stream)
+        measurement = dict(self.measurement, count=dict(value="2", status="target_not_met"))
+        self.database.metric_state.find.return_value = [dict(metric_uuid=METRIC_ID, latest=measurement)]
+        self.assertEqual(
+            "retry: 2000\nid: 1\nevent: metric\ndata: "
+            '{"metric_uuid": "metric_uuid", "start": "2021-01-01", "count": {"value": "2", "status": "target_not_met"}}'
+            "\n\n",
+            next(self.stream),
+        )
+
+    def test_report_event(self):
+        """Test that the stream sends a report event when the report changes."""
+        next(self.stream)
+        self.report.update(timestamp="2021-01-02T00:00:00+00:00", version=2)
+        self.database.generations.find_one.return_value = dict(generation=2)
+        self.assertEqual(
+            "retry: 2000\nid: 1\nevent: report\ndata: "
+            '{"timestamp": "2021-01-02T00:00:00+00:00", "version": 2}\n\n',
+            next(self.stream),
+        )
+
+    def test_keep_alive(self):
+        """Test that the stream sends a comment to keep the connection alive when nothing changes."""
+        next(self.stream)
+        self.assertEqual(": keep-alive\n\n", next(self.stream))
+
+    @patch("routes.report.REPORT_STREAM_INTERVAL", 60)
+    def test_notified_change(self):
+        """Test that the stream sends an event without waiting for the interval when the report is changed."""
+        next(self.stream)
+        self.report.update(timestamp="2021-01-02T00:00:00+00:00", version=2)
+        self.database.generations.find_one.return_value = dict(generation=2)
+        changes.notify(self.database, REPORT_ID)
+        self.assertEqual(
+            "retry: 2000\nid: 1\nevent: report\ndata: "
+            '{"timestamp": "2021-01-02T00:00:00+00:00", "version": 2}\n\n',
+            next(self.stream),
+        )
+
+    @patch("bottle.request")
+    def test_invalid_last_event_id(self, request):
+        """Test that the stream returns a 400 if the last event id is not a number."""
+        request.get_header.return_value = "not a number"
+        self.assertRaises(bottle.HTTPError, next, stream_report_changes(REPORT_ID, self.database))
+
+    def test_unknown_report(self):
+        """Test that the stream of a report that doesn't exist returns a 404."""
+        self.assertRaises(bottle.HTTPError, next, stream_report_changes("unknown_report_uuid", self.database))
+        self.assertNotIn("unknown_report_uuid", REPORT_BROADCASTERS.get(self.database, {}))
+
+    def test_remove_broadcaster(self):
+        """Test that the broadcaster of the report is removed when the stream is closed."""
+        next(self.stream)
+        self.assertIn(REPORT_ID, REPORT_BROADCASTERS[self.database])
+        self.stream.close()
+        time.sleep(0.05)
+        self.assertNotIn(REPORT_ID, REPORT_BROADCASTERS[self.database])
+        self.assertFalse(changes.has_listeners(self.database))
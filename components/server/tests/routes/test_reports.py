@@ -3,6 +3,8 @@
 import unittest
 from unittest.mock import Mock, patch
 
+import bottle
+
 from routes.reports import get_reports, post_reports_attribute
 
 from ..fixtures import METRIC_ID, REPORT_ID, SOURCE_ID, SUBJECT_ID, create_report
@@ -30,6 +32,8 @@ class ReportsTest(unittest.TestCase):
             sources=[dict(source_uuid=SOURCE_ID, parse_error=None, connection_error=None, value="42")],
         )
         self.database.measurements.find.return_value = [self.measurement]
+        self.database.metric_state.find.return_value = []
+        self.database.metric_state.find_one.return_value = None
 
     def assert_change_description(self, attribute: str, old_value=None, new_value=None) -> None:
         """Assert that a change description is added to the new reports overview."""
@@ -88,20 +92,41 @@ class ReportsTest(unittest.TestCase):
 
     def test_get_report(self):
         """Test that a report can be retrieved and credentials are hidden."""
-        report = create_report()
-        self.database.reports.find.return_value = [report]
-        report["summary"] = dict(red=0, green=0, yellow=0, grey=0, white=1)
-        report["summary_by_subject"] = {SUBJECT_ID: dict(red=0, green=0, yellow=0, grey=0, white=1)}
-        report["summary_by_tag"] = {}
-        self.assertEqual(dict(_id="id", title="Reports", subtitle="", reports=[report]), get_reports(self.database))
+        self.database.reports.find.return_value = [create_report()]
+        overview = get_reports(self.database)
+        self.assertEqual("Reports", overview["title"])
+        report = overview["reports"][0]
+        self.assertEqual(dict(red=1, green=0, yellow=0, grey=0, white=0), report["summary"])
+        self.assertEqual({SUBJECT_ID: dict(red=1, green=0, yellow=0, grey=0, white=0)}, report["summary_by_subject"])
+        self.assertEqual(dict(security=dict(red=1, green=0, yellow=0, grey=0, white=0)), report["summary_by_tag"])
+        source = report["subjects"][SUBJECT_ID]["metrics"][METRIC_ID]["sources"][SOURCE_ID]
+        self.assertEqual("this string replaces credentials", source["parameters"]["password"])
+
+    @patch("bottle.request")
+    def test_get_reports_unchanged(self, request):
+        """Test that a 304 is returned if the reports and measurements are unchanged."""
+        request.query = request.headers = {}
+        self.database.reports.find.return_value = [create_report()]
+        get_reports(self.database)
+        request.headers = {"If-None-Match": bottle.response.get_header("ETag")}
+        self.assertRaises(bottle.HTTPResponse, get_reports, self.database)
+
+    @patch("bottle.request")
+    def test_get_reports_after_new_measurement(self, request):
+        """Test that the reports are returned if a metric has a new measurement."""
+        request.query = request.headers = {}
+        self.database.reports.find.return_value = [create_report()]
+        get_reports(self.database)
+        request.headers = {"If-None-Match": bottle.response.get_header("ETag")}
+        self.database.metric_state.find_one.return_value = dict(end="2021-01-01T00:00:00+00:00")
+        self.assertEqual("Reports", get_reports(self.database)["title"])
 
     @patch("bottle.request")
     def test_get_old_report(self, request):
         """Test that an old report can be retrieved and credentials are hidden."""
         request.query = dict(report_date="2020-08-31T23:59:59.000Z")
         report = create_report()
-        self.database.reports.distinct.return_value = [REPORT_ID]
-        self.database.reports.find_one.return_value = report
+        self.database.reports.aggregate.return_value = [report]
         report["summary"] = dict(red=0, green=0, yellow=0, grey=0, white=1)
         report["summary_by_subject"] = {SUBJECT_ID: dict(red=0, green=0, yellow=0, grey=0, white=1)}
         report["summary_by_tag"] = {}
@@ -110,9 +135,6 @@ class ReportsTest(unittest.TestCase):
     def test_status_start(self):
         """Test that the status start is part of the reports summary."""
         self.measurement["count"]["status_start"] = "2020-12-03:22:28:00+00:00"
-        report = create_report()
-        self.database.reports.find.return_value = [report]
-        report["summary"] = dict(red=0, green=0, yellow=0, grey=0, white=1)
-        report["summary_by_subject"] = {SUBJECT_ID: dict(red=0, green=0, yellow=0, grey=0, white=1)}
-        report["summary_by_tag"] = {}
-        self.assertEqual(dict(_id="id", title="Reports", subtitle="", reports=[report]), get_reports(self.database))
+        self.database.reports.find.return_value = [create_report()]
+        metric = get_reports(self.database)["reports"][0]["subjects"][SUBJECT_ID]["metrics"][METRIC_ID]
+        self.assertEqual("2020-12-03:22:28:00+00:00", metric["status_start"])
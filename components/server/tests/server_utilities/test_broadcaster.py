@@ -0,0 +1,90 @@
+"""Unit tests for the broadcaster."""
+
+import queue
+import time
+import unittest
+from unittest.mock import Mock
+
+from server_utilities.broadcaster import Broadcaster
+
+
+class BroadcasterTest(unittest.TestCase):
+    """Unit tests for the broadcaster."""
+
+    def setUp(self):
+        """Override to create a broadcaster fixture."""
+        self.read = Mock(return_value=1)
+        self.broadcaster = Broadcaster(self.read, interval=0.01, keep_alive=1000)
+
+    def tearDown(self):
+        """Override to unsubscribe the subscribers and notify the producer so it stops."""
+        for subscriber in list(self.broadcaster.subscribers):
+            self.broadcaster.unsubscribe(subscriber)
+        self.broadcaster.notify()
+
+    def test_subscribe(self):
+        """Test that a new subscriber receives the current value."""
+        self.assertEqual(1, self.broadcaster.subscribe().get(timeout=1))
+
+    def test_broadcast_changed_value(self):
+        """Test that all subscribers receive a changed value."""
+        subscribers = [self.broadcaster.subscribe() for _ in range(3)]
+        for subscriber in subscribers:
+            self.assertEqual(1, subscriber.get(timeout=1))
+        self.read.return_value = 2
+        for subscriber in subscribers:
+            self.assertEqual(2, subscriber.get(timeout=1))
+
+    def test_no_broadcast_of_unchanged_value(self):
+        """Test that an unchanged value is not broadcast."""
+        subscriber = self.broadcaster.subscribe()
+        subscriber.get(timeout=1)
+        self.assertRaises(queue.Empty, subscriber.get, timeout=0.05)
+
+    def test_notify(self):
+        """Test that the broadcaster reads and broadcasts the value without waiting for the interval when notified."""
+        self.broadcaster.interval = 60
+        subscriber = self.broadcaster.subscribe()
+        self.assertEqual(1, subscriber.get(timeout=1))
+        self.read.return_value = 2
+        self.broadcaster.notify()
+        self.assertEqual(2, subscriber.get(timeout=1))
+
+    def test_keep_alive(self):
+        """Test that an unchanged value is broadcast after the keep alive number of reads."""
+        self.broadcaster.keep_alive = 1
+        subscriber = self.broadcaster.subscribe()
+        self.assertEqual(1, subscriber.get(timeout=1))
+        self.assertEqual(1, subscriber.get(timeout=1))
+
+    def test_slow_subscriber(self):
+        """Test that a subscriber that doesn't keep up only receives the latest value."""
+        subscriber = self.broadcaster.subscribe()
+        self.broadcaster.broadcast(2)
+        self.broadcaster.broadcast(3)
+        self.assertEqual(3, subscriber.get(timeout=1))
+        self.assertTrue(subscriber.empty())
+
+    def test_producer_stops_without_subscribers(self):
+        """Test that the producer stops when the last subscriber unsubscribes."""
+        self.broadcaster.unsubscribe(self.broadcaster.subscribe())
+        time.sleep(0.05)
+        self.assertIsNone(self.broadcaster.producer)
+
+    def test_on_stop(self):
+        """Test that the broadcaster calls the stop callback when the producer stops."""
+        self.broadcaster.on_stop = on_stop = Mock()
+        self.broadcaster.unsubscribe(self.broadcaster.subscribe())
+        time.sleep(0.05)
+        on_stop.assert_called_once_with(self.broadcaster)
+
+    def test_read_error(self):
+        """Test that the producer keeps running if reading the value fails."""
+        subscriber = self.broadcaster.subscribe()
+        self.assertEqual(1, subscriber.get(timeout=1))
+        with self.assertLogs(level="ERROR"):
+            self.read.side_effect = RuntimeError
+            time.sleep(0.05)
+        self.read.side_effect = None
+        self.read.return_value = 2
+        self.assertEqual(2, subscriber.get(timeout=1))
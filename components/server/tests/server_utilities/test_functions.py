@@ -4,7 +4,9 @@ import unittest
 from datetime import datetime, timezone
 from unittest.mock import patch
 
-from server_utilities.functions import iso_timestamp, report_date_time, uuid
+import bottle
+
+from server_utilities.functions import check_etag, iso_timestamp, md5_hash, report_date_time, uuid
 
 
 class UtilTests(unittest.TestCase):
@@ -45,3 +47,30 @@ class ReportDateTimeTest(unittest.TestCase):
         """Test that the report datetime is empty if it's a future date."""
         request.query = dict(report_date="3000-01-01T00:00:00Z")
         self.assertEqual("", report_date_time())
+
+
+@patch("server_utilities.functions.bottle.request")
+class CheckETagTest(unittest.TestCase):
+    """Unit tests for the check ETag method."""
+
+    def test_set_etag(self, request):
+        """Test that the ETag is set on the response."""
+        request.headers = {}
+        check_etag("validator")
+        self.assertEqual(f'"{md5_hash(repr(("validator",)))}"', bottle.response.get_header("ETag"))
+
+    def test_unchanged(self, request):
+        """Test that a 304 is returned if the client has the same version."""
+        etag = f'"{md5_hash(repr(("validator",)))}"'
+        request.headers = {"If-None-Match": f'"other", W/{etag}'}
+        bottle.response.set_header("Cache-Control", "no-cache")
+        with self.assertRaises(bottle.HTTPResponse) as context:
+            check_etag("validator")
+        self.assertEqual(304, context.exception.status_code)
+        self.assertEqual(etag, context.exception.get_header("ETag"))
+        self.assertEqual("no-cache", context.exception.get_header("Cache-Control"))
+
+    def test_changed(self, request):
+        """Test that no 304 is returned if the client has another version."""
+        request.headers = {"If-None-Match": f'"{md5_hash(repr(("validator",)))}"'}
+        check_etag("other validator")
@@ -0,0 +1,42 @@
+"""Unit tests for the JSON patch functions."""
+
+import unittest
+
+from server_utilities.json_patch import apply_json_patch, json_patch
+
+
+class JSONPatchTest(unittest.TestCase):
+    """Unit tests for creating and applying JSON patches."""
+
+    def assert_patch_round_trip(self, old, new):
+        """Check that applying the patch to the old document results in the new document."""
+        self.assertEqual(new, apply_json_patch(dict(old), json_patch(old, new)))
+
+    def test_no_changes(self):
+        """Test that the patch for equal documents is empty."""
+        self.assertEqual([], json_patch(dict(a=1, b=dict(c=2)), dict(a=1, b=dict(c=2))))
+
+    def test_add(self):
+        """Test that added keys result in an add operation."""
+        self.assertEqual([dict(op="add", path="/b/d", value=3)], json_patch(dict(b=dict(c=2)), dict(b=dict(c=2, d=3))))
+        self.assert_patch_round_trip(dict(b=dict(c=2)), dict(b=dict(c=2, d=3)))
+
+    def test_remove(self):
+        """Test that removed keys result in a remove operation."""
+        self.assertEqual([dict(op="remove", path="/a")], json_patch(dict(a=1, b=2), dict(b=2)))
+        self.assert_patch_round_trip(dict(a=1, b=2), dict(b=2))
+
+    def test_replace(self):
+        """Test that changed values, including lists and values of another type, result in a replace operation."""
+        self.assertEqual([dict(op="replace", path="/a", value=[1, 2])], json_patch(dict(a=[1]), dict(a=[1, 2])))
+        self.assertEqual([dict(op="replace", path="/a", value="1")], json_patch(dict(a=1), dict(a="1")))
+        self.assert_patch_round_trip(dict(a=dict(b=1)), dict(a="b"))
+
+    def test_escape_keys(self):
+        """Test that keys with slashes and tildes are escaped."""
+        self.assertEqual([dict(op="add", path="/a~1b~0c", value=1)], json_patch({}, {"a/b~c": 1}))
+        self.assert_patch_round_trip({}, {"a/b~c": dict(d=1)})
+
+    def test_remove_missing_key(self):
+        """Test that removing a key that doesn't exist is ignored."""
+        self.assertEqual(dict(a=1), apply_json_patch(dict(a=1), [dict(op="remove", path="/b")]))
@@ -1,20 +1,13 @@
 """Step implementations for the data model feature."""
 
-import hashlib
-
 from asserts import assert_equal, assert_true
 from behave import then, when
 
 
-def md5_hash(string: str) -> str:
-    """Return a md5 hash of the string."""
-    return hashlib.md5(string.encode("utf-8")).hexdigest()  # nosec, Not used for cryptography
-
-
 @when("the client gets the most recent data model")
 def get_data_model(context):
     """Get the most recent data model."""
-    headers = {"If-None-Match": f"W/{md5_hash(context.response.json()['timestamp'])}"} if context.response else {}
+    headers = {"If-None-Match": context.response.headers["ETag"]} if context.response else {}
     context.get("datamodel", headers=headers)
 
 
@@ -32,8 +25,9 @@ def check_data_model(context):
 
 @then("the server returns a 304")
 def check_304(context):
-    """Check that the server returns a 304."""
+    """Check that the server returns a 304, with the ETag of the data model."""
     assert_equal(304, context.response.status_code)
+    assert_true(context.response.headers["ETag"])
 
 
 @then("the server returns an empty data model")